@@ -0,0 +1,183 @@
+"""
+Admission control for document ingestion and embedding requests.
+
+INGESTION admits ingestion jobs in arrival order while there is both a free
+slot and room in a memory budget, estimated from each file's size. A burst of
+uploads queues instead of parsing every PDF at once. When the queue is full,
+or a job waits too long, it is rejected with AdmissionRejected, which the
+server turns into a 503 with Retry-After.
+
+EMBEDDINGS is a token bucket shared by every embedding request in the
+process. Bulk (ingestion) requests may only draw it down to a reserve, which
+is kept for interactive requests (search), so queries stay fast while large
+documents are being embedded.
+
+Both are per process; with several server workers each enforces its own limits.
+"""
+import collections
+import contextlib
+import os
+import threading
+import time
+from typing import Dict, Iterator, List
+
+try:
+    from .metrics import REGISTRY  # local module when packaged
+except ImportError:
+    from metrics import REGISTRY  # fallback when running scripts directly
+
+# Ingestion jobs running at the same time
+INGEST_MAX_CONCURRENT = int(os.getenv("INGEST_MAX_CONCURRENT", "2"))
+# Memory ingestion jobs may use together, estimated from file sizes
+INGEST_MEMORY_BUDGET_MB = float(os.getenv("INGEST_MEMORY_BUDGET_MB", "512"))
+# Peak memory of ingesting a PDF as a multiple of its size (parsed pages, text, chunks, vectors)
+INGEST_MEMORY_FACTOR = float(os.getenv("INGEST_MEMORY_FACTOR", "8"))
+# Jobs allowed to wait for admission before new ones are rejected
+INGEST_MAX_QUEUED = int(os.getenv("INGEST_MAX_QUEUED", "16"))
+# Seconds a job may wait for admission
+INGEST_QUEUE_TIMEOUT = float(os.getenv("INGEST_QUEUE_TIMEOUT", "120"))
+# Embedding tokens per minute across the process; 0 disables the budget
+EMBED_TOKENS_PER_MINUTE = int(os.getenv("EMBED_TOKENS_PER_MINUTE", "1000000"))
+# Share of the embedding budget bulk requests leave for interactive ones
+EMBED_INTERACTIVE_RESERVE = float(os.getenv("EMBED_INTERACTIVE_RESERVE", "0.2"))
+# Rough chars-per-token ratio for estimating request sizes
+CHARS_PER_TOKEN = 4
+
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "ingest_admission_wait_seconds", "Time ingestion jobs waited for admission.")
+ADMISSION_REJECTED = REGISTRY.counter(
+    "ingest_admission_rejected_total", "Ingestion jobs rejected by admission control.", ("reason",))
+EMBED_BUDGET_WAIT_SECONDS = REGISTRY.histogram(
+    "embed_budget_wait_seconds", "Time embedding requests waited for rate budget.", ("priority",))
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+
+class AdmissionRejected(RuntimeError):
+    """Work was turned away because the system is saturated; retry after retry_after seconds."""
+
+    def __init__(self, message: str, retry_after: float = 5.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class IngestionGate:
+    """First-come, first-served admission by concurrency slot and estimated memory."""
+
+    def __init__(self, max_concurrent: int = INGEST_MAX_CONCURRENT,
+                 memory_budget_bytes: int = int(INGEST_MEMORY_BUDGET_MB * 1024 * 1024),
+                 memory_factor: float = INGEST_MEMORY_FACTOR,
+                 max_queued: int = INGEST_MAX_QUEUED,
+                 queue_timeout: float = INGEST_QUEUE_TIMEOUT):
+        self.max_concurrent = max(1, max_concurrent)
+        self.memory_budget = max(1, memory_budget_bytes)
+        self.memory_factor = memory_factor
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._queue: collections.deque = collections.deque()
+        self._active = 0
+        self._reserved = 0
+
+    def estimate(self, size_bytes: int) -> int:
+        """Estimated peak memory of ingesting size_bytes of PDF, capped at the budget."""
+        # A job bigger than the whole budget is admitted once it can run alone
+        return min(self.memory_budget, max(1024 * 1024, int(size_bytes * self.memory_factor)))
+
+    def _fits(self, ticket: object, cost: int) -> bool:
+        return (self._queue[0] is ticket
+                and self._active < self.max_concurrent
+                and self._reserved + cost <= self.memory_budget)
+
+    @contextlib.contextmanager
+    def admit(self, size_bytes: int) -> Iterator[None]:
+        """Hold an ingestion slot for the with-block. Raises AdmissionRejected when saturated."""
+        cost = self.estimate(size_bytes)
+        started = time.monotonic()
+        with self._cond:
+            if len(self._queue) >= self.max_queued:
+                ADMISSION_REJECTED.inc(reason="queue_full")
+                raise AdmissionRejected("Too many documents waiting to be ingested, retry later")
+            ticket = object()
+            self._queue.append(ticket)
+            try:
+                while not self._fits(ticket, cost):
+                    remaining = started + self.queue_timeout - time.monotonic()
+                    if remaining <= 0:
+                        ADMISSION_REJECTED.inc(reason="timeout")
+                        raise AdmissionRejected("Timed out waiting to ingest the document, retry later")
+                    self._cond.wait(remaining)
+            except BaseException:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+                raise
+            self._queue.popleft()
+            self._active += 1
+            self._reserved += cost
+            # The next job in line may fit as well
+            self._cond.notify_all()
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._reserved -= cost
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"active": self._active, "queued": len(self._queue),
+                    "reserved_bytes": self._reserved, "budget_bytes": self.memory_budget}
+
+
+class EmbeddingBudget:
+    """
+    Token bucket refilled at tokens_per_minute, holding at most one minute of
+    tokens. Bulk requests never take it below the interactive reserve.
+    """
+
+    def __init__(self, tokens_per_minute: int = EMBED_TOKENS_PER_MINUTE,
+                 interactive_reserve: float = EMBED_INTERACTIVE_RESERVE):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.reserve = self.capacity * min(max(interactive_reserve, 0.0), 0.9)
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: int, priority: str = BULK) -> None:
+        """Block until tokens are available to a request of the given priority."""
+        if not self.enabled:
+            return
+        floor = self.reserve if priority == BULK else 0.0
+        # A request larger than the usable budget waits for a full bucket rather than forever
+        tokens = min(float(tokens), self.capacity - floor)
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                self._refill()
+                if self._level - tokens >= floor:
+                    self._level -= tokens
+                    break
+                wait = (tokens + floor - self._level) / self.rate
+            time.sleep(min(wait, 0.5))
+        EMBED_BUDGET_WAIT_SECONDS.observe(time.monotonic() - started, priority=priority)
+
+
+def estimate_tokens(texts: List[str]) -> int:
+    return sum(len(t) for t in texts) // CHARS_PER_TOKEN + len(texts)
+
+
+INGESTION = IngestionGate()
+EMBEDDINGS = EmbeddingBudget()
@@ -1,5 +1,5 @@
 from dotenv import load_dotenv
-from prompts import AGENT_INSTRUCTION, SESSION_INSTRUCTION
+from prompts import AGENT_INSTRUCTION, build_session_instruction, session_metadata
 from livekit import agents
 from livekit.agents import AgentSession, Agent, RoomInputOptions
 from livekit.plugins import (
@@ -7,18 +7,26 @@ from livekit.plugins import (
     noise_cancellation,
 )
 import os
-from tools import open_url, ask_docs
+from tools import open_url, ask_docs, meeting_summary
 from livekit.plugins import tavus
+from mcp_client.agent_tools import MCPToolsIntegration
+from bringup import BringUp
+from worker import prewarm, compute_load, build_mcp_servers, flush_room_metrics, LOAD_THRESHOLD
+import metrics
 load_dotenv()
 
 
 class Assistant(Agent):
     def __init__(self) -> None:
         super().__init__(instructions=AGENT_INSTRUCTION,
-                         tools=[open_url, ask_docs],)
+                         tools=[open_url, ask_docs, meeting_summary],)
 
 
 async def entrypoint(ctx: agents.JobContext):
+    # Tool calls made by this job are traced under its room
+    metrics.set_room(ctx.room.name)
+    ctx.add_shutdown_callback(lambda: flush_room_metrics(ctx.room.name))
+
     session = AgentSession(
         llm=openai.realtime.RealtimeModel(
             voice=os.getenv("OPENAI_VOICE", "onyx"),
@@ -26,35 +34,83 @@ async def entrypoint(ctx: agents.JobContext):
         )
     )
 
-    # Create assistant directly without MCP server/tools
     agent = Assistant()
+    bringup = BringUp(job_id=ctx.job.id, room=ctx.room.name)
 
-    await session.start(
-        room=ctx.room,
-        agent=agent,
-        room_input_options=RoomInputOptions(
-            # LiveKit Cloud enhanced noise cancellation
-            # - If self-hosting, omit this parameter
-            # - For telephony applications, use `BVCTelephony` for best results
-            noise_cancellation=noise_cancellation.BVC(),
-        ),
-    )
+    @session.on("agent_state_changed")
+    def _on_agent_state_changed(ev):
+        if ev.new_state == "speaking":
+            bringup.mark("first_word")
+
+    async def start_session():
+        await session.start(
+            room=ctx.room,
+            agent=agent,
+            room_input_options=RoomInputOptions(
+                # LiveKit Cloud enhanced noise cancellation
+                # - If self-hosting, omit this parameter
+                # - For telephony applications, use `BVCTelephony` for best results
+                noise_cancellation=ctx.proc.userdata.get("noise_cancellation") or noise_cancellation.BVC(),
+            ),
+        )
+
+    # MCP tools configured via MCP_SERVERS; cached schemas register without waiting on the servers,
+    # and the tools are added to the running agent so they never hold up the greeting
+    async def load_mcp_tools():
+        mcp_servers = build_mcp_servers(ctx.proc.userdata["mcp_configs"])
+
+        async def close_mcp_servers():
+            for server in mcp_servers:
+                await server.cleanup()
 
-    await ctx.connect()
+        ctx.add_shutdown_callback(close_mcp_servers)
+        mcp_tools = await MCPToolsIntegration.prepare_dynamic_tools(
+            mcp_servers,
+            schema_cache=ctx.proc.userdata.get("mcp_schema_cache"),
+            result_cache=ctx.proc.userdata.get("mcp_result_cache"),
+        )
+        if mcp_tools:
+            await agent.update_tools([*agent.tools, *mcp_tools])
 
     # Start the avatar after the agent/session is ready to ensure the
     # first spoken message is the English introduction from the assistant.
-    avatar = tavus.AvatarSession(
-      replica_id=os.environ.get("REPLICA_ID"),  
-      persona_id=os.environ.get("PERSONA_ID"),  
-      api_key=os.environ.get("TAVUS_API_KEY"),
-    )
-    await avatar.start(session, room=ctx.room)
+    async def start_avatar():
+        avatar = tavus.AvatarSession(
+          replica_id=os.environ.get("REPLICA_ID"),
+          persona_id=os.environ.get("PERSONA_ID"),
+          api_key=os.environ.get("TAVUS_API_KEY"),
+        )
+        await avatar.start(session, room=ctx.room)
 
-    await session.generate_reply(
-        instructions=SESSION_INSTRUCTION,
-    )
+    async def greet():
+        # Room metadata is only known once connected, which the greeting waits for
+        meta = session_metadata(ctx.room.metadata, ctx.job.metadata)
+        await session.generate_reply(
+            instructions=build_session_instruction(
+                team=meta.get("team"),
+                room=ctx.room.name,
+                ceremony=meta.get("ceremony"),
+            ),
+        )
+
+    # Joining the room and starting the session are independent; the avatar
+    # needs both, and the greeting waits for the avatar when there is one
+    bringup.phase("session_start", start_session)
+    bringup.phase("connect", ctx.connect)
+    greet_after = ["session_start", "connect"]
+    if ctx.proc.userdata.get("mcp_configs"):
+        bringup.phase("mcp_tools", load_mcp_tools)
+    if os.environ.get("REPLICA_ID"):
+        bringup.phase("avatar", start_avatar, depends_on=["session_start", "connect"])
+        greet_after = ["avatar"]
+    bringup.phase("greeting", greet, depends_on=greet_after)
+    await bringup.run()
 
 
 if __name__ == "__main__":
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    agents.cli.run_app(agents.WorkerOptions(
+        entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm,
+        load_fnc=compute_load,
+        load_threshold=LOAD_THRESHOLD,
+    ))
\ No newline at end of file
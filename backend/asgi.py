@@ -0,0 +1,62 @@
+"""
+Production serving mode for server.py.
+
+Runs the Flask app under uvicorn. uvicorn's event loop becomes the shared loop
+used by serving.run_async, so LiveKit calls from every request reuse one
+client, and the sync views run on a bounded thread pool.
+
+    python asgi.py                      # SERVER_PORT / SERVER_WORKERS to tune
+    uvicorn asgi:app --port 5001        # or any ASGI server
+"""
+import asyncio
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from server import app as flask_app
+import admission
+import serving
+
+# Threads serving requests in each worker process. Ingestion requests hold
+# their thread while they wait for admission, so the default leaves 16 threads
+# free when every admission slot and queue position is taken.
+SERVER_THREADS = int(os.getenv(
+    "SERVER_THREADS", str(16 + admission.INGEST_MAX_CONCURRENT + admission.INGEST_MAX_QUEUED)))
+
+
+class SharedLoopApp:
+    """ASGI wrapper that adopts the server's loop on startup and closes clients on shutdown."""
+
+    def __init__(self, wsgi_app, threads: int = SERVER_THREADS):
+        # Each request runs on a pool of `threads`; the views are thread-safe
+        self._app = WSGIMiddleware(wsgi_app, workers=threads)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "lifespan":
+            await self._app(scope, receive, send)
+            return
+
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                serving.use_loop(asyncio.get_running_loop())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await serving.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+app = SharedLoopApp(flask_app)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "asgi:app",
+        host=os.getenv("SERVER_HOST", "0.0.0.0"),
+        port=int(os.getenv("SERVER_PORT", "5001")),
+        workers=int(os.getenv("SERVER_WORKERS", "1")),
+        lifespan="on",
+    )
@@ -0,0 +1,211 @@
+"""
+Offline benchmark of RAG ingestion and retrieval.
+
+Generates a synthetic corpus of PDFs, ingests it into a throwaway vector store
+through rag.add_pdf (or the bulk ingest pipeline with --bulk) against a local
+fake embeddings endpoint, then runs a labeled query set through rag.search.
+Every page carries one fact about a uniquely named project, and each query
+asks about one of them, so recall@k is known exactly. Reports pages/s,
+chunks/s, peak RSS, query latency percentiles and recall@k.
+
+    python bench/bench_rag.py --docs 100 --pages 10 --queries 200 --embed-latency 20
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from fake_embeddings import start_fake_embeddings
+from load_server import BACKEND_DIR, percentile
+
+FILLER = (
+    "sprint backlog story points estimate velocity standup blocker review retro "
+    "planning refinement acceptance criteria dependency release deploy pipeline "
+    "feature branch merge request test coverage regression incident customer "
+    "roadmap milestone capacity owner action item goal scope risk demo feedback "
+    "team member design api service database migration cache latency metric"
+).split()
+OWNERS = ["alice", "bruno", "chen", "dara", "emeka", "farah", "goran", "hana", "ivan", "jun"]
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(path: Path, pages: List[List[str]]) -> None:
+    """Write a minimal PDF with one text line per entry, using the built-in Helvetica font."""
+    bodies: Dict[int, bytes] = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    page_ids = []
+    next_id = 4
+    for lines in pages:
+        content = ("BT /F1 10 Tf 12 TL 50 780 Td "
+                   + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines)
+                   + " ET").encode("latin-1")
+        bodies[next_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                           f"/Resources << /Font << /F1 3 0 R >> >> /Contents {next_id + 1} 0 R >>").encode()
+        bodies[next_id + 1] = b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream"
+        page_ids.append(next_id)
+        next_id += 2
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    bodies[2] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for i in range(1, next_id):
+        offsets[i] = len(out)
+        out += f"{i} 0 obj\n".encode() + bodies[i] + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {next_id}\n0000000000 65535 f \n".encode()
+    for i in range(1, next_id):
+        out += f"{offsets[i]:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {next_id} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
+
+
+def _codename(rng: random.Random) -> str:
+    return "".join(rng.choice("bcdfghjklmnprstvz") + rng.choice("aeiou") for _ in range(4))
+
+
+def make_corpus(directory: Path, docs: int, pages: int, words_per_page: int,
+                seed: int) -> List[Tuple[str, str]]:
+    """
+    Write docs PDFs of pages pages each. Every page holds one fact about a
+    uniquely named project. Returns (query, expected filename) pairs.
+    """
+    rng = random.Random(seed)
+    facts: List[Tuple[str, str]] = []
+    used = set()
+    for d in range(docs):
+        filename = f"bench-{d:05d}.pdf"
+        page_lines = []
+        for _ in range(pages):
+            code = _codename(rng)
+            while code in used:
+                code = _codename(rng)
+            used.add(code)
+            owner = rng.choice(OWNERS)
+            words = [rng.choice(FILLER) for _ in range(words_per_page)]
+            fact = f"Project {code} is owned by {owner} and ships in sprint {rng.randint(1, 40)}."
+            words.insert(rng.randrange(len(words) + 1), fact)
+            text = " ".join(words)
+            # Wrap into lines short enough to fit the page width
+            lines, line = [], ""
+            for word in text.split(" "):
+                if len(line) + len(word) + 1 > 95:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = f"{line} {word}".strip()
+            lines.append(line)
+            page_lines.append(lines)
+            facts.append((f"Who owns project {code}?", filename))
+        make_pdf(directory / filename, page_lines)
+    return facts
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=5, help="pages per document")
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--embed-latency", type=float, default=0.0,
+                        help="simulated embeddings API latency per request in ms")
+    parser.add_argument("--dim", type=int, default=512, help="fake embedding dimensions")
+    parser.add_argument("--bulk", action="store_true", help="ingest through the bulk pipeline (ingest.py)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="keep the corpus and vector store")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-rag-"))
+    corpus_dir = workdir / "corpus"
+    corpus_dir.mkdir()
+    embeddings, embeddings_url = start_fake_embeddings(latency_ms=args.embed_latency, dim=args.dim)
+
+    # rag reads these at import, so set them before importing it
+    os.environ["RAG_DATA_DIR"] = str(workdir / "data")
+    os.environ["OPENAI_EMBEDDINGS_URL"] = embeddings_url
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    sys.path.insert(0, str(BACKEND_DIR))
+    import ingest
+    import rag
+
+    try:
+        facts = make_corpus(corpus_dir, args.docs, args.pages, args.words_per_page, args.seed)
+        files = sorted(corpus_dir.glob("*.pdf"))
+
+        started = time.perf_counter()
+        if args.bulk:
+            pending = [ingest.PendingFile(str(p), p.name, rag._sha256_file(str(p))) for p in files]
+            failed = [r for r in ingest.ingest_files(pending) if "error" in r]
+            if failed:
+                raise RuntimeError(f"{len(failed)} files failed to ingest, e.g. {failed[0]['error']}")
+        else:
+            for path in files:
+                rag.add_pdf(str(path), original_name=path.name)
+        ingest_seconds = time.perf_counter() - started
+        chunks = rag.collection.count()
+
+        rng = random.Random(args.seed + 1)
+        queries = rng.sample(facts, min(args.queries, len(facts)))
+        rag.search(queries[0][0], top_k=args.top_k)  # warm up the query path
+        latencies: List[float] = []
+        hits = 0
+        for query, expected in queries:
+            start = time.perf_counter()
+            results = rag.search(query, top_k=args.top_k)
+            latencies.append(time.perf_counter() - start)
+            if any(r["name"] == expected for r in results):
+                hits += 1
+
+        pages = args.docs * args.pages
+        report = {
+            "docs": args.docs,
+            "pages": pages,
+            "chunks": chunks,
+            "ingest_seconds": round(ingest_seconds, 3),
+            "pages_per_s": round(pages / ingest_seconds, 1),
+            "chunks_per_s": round(chunks / ingest_seconds, 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "queries": len(queries),
+            "query_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "query_p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "query_p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            f"recall@{args.top_k}": round(hits / len(queries), 3),
+        }
+    finally:
+        embeddings.shutdown()
+        if args.keep:
+            print(f"corpus and store kept in {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        width = max(len(k) for k in report)
+        for key, value in report.items():
+            print(f"{key:<{width}}  {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Local stand-in for the OpenAI embeddings endpoint used by benchmarks.
+
+Vectors are deterministic hashed bags of words: each word adds +1 or -1 to a
+dimension chosen by its hash, and the result is L2-normalized. Texts sharing
+words get similar vectors, so retrieval quality can be measured without a
+real model, and a configurable per-request latency simulates the provider.
+"""
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def embed(text: str, dim: int = 256) -> List[float]:
+    """Hashed bag-of-words vector of text."""
+    vector = [0.0] * dim
+    for word in WORD_RE.findall(text.lower()):
+        h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+        vector[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm:
+        vector = [v / norm for v in vector]
+    return vector
+
+
+def start_fake_embeddings(port: int = 0, latency_ms: float = 0.0,
+                          dim: int = 256) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the fake endpoint on a background thread. Returns the server and its embeddings URL."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes; without this, delayed ACKs add ~40 ms per request
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            texts = payload.get("input") or []
+            if isinstance(texts, str):
+                texts = [texts]
+            if latency_ms:
+                time.sleep(latency_ms / 1000.0)
+            body = json.dumps({
+                "object": "list",
+                "data": [{"object": "embedding", "index": i, "embedding": embed(t, dim)}
+                         for i, t in enumerate(texts)],
+                "model": payload.get("model", "fake"),
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="fake-embeddings", daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}/v1/embeddings"
@@ -0,0 +1,37 @@
+"""
+Local stand-in for the LiveKit room service used by load tests.
+
+The LiveKit server SDK talks Twirp with protobuf bodies; an empty protobuf body
+decodes to an empty response message, so answering every call with 200 and no
+content is enough for ListRooms and friends.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+
+def start_livekit_stub(port: int = 0, latency_ms: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub on a background thread. Returns the server and its URL."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            if latency_ms:
+                time.sleep(latency_ms / 1000.0)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/protobuf")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="livekit-stub", daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
@@ -0,0 +1,263 @@
+"""
+Multi-meeting load test of the HTTP server.
+
+Simulates concurrent meetings against server.py, with LiveKit replaced by a
+local stub and embeddings by the local fake endpoint. Each meeting does:
+- a /getToken burst at start: the host gets a new room, the other
+  participants join it
+- one /transcriptions line per participant every few seconds
+- /documents polling
+- an occasional /uploadDoc
+
+The meeting count ramps through several stages. Each stage reports
+per-route latency percentiles and error rates. The saturation point is the
+first stage whose error rate or p95 latency exceeds the limits.
+
+    python bench/load_meetings.py --ramp 5,10,20,40 --stage-duration 30 --participants 4
+"""
+import argparse
+import base64
+import http.client
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from bench_rag import make_pdf
+from fake_embeddings import start_fake_embeddings
+from livekit_stub import start_livekit_stub
+from load_server import _free_port, percentile, start_server
+
+ROUTES = ("/getToken", "/transcriptions", "/documents", "/uploadDoc")
+
+
+class Recorder:
+    """Latencies and errors per route, shared by all simulated clients."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {route: [] for route in ROUTES}
+        self.errors: Dict[str, int] = {route: 0 for route in ROUTES}
+
+    def record(self, route: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.latencies[route].append(seconds)
+            else:
+                self.errors[route] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        out = {}
+        for route in ROUTES:
+            ok, errors = self.latencies[route], self.errors[route]
+            total = len(ok) + errors
+            out[route] = {
+                "requests": total,
+                "rps": total / elapsed if elapsed else 0.0,
+                "error_rate": errors / total if total else 0.0,
+                "p50_ms": percentile(ok, 50) * 1000,
+                "p95_ms": percentile(ok, 95) * 1000,
+                "p99_ms": percentile(ok, 99) * 1000,
+            }
+        return out
+
+
+class Client:
+    """One keep-alive connection that records every request it makes."""
+
+    def __init__(self, port: int, recorder: Recorder):
+        self.port = port
+        self.recorder = recorder
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    def request(self, route: str, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers or {})
+            resp = self.conn.getresponse()
+            data = resp.read()
+        except (OSError, http.client.HTTPException):
+            self.recorder.record(route, time.perf_counter() - start, False)
+            self.conn.close()
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            return 0, b""
+        self.recorder.record(route, time.perf_counter() - start, resp.status < 400)
+        return resp.status, data
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def _room_from_token(token: bytes) -> Optional[str]:
+    """Room granted by a LiveKit JWT, read from its unverified payload."""
+    try:
+        payload = token.decode().split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return claims["video"]["room"]
+    except (IndexError, KeyError, ValueError):
+        return None
+
+
+def _multipart(filename: str, content: bytes) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n").encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def _sleep_until(t: float, deadline: float) -> bool:
+    """Sleep until t; False if the deadline comes first."""
+    if t >= deadline:
+        time.sleep(max(0.0, deadline - time.time()))
+        return False
+    time.sleep(max(0.0, t - time.time()))
+    return True
+
+
+def run_meeting(port: int, meeting: str, args: argparse.Namespace, recorder: Recorder,
+                deadline: float, rooms: List[str], workdir: Path) -> None:
+    """One meeting: token burst, then transcription streams, polling and uploads until deadline."""
+    rng = random.Random(meeting)
+    host = Client(port, recorder)
+    status, token = host.request("/getToken", "GET", f"/getToken?name={meeting}-host")
+    room = (_room_from_token(token) if status == 200 else None) or f"{meeting}-room"
+    rooms.append(room)
+
+    def participant(i: int) -> None:
+        client = Client(port, recorder)
+        client.request("/getToken", "GET", f"/getToken?name={meeting}-p{i}&room={room}")
+        seq = 0
+        next_at = time.time() + rng.uniform(0, args.transcript_interval)
+        while _sleep_until(next_at, deadline):
+            seq += 1
+            body = json.dumps({"room": room, "type": "user", "participant": f"p{i}",
+                               "text": f"{meeting} participant {i} line {seq}",
+                               "ts": time.time() * 1000}).encode()
+            client.request("/transcriptions", "POST", "/transcriptions", body=body,
+                           headers={"Content-Type": "application/json"})
+            next_at += args.transcript_interval * rng.uniform(0.5, 1.5)
+        client.close()
+
+    threads = [threading.Thread(target=participant, args=(i,), daemon=True)
+               for i in range(1, args.participants)]
+    for t in threads:
+        t.start()
+
+    # The host also polls the document list and now and then uploads a PDF
+    seq = 0
+    next_at = time.time() + rng.uniform(0, args.poll_interval)
+    while _sleep_until(next_at, deadline):
+        host.request("/documents", "GET", "/documents?page_size=50")
+        if rng.random() < args.upload_probability:
+            seq += 1
+            path = workdir / f"{meeting}-{seq}.pdf"
+            make_pdf(path, [[f"Notes from {meeting} upload {seq}: sprint goal, blockers and action items."]])
+            body, content_type = _multipart(path.name, path.read_bytes())
+            host.request("/uploadDoc", "POST", "/uploadDoc", body=body, headers={"Content-Type": content_type})
+        next_at += args.poll_interval
+    host.close()
+    for t in threads:
+        t.join()
+
+
+def run_stage(port: int, meetings: int, args: argparse.Namespace, stage: int,
+              rooms: List[str], workdir: Path) -> Dict[str, Dict[str, float]]:
+    recorder = Recorder()
+    started = time.time()
+    deadline = started + args.stage_duration
+    threads = [threading.Thread(target=run_meeting, daemon=True,
+                                args=(port, f"s{stage}-m{m}", args, recorder, deadline, rooms, workdir))
+               for m in range(meetings)]
+    for t in threads:
+        t.start()
+        # Meetings start spread over the first seconds, not all in the same instant
+        time.sleep(args.start_spread / max(1, meetings))
+    for t in threads:
+        t.join()
+    return recorder.summary(time.time() - started)
+
+
+def saturated(summary: Dict[str, Dict[str, float]], args: argparse.Namespace) -> List[str]:
+    """Reasons this stage is past saturation, if any."""
+    reasons = []
+    for route, r in summary.items():
+        if r["requests"] and r["error_rate"] > args.max_error_rate:
+            reasons.append(f"{route} error rate {r['error_rate']:.1%}")
+        if route != "/uploadDoc" and r["requests"] and r["p95_ms"] > args.slo_ms:
+            reasons.append(f"{route} p95 {r['p95_ms']:.0f} ms")
+    return reasons
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", default="asgi", help="server mode: dev or asgi")
+    parser.add_argument("--ramp", default="5,10,20,40", help="comma separated meeting counts per stage")
+    parser.add_argument("--stage-duration", type=float, default=30.0, help="seconds per stage")
+    parser.add_argument("--participants", type=int, default=4, help="participants per meeting")
+    parser.add_argument("--transcript-interval", type=float, default=3.0,
+                        help="mean seconds between transcription lines per participant")
+    parser.add_argument("--poll-interval", type=float, default=10.0, help="seconds between /documents polls")
+    parser.add_argument("--upload-probability", type=float, default=0.05,
+                        help="chance of an upload at each poll")
+    parser.add_argument("--start-spread", type=float, default=2.0, help="seconds over which meetings start")
+    parser.add_argument("--livekit-latency", type=float, default=10.0, help="simulated LiveKit latency in ms")
+    parser.add_argument("--embed-latency", type=float, default=50.0, help="simulated embeddings latency in ms")
+    parser.add_argument("--slo-ms", type=float, default=500.0, help="p95 latency limit for saturation")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="error rate limit for saturation")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="load-meetings-"))
+    stub, livekit_url = start_livekit_stub(latency_ms=args.livekit_latency)
+    embeddings, embeddings_url = start_fake_embeddings(latency_ms=args.embed_latency)
+    port = _free_port()
+    proc = start_server(args.mode, port, livekit_url, extra_env={
+        "RAG_DATA_DIR": str(workdir / "data"),
+        "OPENAI_EMBEDDINGS_URL": embeddings_url,
+        "OPENAI_API_KEY": "loadtest",
+        # Rolling summaries would call the real chat API
+        "SUMMARY_INTERVAL": "0",
+    })
+    rooms: List[str] = []
+    stages = []
+    saturation: Optional[Tuple[int, List[str]]] = None
+    try:
+        for stage, meetings in enumerate(int(m) for m in args.ramp.split(",")):
+            summary = run_stage(port, meetings, args, stage, rooms, workdir)
+            stages.append({"meetings": meetings, "routes": summary})
+            reasons = saturated(summary, args)
+            if not args.json:
+                print(f"\n{meetings} meetings x {args.participants} participants")
+                print(f"  {'route':<16} {'req':>7} {'req/s':>8} {'err %':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+                for route, r in summary.items():
+                    print(f"  {route:<16} {r['requests']:>7} {r['rps']:>8.1f} {r['error_rate'] * 100:>6.1f} "
+                          f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+            if reasons:
+                saturation = (meetings, reasons)
+                break
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        stub.shutdown()
+        embeddings.shutdown()
+        # Transcripts and summaries live under RAG_DATA_DIR, inside workdir
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({"stages": stages, "saturation": saturation and
+                          {"meetings": saturation[0], "reasons": saturation[1]}}, indent=2))
+    elif saturation:
+        last_ok = stages[-2]["meetings"] if len(stages) > 1 else 0
+        print(f"\nsaturation between {last_ok} and {saturation[0]} meetings: {'; '.join(saturation[1])}")
+    else:
+        print(f"\nno saturation up to {stages[-1]['meetings'] if stages else 0} meetings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Throughput comparison of the development server and the ASGI serving mode.
+
+Starts a LiveKit stub, then runs server.py under each mode and hammers
+/getToken (without a room, so every request lists rooms through LiveKit) and
+/transcriptions from a pool of keep-alive clients. Prints requests/s and
+latency percentiles per route and the relative gain.
+
+    python bench/load_server.py --concurrency 32 --duration 15 --livekit-latency 20
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from livekit_stub import start_livekit_stub
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+ROOM_PREFIX = "loadtest-"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(port: int, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not start on port {port}")
+
+
+def start_server(mode: str, port: int, livekit_url: str,
+                 extra_env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    """Start server.py in the given mode ("dev" or "asgi") as a subprocess."""
+    env = dict(
+        os.environ,
+        LIVEKIT_URL=livekit_url,
+        LIVEKIT_API_KEY=os.getenv("LIVEKIT_API_KEY", "loadtest-key"),
+        LIVEKIT_API_SECRET=os.getenv("LIVEKIT_API_SECRET", "loadtest-secret-loadtest-secret"),
+        SERVER_HOST="127.0.0.1",
+        SERVER_PORT=str(port),
+        **(extra_env or {}),
+    )
+    if mode == "dev":
+        cmd = [sys.executable, "-c",
+               f"from server import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    elif mode == "asgi":
+        cmd = [sys.executable, "asgi.py"]
+    else:
+        raise ValueError(f"unknown mode {mode}")
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _wait_until_up(port, proc)
+    return proc
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def hammer(port: int, route: str, concurrency: int, duration: float) -> Dict[str, float]:
+    """Send requests to one route from `concurrency` keep-alive clients for `duration` seconds."""
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def worker(worker_id: int) -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local: List[float] = []
+        local_errors = 0
+        seq = 0
+        while time.time() < deadline:
+            seq += 1
+            start = time.perf_counter()
+            try:
+                if route == "/getToken":
+                    conn.request("GET", f"/getToken?name=load-{worker_id}")
+                else:
+                    body = json.dumps({
+                        "room": f"{ROOM_PREFIX}{worker_id % 8}",
+                        "type": "user",
+                        "text": f"line {seq} from worker {worker_id}",
+                        "ts": time.time() * 1000,
+                        "participant": f"p{worker_id}",
+                    })
+                    conn.request("POST", "/transcriptions", body=body,
+                                 headers={"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status >= 400:
+                    local_errors += 1
+                else:
+                    local.append(time.perf_counter() - start)
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - started
+    return {
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "ok": len(latencies),
+        "errors": errors[0],
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "mean_ms": (statistics.mean(latencies) * 1000) if latencies else 0.0,
+    }
+
+
+def _cleanup_transcripts() -> None:
+    for path in (BACKEND_DIR / "data" / "transcripts").glob(f"{ROOM_PREFIX}*.txt"):
+        path.unlink(missing_ok=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="dev,asgi", help="comma separated: dev, asgi")
+    parser.add_argument("--routes", default="/getToken,/transcriptions")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per route")
+    parser.add_argument("--livekit-latency", type=float, default=10.0,
+                        help="simulated LiveKit API latency in ms")
+    args = parser.parse_args()
+
+    stub, livekit_url = start_livekit_stub(latency_ms=args.livekit_latency)
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    try:
+        for mode in args.modes.split(","):
+            port = _free_port()
+            # Rolling summaries would call the real chat API
+            proc = start_server(mode, port, livekit_url, extra_env={"SUMMARY_INTERVAL": "0"})
+            try:
+                results[mode] = {}
+                for route in args.routes.split(","):
+                    results[mode][route] = hammer(port, route, args.concurrency, args.duration)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=10)
+    finally:
+        stub.shutdown()
+        _cleanup_transcripts()
+
+    print(f"{'mode':<6} {'route':<16} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for mode, routes in results.items():
+        for route, r in routes.items():
+            print(f"{mode:<6} {route:<16} {r['rps']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['errors']:>7}")
+    if "dev" in results and "asgi" in results:
+        for route in results["dev"]:
+            base = results["dev"][route]["rps"]
+            if base:
+                print(f"throughput gain on {route}: {results['asgi'][route]['rps'] / base:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Session bring-up orchestration for agent jobs.
+
+Bring-up steps (connecting to the room, starting the agent session, starting
+the avatar, greeting) are registered as phases with their dependencies. Each
+phase starts as soon as the phases it depends on have finished, so independent
+steps overlap, and every phase's start offset and duration is recorded along
+with the time to the agent's first spoken word. The report is logged once
+all phases have settled.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+try:
+    from .metrics import BRINGUP_PHASE_SECONDS, TIME_TO_FIRST_WORD_SECONDS  # local module when packaged
+except ImportError:
+    from metrics import BRINGUP_PHASE_SECONDS, TIME_TO_FIRST_WORD_SECONDS  # fallback when running directly
+
+logger = logging.getLogger("agent-bringup")
+
+
+class BringUp:
+    """Dependency-ordered, concurrent runner for bring-up phases with per-phase timings."""
+
+    def __init__(self, job_id: str = "", room: str = ""):
+        self.job_id = job_id
+        self.room = room
+        self.started_at = time.perf_counter()
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.marks: Dict[str, float] = {}
+        self._recorded = False
+        self._phases: Dict[str, tuple] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000.0
+
+    def phase(self, name: str, fn: Callable[[], Awaitable[Any]], depends_on: Iterable[str] = ()) -> None:
+        """Register a phase; fn runs once every phase in depends_on has succeeded."""
+        self._phases[name] = (fn, tuple(depends_on))
+
+    async def _run_phase(self, name: str) -> Any:
+        fn, depends_on = self._phases[name]
+        if depends_on:
+            # Raises if a dependency failed, so dependents don't run
+            await asyncio.gather(*(self._tasks[dep] for dep in depends_on))
+        start = self._elapsed_ms()
+        try:
+            return await fn()
+        finally:
+            self.timings[name] = {"start_ms": round(start, 1), "duration_ms": round(self._elapsed_ms() - start, 1)}
+
+    async def run(self) -> Dict[str, Any]:
+        """Run all phases. Returns their results; re-raises the first failure after all settle."""
+        for name, (_, depends_on) in self._phases.items():
+            missing = [dep for dep in depends_on if dep not in self._phases]
+            if missing:
+                raise ValueError(f"Phase {name} depends on unknown phases: {missing}")
+        self._tasks = {name: asyncio.create_task(self._run_phase(name), name=f"bringup:{name}")
+                       for name in self._phases}
+        results = await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self.mark("bringup_complete")
+        self.log()
+        for name, result in zip(self._tasks, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Bring-up phase {name} failed: {result!r}")
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return dict(zip(self._tasks, results))
+
+    def mark(self, name: str) -> Optional[float]:
+        """Record the first time an event happens, in ms since bring-up began."""
+        if name not in self.marks:
+            self.marks[name] = round(self._elapsed_ms(), 1)
+        return self.marks[name]
+
+    @property
+    def time_to_first_word_ms(self) -> Optional[float]:
+        return self.marks.get("first_word")
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "room": self.room,
+            "phases": self.timings,
+            "marks": self.marks,
+            "time_to_first_word_ms": self.time_to_first_word_ms,
+        }
+
+    def log(self) -> None:
+        logger.info(f"bring-up timings: {json.dumps(self.report())}")
+        if not self._recorded:
+            self._recorded = True
+            for name, timing in self.timings.items():
+                BRINGUP_PHASE_SECONDS.observe(timing["duration_ms"] / 1000.0, phase=name)
+            if self.time_to_first_word_ms is not None:
+                TIME_TO_FIRST_WORD_SECONDS.observe(self.time_to_first_word_ms / 1000.0)
@@ -0,0 +1,274 @@
+"""
+Maintenance commands for the pdf_documents vector index.
+
+    python index_maint.py health [--sample 50] [--json]
+    python index_maint.py prune-orphans [--dry-run] [--grace 3600]
+    python index_maint.py rebuild
+
+health reports:
+- chunk and document counts
+- chunks whose stored PDF is gone, and stored PDFs no chunk references
+- on-disk size
+- the index parameters in effect
+- query latency over a sample of stored vectors (no embedding calls)
+
+prune-orphans deletes both kinds of orphans. Stored PDFs younger than
+--grace seconds are kept, since an upload stores its PDF before its chunks
+are embedded and added. Each orphan is checked again just before it is
+deleted. It can run next to a live server, but a document deleted or
+updated by another process between the check and the delete is not
+protected, so prefer running it while the server is stopped.
+
+rebuild copies every chunk, with its stored vector, into a fresh collection
+created with the current RAG_HNSW_* parameters. It then swaps the new
+collection in under the original name. This drops the tombstones left by
+deletes and re-uploads, and applies parameter changes. It also removes the
+retired collection's index files and vacuums Chroma's SQLite file. Run it with the
+server and agents stopped: other processes keep a handle to the old collection.
+If it is interrupted between the two renames, rag restores the retired
+collection the next time it opens the store; a retired collection left after
+the swap is dropped by the next rebuild.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Tuple
+
+try:
+    from . import rag  # local module when packaged
+except ImportError:
+    import rag  # fallback when running scripts directly from the backend directory
+
+REBUILD_SUFFIX = "-rebuild"
+# Seconds a stored PDF without chunks is left alone, as its upload may still be embedding
+PRUNE_GRACE_SECONDS = float(os.getenv("INDEX_PRUNE_GRACE_SECONDS", "3600"))
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _pdf_exists(metadata: Dict[str, Any]) -> bool:
+    sha256 = metadata.get("sha256")
+    if sha256:
+        return os.path.exists(rag.stored_pdf_path(sha256))
+    # Documents ingested before content addressing are stored by doc_id
+    return os.path.exists(os.path.join(rag.STORE_DIR, f"{metadata.get('doc_id')}.pdf"))
+
+
+def find_orphans() -> Tuple[Dict[str, int], List[str]]:
+    """
+    Returns ({doc_id: chunk_count} for documents whose PDF is missing,
+    [paths of stored PDFs no chunk references]).
+    """
+    orphan_docs: Dict[str, int] = {}
+    referenced = set()
+    checked: Dict[str, bool] = {}
+    for page in rag.iter_records(include_embeddings=False, include_documents=False):
+        for metadata in page["metadatas"]:
+            doc_id = metadata.get("doc_id", "")
+            referenced.add(metadata.get("sha256") or doc_id)
+            if doc_id not in checked:
+                checked[doc_id] = _pdf_exists(metadata)
+            if not checked[doc_id]:
+                orphan_docs[doc_id] = orphan_docs.get(doc_id, 0) + 1
+
+    orphan_files = []
+    if os.path.isdir(rag.STORE_DIR):
+        for name in sorted(os.listdir(rag.STORE_DIR)):
+            stem, ext = os.path.splitext(name)
+            if ext == ".pdf" and stem not in referenced:
+                orphan_files.append(os.path.join(rag.STORE_DIR, name))
+    return orphan_docs, orphan_files
+
+
+def sample_query_latency(sample: int = 50, top_k: int = 5) -> Dict[str, float]:
+    """Time collection.query with stored vectors as queries, in milliseconds."""
+    ids = rag.collection.get(include=[])["ids"]
+    if not ids or sample <= 0:
+        return {"queries": 0}
+    picked = random.sample(ids, min(sample, len(ids)))
+    vectors = rag.collection.get(ids=picked, include=["embeddings"])["embeddings"]
+    timings = []
+    for vector in vectors:
+        start = time.perf_counter()
+        rag.collection.query(query_embeddings=[vector], n_results=min(top_k, len(ids)), include=[])
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    def pct(p: float) -> float:
+        return round(timings[min(len(timings) - 1, int(round(p / 100 * (len(timings) - 1))))], 2)
+
+    return {"queries": len(timings), "p50_ms": pct(50), "p95_ms": pct(95), "max_ms": round(timings[-1], 2)}
+
+
+def health(sample: int = 50) -> Dict[str, Any]:
+    orphan_docs, orphan_files = find_orphans()
+    return {
+        "collection": rag.COLLECTION_NAME,
+        "chunks": rag.collection.count(),
+        "documents": len(rag.list_documents()),
+        "orphaned_chunks": sum(orphan_docs.values()),
+        "orphaned_documents": sorted(orphan_docs),
+        "orphaned_files": len(orphan_files),
+        "index_bytes": _dir_size(rag.CHROMA_DIR),
+        "store_bytes": _dir_size(rag.STORE_DIR),
+        "index_metadata": {k: v for k, v in (rag.collection.metadata or {}).items() if k.startswith("hnsw:")},
+        "configured_metadata": rag.HNSW_METADATA,
+        "query_latency": sample_query_latency(sample),
+    }
+
+
+def _age(path: str) -> float:
+    """Seconds since path was last written or renamed into place."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 0.0
+    return time.time() - max(st.st_mtime, st.st_ctime)
+
+
+def _still_orphaned_doc(doc_id: str) -> bool:
+    current = rag.collection.get(where={"doc_id": doc_id}, include=["metadatas"])
+    return bool(current["ids"]) and not any(_pdf_exists(m) for m in current["metadatas"])
+
+
+def _still_orphaned_file(path: str) -> bool:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return (os.path.exists(path)
+            and not rag.collection.get(where={"sha256": stem}, limit=1, include=[])["ids"]
+            and not rag.collection.get(where={"doc_id": stem}, limit=1, include=[])["ids"])
+
+
+def prune_orphans(dry_run: bool = False, grace_seconds: float = PRUNE_GRACE_SECONDS) -> Dict[str, Any]:
+    """
+    Delete chunks whose PDF is missing and PDFs no chunk references, except
+    PDFs written in the last grace_seconds.
+    """
+    orphan_docs, orphan_files = find_orphans()
+    orphan_files = [p for p in orphan_files if _age(p) >= grace_seconds]
+    if not dry_run:
+        with rag._write_lock:
+            # The scan was paged and ran without the lock, so documents may have
+            # been updated or uploads finished since; recheck before deleting
+            orphan_docs = {d: n for d, n in orphan_docs.items() if _still_orphaned_doc(d)}
+            orphan_files = [p for p in orphan_files if _still_orphaned_file(p)]
+            for doc_id in orphan_docs:
+                rag.collection.delete(where={"doc_id": doc_id})
+            for path in orphan_files:
+                os.remove(path)
+            if orphan_docs:
+                rag._bump_version()
+    return {"dry_run": dry_run, "deleted_chunks": sum(orphan_docs.values()),
+            "deleted_documents": sorted(orphan_docs), "deleted_files": [os.path.basename(p) for p in orphan_files]}
+
+
+def _compact_storage() -> None:
+    """
+    Reclaim space Chroma leaves behind after deleting a collection: index
+    directories of segments that no longer exist, and free SQLite pages.
+    """
+    db_path = os.path.join(rag.CHROMA_DIR, "chroma.sqlite3")
+    if not os.path.exists(db_path):
+        return
+    db = sqlite3.connect(db_path)
+    try:
+        live = {row[0] for row in db.execute("SELECT id FROM segments")}
+        for name in os.listdir(rag.CHROMA_DIR):
+            path = os.path.join(rag.CHROMA_DIR, name)
+            try:
+                uuid.UUID(name)
+            except ValueError:
+                continue
+            if os.path.isdir(path) and name not in live:
+                shutil.rmtree(path, ignore_errors=True)
+        db.execute("VACUUM")
+    finally:
+        db.close()
+
+
+def rebuild(batch_size: int = 1000) -> Dict[str, Any]:
+    """Copy the collection into a fresh one with the configured parameters and swap it in."""
+    client = rag.chroma_client
+    batch_size = min(batch_size, client.get_max_batch_size())
+    tmp_name = rag.COLLECTION_NAME + REBUILD_SUFFIX
+    # Leftovers from an interrupted rebuild. rag already renamed a retired
+    # collection back if the swap was cut short, so any still here are copies
+    for name in [getattr(c, "name", c) for c in client.list_collections()]:
+        if name == tmp_name or name.startswith(rag.RETIRED_PREFIX):
+            client.delete_collection(name)
+
+    size_before = _dir_size(rag.CHROMA_DIR)
+    started = time.perf_counter()
+    with rag._write_lock:
+        version = rag.collection_version()
+        count = rag.collection.count()
+        fresh = client.create_collection(tmp_name, metadata=rag.COLLECTION_METADATA)
+        try:
+            for page in rag.iter_records(batch_size=batch_size):
+                fresh.add(ids=page["ids"], documents=page["documents"],
+                          metadatas=page["metadatas"], embeddings=page["embeddings"])
+            if fresh.count() != count or rag.collection_version() != version:
+                raise RuntimeError("collection changed during rebuild; stop all writers and retry")
+        except BaseException:
+            client.delete_collection(tmp_name)
+            raise
+
+        rag._swap_collection(fresh)
+        _compact_storage()
+
+    return {
+        "chunks": count,
+        "seconds": round(time.perf_counter() - started, 2),
+        "index_bytes_before": size_before,
+        "index_bytes_after": _dir_size(rag.CHROMA_DIR),
+        "index_metadata": rag.HNSW_METADATA,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    health_cmd = commands.add_parser("health", help="report index health")
+    health_cmd.add_argument("--sample", type=int, default=50, help="vectors to time queries with")
+    health_cmd.add_argument("--json", action="store_true", help="print the report as JSON")
+    prune = commands.add_parser("prune-orphans", help="delete chunks without a PDF and PDFs without chunks")
+    prune.add_argument("--dry-run", action="store_true")
+    prune.add_argument("--grace", type=float, default=PRUNE_GRACE_SECONDS,
+                       help="keep stored PDFs younger than this many seconds")
+    rebuild_cmd = commands.add_parser("rebuild", help="rebuild the collection and swap it in (offline)")
+    rebuild_cmd.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.command == "health":
+        report = health(args.sample)
+        if not args.json:
+            for key, value in report.items():
+                print(f"{key:<20} {value}")
+            return
+    elif args.command == "prune-orphans":
+        report = prune_orphans(args.dry_run, args.grace)
+    else:
+        try:
+            report = rebuild(args.batch_size)
+        except RuntimeError as e:
+            print(f"rebuild failed: {e}", file=sys.stderr)
+            sys.exit(1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Bulk ingestion pipeline.
+
+Ingesting documents one rag.add_pdf call at a time parses them serially and
+sends one embedding request per document. This pipeline extracts files in
+parallel, packs their chunks into shared embedding batches that run
+concurrently, and then indexes each document, reporting a result per file.
+
+Large uploads are ingested in windows of a few files, each admitted as its own
+job, so only one window's chunks and vectors are held in memory at a time and
+the admission estimate matches what is actually in flight.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple
+
+try:
+    from . import admission, rag  # local module when packaged
+    from .metrics import RAG_ERRORS, RAG_STAGE_SECONDS
+except ImportError:
+    import admission, rag  # fallback when running scripts directly from the backend directory
+    from metrics import RAG_ERRORS, RAG_STAGE_SECONDS
+
+# Threads parsing PDFs at the same time
+EXTRACT_WORKERS = int(os.getenv("INGEST_EXTRACT_WORKERS", str(min(8, (os.cpu_count() or 2)))))
+# Embedding requests in flight at the same time
+EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+# Most files ingested together in one admitted window
+WINDOW_FILES = int(os.getenv("INGEST_WINDOW_FILES", "16"))
+
+
+class PendingFile(NamedTuple):
+    """A received file waiting to be ingested."""
+    path: str
+    filename: str
+    sha256: str
+
+
+class _Document:
+    def __init__(self, pending: PendingFile):
+        self.filename = pending.filename
+        self.doc_id = rag.new_doc_id()
+        self.sha256 = pending.sha256
+        self.stored_path = ""
+        self.chunks: List[str] = []
+        self.embeddings: List[List[float]] = []
+        self.chunk_count = 0
+        self.error: str | None = None
+
+
+def _extract(doc: _Document, pending: PendingFile) -> None:
+    try:
+        doc.stored_path, doc.sha256 = rag._store_pdf(pending.path, pending.sha256)
+        doc.chunks = rag._extract_chunks(doc.stored_path)
+        if not doc.chunks:
+            doc.error = f"No extractable text in {doc.filename}"
+    except Exception as e:
+        doc.error = f"Failed to read {doc.filename}: {e}"
+
+
+def _embed_all(docs: List[_Document]) -> None:
+    """Embed every document's chunks using batches shared across documents."""
+    # (document, chunk) pairs in a flat list so batches can span documents
+    owners = [(doc, i) for doc in docs if not doc.error for i in range(len(doc.chunks))]
+    for doc in docs:
+        if not doc.error:
+            doc.embeddings = [None] * len(doc.chunks)
+
+    batches = [owners[start:start + rag.EMBED_BATCH_SIZE]
+               for start in range(0, len(owners), rag.EMBED_BATCH_SIZE)]
+
+    def embed_batch(batch):
+        try:
+            vectors = rag._embed_texts([doc.chunks[i] for doc, i in batch])
+        except Exception as e:
+            for doc, _ in batch:
+                doc.error = doc.error or f"Embedding failed: {e}"
+            return
+        for (doc, i), vector in zip(batch, vectors):
+            doc.embeddings[i] = vector
+
+    with ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY, thread_name_prefix="ingest-embed") as pool:
+        list(pool.map(embed_batch, batches))
+
+
+def _windows(files: List[PendingFile]) -> List[List[PendingFile]]:
+    """
+    Split files into windows of at most WINDOW_FILES files whose estimated
+    memory fits a share of the ingestion budget, so several windows can be
+    admitted at once. A file bigger than that share gets a window of its own.
+    """
+    gate = admission.INGESTION
+    window_budget = gate.memory_budget / gate.max_concurrent
+    windows: List[List[PendingFile]] = []
+    window: List[PendingFile] = []
+    window_bytes = 0
+    for pending in files:
+        size = os.path.getsize(pending.path)
+        if window and (len(window) >= WINDOW_FILES
+                       or (window_bytes + size) * gate.memory_factor > window_budget):
+            windows.append(window)
+            window, window_bytes = [], 0
+        window.append(pending)
+        window_bytes += size
+    if window:
+        windows.append(window)
+    return windows
+
+
+def ingest_files(files: List[PendingFile]) -> List[Dict[str, Any]]:
+    """
+    Ingest several received files, admitted window by window.
+    Returns one result per file, in order, with either a doc_id or an error.
+    Raises admission.AdmissionRejected when ingestion is saturated before any
+    file was ingested; files in later windows that are rejected get an error.
+    """
+    results: List[Dict[str, Any]] = []
+    for window in _windows(files):
+        try:
+            with admission.INGESTION.admit(sum(os.path.getsize(f.path) for f in window)):
+                results.extend(_ingest_files(window))
+        except admission.AdmissionRejected as e:
+            if not results:
+                raise
+            # Earlier windows are already indexed; report the rest as not ingested
+            for pending in files[len(results):]:
+                RAG_ERRORS.inc(op="bulk_ingest")
+                results.append({"filename": pending.filename, "error": str(e)})
+            break
+    return results
+
+
+def _ingest_files(files: List[PendingFile]) -> List[Dict[str, Any]]:
+    rag._ensure_dirs()
+    docs = [_Document(pending) for pending in files]
+
+    with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS, thread_name_prefix="ingest-extract") as pool:
+        list(pool.map(_extract, docs, files))
+
+    with RAG_STAGE_SECONDS.time(op="bulk_ingest", stage="embed"):
+        _embed_all(docs)
+
+    for doc in docs:
+        if not doc.error:
+            try:
+                with RAG_STAGE_SECONDS.time(op="bulk_ingest", stage="insert"):
+                    rag._index_document(doc.doc_id, doc.filename, doc.sha256, doc.chunks, doc.embeddings)
+            except Exception as e:
+                doc.error = f"Failed to index {doc.filename}: {e}"
+        # Indexed (or failed); the window's text and vectors are no longer needed
+        doc.chunk_count = len(doc.chunks)
+        doc.chunks, doc.embeddings = [], []
+
+    results: List[Dict[str, Any]] = []
+    for doc in docs:
+        if doc.error:
+            RAG_ERRORS.inc(op="bulk_ingest")
+            # Only removed when no indexed document shares the same content
+            if doc.stored_path:
+                rag._remove_stored_pdf(doc.sha256)
+            results.append({"filename": doc.filename, "error": doc.error})
+        else:
+            results.append({"filename": doc.filename, "doc_id": doc.doc_id,
+                            "chunk_count": doc.chunk_count})
+    return results
@@ -1 +1,5 @@
-from .server import MCPServer, MCPServerSse, MCPServerStdio, MCPServerSseParams, MCPServerStdioParams
\ No newline at end of file
+from .server import MCPServer, MCPServerSse, MCPServerStdio, MCPServerSseParams, MCPServerStdioParams
+from .schema_cache import ToolSchemaCache
+from .stdio_pool import StdioServerPool, PooledStdioServer, get_stdio_pool
+from .result_cache import ToolResultCache
+from .resilience import CircuitBreaker, CircuitOpenError, ToolQueueFullError, ToolTimeoutError
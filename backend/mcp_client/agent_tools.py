@@ -8,58 +8,176 @@ from uuid import uuid4
 
 # Import from the MCP module
 from .util import MCPUtil, FunctionTool
+from .results import DEFAULT_MAX_RESULT_TOKENS
 from .server import MCPServer, MCPServerSse
+from .schema_cache import ToolSchemaCache
+from .result_cache import ToolResultCache
 from livekit.agents import ChatContext, AgentSession, JobContext, FunctionTool as Tool
 from mcp import CallToolRequest
 
 logger = logging.getLogger("mcp-agent-tools")
 
+# Per-server deadlines used while preparing tools
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_LIST_TOOLS_TIMEOUT = 10.0
+
+# Keeps background schema refreshes alive until they finish
+_background_tasks: set = set()
+
 class MCPToolsIntegration:
     """
     Helper class for integrating MCP tools with LiveKit agents.
     Provides utilities for registering dynamic tools from MCP servers.
     """
 
+    @staticmethod
+    async def _fetch_server_tools(server: MCPServer,
+                                  auto_connect: bool,
+                                  connect_timeout: float,
+                                  list_tools_timeout: float) -> List[Any]:
+        """Connect to one server if needed and list its tools, each step under its own deadline."""
+        if auto_connect and not getattr(server, 'connected', False):
+            logger.debug(f"Auto-connecting to MCP server: {server.name}")
+            try:
+                await asyncio.wait_for(server.connect(), connect_timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"timed out after {connect_timeout}s connecting")
+
+        logger.info(f"Fetching tools from MCP server: {server.name}")
+        try:
+            return await asyncio.wait_for(server.list_tools(), list_tools_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"timed out after {list_tools_timeout}s listing tools")
+
+    @staticmethod
+    async def _refresh_schema_cache(server: MCPServer,
+                                    schema_cache: ToolSchemaCache,
+                                    auto_connect: bool,
+                                    connect_timeout: float,
+                                    list_tools_timeout: float):
+        """Fetch a server's current tools and update its persisted schemas."""
+        try:
+            if hasattr(server, 'invalidate_tools_cache'):
+                server.invalidate_tools_cache()
+            mcp_tools = await MCPToolsIntegration._fetch_server_tools(
+                server, auto_connect, connect_timeout, list_tools_timeout
+            )
+            if schema_cache.store(server.cache_identity, getattr(server, 'server_version', ''), mcp_tools):
+                logger.info(f"Updated cached tool schemas for {server.name}")
+        except Exception as e:
+            logger.warning(f"Failed to refresh cached tool schemas for {server.name}: {e}")
+
+    @staticmethod
+    def _watch_tools_changed(server: MCPServer, schema_cache: ToolSchemaCache,
+                             connect_timeout: float, list_tools_timeout: float):
+        """Invalidate and refresh persisted schemas when the server announces tools/list_changed."""
+        if not hasattr(server, 'add_tools_changed_listener') or getattr(server, '_schema_cache_watched', False):
+            return
+        server._schema_cache_watched = True
+
+        async def on_tools_changed():
+            schema_cache.invalidate(server.cache_identity)
+            await MCPToolsIntegration._refresh_schema_cache(
+                server, schema_cache, False, connect_timeout, list_tools_timeout
+            )
+
+        server.add_tools_changed_listener(on_tools_changed)
+
+    @staticmethod
+    async def _load_server_tools(server: MCPServer,
+                                 convert_schemas_to_strict: bool,
+                                 auto_connect: bool,
+                                 connect_timeout: float,
+                                 list_tools_timeout: float,
+                                 schema_cache: Optional[ToolSchemaCache] = None,
+                                 result_cache: Optional[ToolResultCache] = None,
+                                 max_result_tokens: int = DEFAULT_MAX_RESULT_TOKENS) -> List[FunctionTool]:
+        """
+        Return FunctionTools for one server. With a schema cache, cached schemas are
+        returned immediately and the server is connected to and re-listed in the
+        background; otherwise the tools are fetched before returning.
+        """
+        if schema_cache is not None:
+            MCPToolsIntegration._watch_tools_changed(server, schema_cache, connect_timeout, list_tools_timeout)
+            cached = schema_cache.load(server.cache_identity)
+            if cached is not None:
+                _, cached_tools = cached
+                logger.info(f"Using {len(cached_tools)} cached tool schemas for {server.name}, refreshing in background")
+                task = asyncio.create_task(MCPToolsIntegration._refresh_schema_cache(
+                    server, schema_cache, auto_connect, connect_timeout, list_tools_timeout
+                ))
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+                return [MCPUtil.to_function_tool(tool, server, convert_schemas_to_strict, result_cache,
+                                                 max_result_tokens) for tool in cached_tools]
+
+        try:
+            mcp_tools = await MCPToolsIntegration._fetch_server_tools(
+                server, auto_connect, connect_timeout, list_tools_timeout
+            )
+        except Exception as e:
+            logger.error(f"Failed to fetch tools from MCP server {server.name}: {e}")
+            return []
+        logger.info(f"Received {len(mcp_tools)} tools from {server.name}")
+
+        if schema_cache is not None:
+            try:
+                schema_cache.store(server.cache_identity, getattr(server, 'server_version', ''), mcp_tools)
+            except Exception as e:
+                logger.warning(f"Failed to cache tool schemas for {server.name}: {e}")
+
+        return [MCPUtil.to_function_tool(tool, server, convert_schemas_to_strict, result_cache,
+                                         max_result_tokens) for tool in mcp_tools]
+
     @staticmethod
     async def prepare_dynamic_tools(mcp_servers: List[MCPServer],
                                    convert_schemas_to_strict: bool = True,
-                                   auto_connect: bool = True) -> List[Callable]:
+                                   auto_connect: bool = True,
+                                   connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                                   list_tools_timeout: float = DEFAULT_LIST_TOOLS_TIMEOUT,
+                                   schema_cache: Optional[ToolSchemaCache] = None,
+                                   result_cache: Optional[ToolResultCache] = None,
+                                   max_result_tokens: int = DEFAULT_MAX_RESULT_TOKENS) -> List[Callable]:
         """
         Fetches tools from multiple MCP servers and prepares them for use with LiveKit agents.
 
+        Servers are connected to and queried concurrently, each under its own
+        deadlines, so startup takes as long as the slowest healthy server. A
+        server that fails or times out is skipped and the others' tools are
+        still returned.
+
+        With a schema_cache, servers whose schemas were persisted by an earlier
+        job register their tools without waiting for the network; the cache is
+        refreshed in the background and on tools/list_changed notifications.
+
+        With a result_cache, calls to the tools it lists are cached for their TTL
+        and identical concurrent calls share one request.
+
         Args:
             mcp_servers: List of MCPServer instances
             convert_schemas_to_strict: Whether to convert JSON schemas to strict format
             auto_connect: Whether to automatically connect to servers if they're not connected
+            connect_timeout: Seconds allowed for connecting to each server
+            list_tools_timeout: Seconds allowed for listing each server's tools
+            schema_cache: Optional on-disk cache of tool schemas
+            result_cache: Optional cache for idempotent tool results
+            max_result_tokens: Budget for each tool result handed to the model
 
         Returns:
             List of decorated tool functions ready to be added to a LiveKit agent
         """
         prepared_tools = []
 
-        # Ensure all servers are connected if auto_connect is True
-        if auto_connect:
-            for server in mcp_servers:
-                if not getattr(server, 'connected', False):
-                    try:
-                        logger.debug(f"Auto-connecting to MCP server: {server.name}")
-                        await server.connect()
-                    except Exception as e:
-                        logger.error(f"Failed to connect to MCP server {server.name}: {e}")
-
-        # Process each server
-        for server in mcp_servers:
-            logger.info(f"Fetching tools from MCP server: {server.name}")
-            try:
-                mcp_tools = await MCPUtil.get_function_tools(
-                    server, convert_schemas_to_strict=convert_schemas_to_strict
-                )
-                logger.info(f"Received {len(mcp_tools)} tools from {server.name}")
-            except Exception as e:
-                logger.error(f"Failed to fetch tools from {server.name}: {e}")
-                continue
+        per_server_tools = await asyncio.gather(*(
+            MCPToolsIntegration._load_server_tools(
+                server, convert_schemas_to_strict, auto_connect, connect_timeout, list_tools_timeout,
+                schema_cache, result_cache, max_result_tokens
+            )
+            for server in mcp_servers
+        ))
 
-            # Process each tool from this server
+        # Process each tool, keeping the order of the servers
+        for mcp_tools in per_server_tools:
             for tool_instance in mcp_tools:
                 try:
                     decorated_tool = MCPToolsIntegration._create_decorated_tool(tool_instance)
@@ -130,7 +248,10 @@ class MCPToolsIntegration:
     @staticmethod
     async def register_with_agent(agent, mcp_servers: List[MCPServer],
                                  convert_schemas_to_strict: bool = True,
-                                 auto_connect: bool = True) -> List[Callable]:
+                                 auto_connect: bool = True,
+                                 schema_cache: Optional[ToolSchemaCache] = None,
+                                 result_cache: Optional[ToolResultCache] = None,
+                                 max_result_tokens: int = DEFAULT_MAX_RESULT_TOKENS) -> List[Callable]:
         """
         Helper method to prepare and register MCP tools with a LiveKit agent.
 
@@ -139,6 +260,9 @@ class MCPToolsIntegration:
             mcp_servers: List of MCPServer instances
             convert_schemas_to_strict: Whether to convert schemas to strict format
             auto_connect: Whether to auto-connect to servers
+            schema_cache: Optional on-disk cache of tool schemas
+            result_cache: Optional cache for idempotent tool results
+            max_result_tokens: Budget for each tool result handed to the model
 
         Returns:
             List of tool functions that were registered
@@ -147,7 +271,10 @@ class MCPToolsIntegration:
         tools = await MCPToolsIntegration.prepare_dynamic_tools(
             mcp_servers,
             convert_schemas_to_strict=convert_schemas_to_strict,
-            auto_connect=auto_connect
+            auto_connect=auto_connect,
+            schema_cache=schema_cache,
+            result_cache=result_cache,
+            max_result_tokens=max_result_tokens,
         )
 
         # Register with the agent
@@ -166,7 +293,12 @@ class MCPToolsIntegration:
 
     @staticmethod
     async def create_agent_with_tools(agent_class, mcp_servers: List[MCPServer], agent_kwargs: Dict = None,
-                                    convert_schemas_to_strict: bool = True) -> Any:
+                                    convert_schemas_to_strict: bool = True,
+                                    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                                    list_tools_timeout: float = DEFAULT_LIST_TOOLS_TIMEOUT,
+                                    schema_cache: Optional[ToolSchemaCache] = None,
+                                    result_cache: Optional[ToolResultCache] = None,
+                                    max_result_tokens: int = DEFAULT_MAX_RESULT_TOKENS) -> Any:
         """
         Factory method to create and initialize an agent with MCP tools already loaded.
 
@@ -175,30 +307,31 @@ class MCPToolsIntegration:
             mcp_servers: List of MCP servers to register with the agent
             agent_kwargs: Additional keyword arguments to pass to the agent constructor
             convert_schemas_to_strict: Whether to convert JSON schemas to strict format
+            connect_timeout: Seconds allowed for connecting to each server
+            list_tools_timeout: Seconds allowed for listing each server's tools
+            schema_cache: Optional on-disk cache of tool schemas
+            result_cache: Optional cache for idempotent tool results
+            max_result_tokens: Budget for each tool result handed to the model
 
         Returns:
             An initialized agent instance with MCP tools registered
         """
-        # Connect to MCP servers
-        for server in mcp_servers:
-            if not getattr(server, 'connected', False):
-                try:
-                    logger.debug(f"Connecting to MCP server: {server.name}")
-                    await server.connect()
-                except Exception as e:
-                    logger.error(f"Failed to connect to MCP server {server.name}: {e}")
-
-        # Create agent instance
-        agent_kwargs = agent_kwargs or {}
-        agent = agent_class(**agent_kwargs)
-
-        # Prepare tools
+        # Connect to MCP servers and prepare their tools concurrently
         tools = await MCPToolsIntegration.prepare_dynamic_tools(
             mcp_servers,
             convert_schemas_to_strict=convert_schemas_to_strict,
-            auto_connect=False  # Already connected above
+            auto_connect=True,
+            connect_timeout=connect_timeout,
+            list_tools_timeout=list_tools_timeout,
+            schema_cache=schema_cache,
+            result_cache=result_cache,
+            max_result_tokens=max_result_tokens,
         )
 
+        # Create agent instance
+        agent_kwargs = agent_kwargs or {}
+        agent = agent_class(**agent_kwargs)
+
         # Register tools with agent
         if tools and hasattr(agent, '_tools') and isinstance(agent._tools, list):
             agent._tools.extend(tools)
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    from ..metrics import REGISTRY  # backend metrics when packaged
+except ImportError:
+    from metrics import REGISTRY  # fallback when running from the backend directory
+
+TOOL_CACHE_LOOKUPS = REGISTRY.counter(
+    "mcp_tool_cache_lookups_total",
+    "Calls to cached MCP tools, by whether they hit the cache, missed, or joined an identical call in flight.",
+    ("tool", "result"))
+_RESULT_LABELS = {"hits": "hit", "misses": "miss", "coalesced": "coalesced"}
+
+
+class ToolResultCache:
+    """
+    Opt-in TTL cache for idempotent MCP tool calls.
+
+    Only tools listed in `ttls` are cached. Calls are keyed by server, tool and
+    canonicalized arguments (sorted keys, compact separators), so argument
+    order does not matter. Identical calls that arrive while one is already in
+    flight wait for that call instead of issuing their own. Error results and
+    exceptions are never cached.
+    """
+
+    def __init__(self, ttls: Dict[str, float], max_entries: int = 1024):
+        """
+        Args:
+            ttls: Seconds to keep results, by tool name. Tools not listed are not cached.
+            max_entries: Least recently used entries are evicted beyond this size.
+        """
+        self.ttls = dict(ttls)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    def ttl_for(self, tool_name: str) -> Optional[float]:
+        ttl = self.ttls.get(tool_name)
+        return ttl if ttl and ttl > 0 else None
+
+    @staticmethod
+    def make_key(server_identity: str, tool_name: str, arguments: Optional[Dict[str, Any]]) -> str:
+        canonical = json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return f"{server_identity}\x00{tool_name}\x00{canonical}"
+
+    @staticmethod
+    def _is_error(result: Any) -> bool:
+        if isinstance(result, dict):
+            return bool(result.get("isError"))
+        return bool(getattr(result, "isError", False))
+
+    def _count(self, stat: str, tool_name: str) -> None:
+        self._stats[stat] += 1
+        TOOL_CACHE_LOOKUPS.inc(tool=tool_name, result=_RESULT_LABELS[stat])
+
+    async def get_or_call(self, server_identity: str, tool_name: str,
+                          arguments: Optional[Dict[str, Any]],
+                          call: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a fresh cached result, join an identical in-flight call, or make the call."""
+        ttl = self.ttl_for(tool_name)
+        if ttl is None:
+            return await call()
+
+        key = self.make_key(server_identity, tool_name, arguments)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._count("hits", tool_name)
+                return value
+            del self._entries[key]
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self._count("coalesced", tool_name)
+            # asyncio.wait doesn't propagate the leader's cancellation to waiters
+            await asyncio.wait({pending})
+            if pending.cancelled():
+                return await self.get_or_call(server_identity, tool_name, arguments, call)
+            return pending.result()
+
+        self._count("misses", tool_name)
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await call()
+        except BaseException as e:
+            if not future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+                    # Waiters re-raise it; mark retrieved so an unawaited future doesn't log
+                    future.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        future.set_result(result)
+        if not self._is_error(result):
+            self._entries[key] = (time.monotonic() + ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return result
+
+    def invalidate(self, tool_name: Optional[str] = None):
+        """Drop cached results for one tool, or all of them."""
+        if tool_name is None:
+            self._entries.clear()
+            return
+        marker = f"\x00{tool_name}\x00"
+        for key in [k for k in self._entries if marker in k]:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/coalescing counters and current sizes."""
+        lookups = self._stats["hits"] + self._stats["misses"] + self._stats["coalesced"]
+        return {
+            **self._stats,
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "hit_rate": (self._stats["hits"] + self._stats["coalesced"]) / lookups if lookups else 0.0,
+        }
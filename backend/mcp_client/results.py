@@ -0,0 +1,115 @@
+import json
+import os
+from typing import Any, List, Optional
+
+# Budget for one tool result handed to the model, in approximate tokens
+DEFAULT_MAX_RESULT_TOKENS = int(os.getenv("MCP_RESULT_MAX_TOKENS", "1000"))
+# Rough chars-per-token ratio used to turn the budget into a length
+CHARS_PER_TOKEN = 4
+
+
+def _field(item: Any, name: str, default: Any = None) -> Any:
+    """Read a field from either a pydantic model or a plain dict."""
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+
+def _compact_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _compact_text(text: str) -> str:
+    """Strip pretty-printing from text that is itself JSON."""
+    stripped = text.strip()
+    if stripped[:1] in ("{", "["):
+        try:
+            return _compact_json(json.loads(stripped))
+        except ValueError:
+            pass
+    return stripped
+
+
+def _content_to_text(item: Any) -> str:
+    """Render one content block of a tool result as text."""
+    if isinstance(item, (str, int, float, bool)):
+        return str(item)
+    kind = _field(item, "type")
+    if kind == "text":
+        return _compact_text(_field(item, "text", ""))
+    if kind in ("image", "audio"):
+        return f"[{kind}: {_field(item, 'mimeType', 'unknown type')}]"
+    if kind == "resource":
+        resource = _field(item, "resource")
+        text = _field(resource, "text")
+        if text:
+            return _compact_text(text)
+        return f"[resource: {_field(resource, 'uri', '')}]"
+    if kind == "resource_link":
+        return f"[resource: {_field(item, 'uri', '')}]"
+    if hasattr(item, "model_dump"):
+        return _compact_json(item.model_dump(mode="json", exclude_none=True))
+    return _compact_json(item)
+
+
+def _fit_json_list(items: List[Any], max_chars: int) -> Optional[str]:
+    """
+    Keep as many leading list items as fit, noting how many were left out.
+    None when not even the first item fits.
+    """
+    kept: List[str] = []
+    used = 2
+    for i, value in enumerate(items):
+        rendered = _compact_json(value)
+        if used + len(rendered) + 1 > max_chars - 40:
+            if not kept:
+                return None
+            return "[" + ",".join(kept) + f"] (+{len(items) - i} more items omitted)"
+        kept.append(rendered)
+        used += len(rendered) + 1
+    return "[" + ",".join(kept) + "]"
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """Cut text to max_chars, saying how much was dropped."""
+    if len(text) <= max_chars:
+        return text
+    # JSON arrays are trimmed by whole items so the model still gets valid records
+    if text[:1] == "[":
+        try:
+            items = json.loads(text)
+            fitted = _fit_json_list(items, max_chars) if isinstance(items, list) else None
+            if fitted is not None:
+                return fitted
+        except ValueError:
+            pass
+    return text[:max_chars] + f"… [truncated {len(text) - max_chars} chars]"
+
+
+def result_to_text(result: Any, max_tokens: int = DEFAULT_MAX_RESULT_TOKENS) -> str:
+    """
+    Marshal a tool result into a lean string for the model.
+
+    Accepts mcp CallToolResult objects as well as plain dicts. Text blocks are
+    used as-is (JSON text is compacted), non-text blocks become short
+    placeholders, structured content is used when there is no text, errors are
+    prefixed with "Error:", and the result is trimmed to max_tokens.
+    """
+    if isinstance(result, (str, int, float, bool)) or result is None:
+        text = "" if result is None else str(result)
+    else:
+        content = _field(result, "content") or []
+        if not isinstance(content, list):
+            content = [content]
+        parts = [part for part in (_content_to_text(item) for item in content) if part]
+        structured = _field(result, "structuredContent")
+        if parts:
+            text = "\n".join(parts)
+        elif structured is not None:
+            text = _compact_json(structured)
+        else:
+            text = ""
+        if _field(result, "isError", False):
+            text = f"Error: {text or 'tool reported an error'}"
+
+    return truncate_text(text, max(1, max_tokens) * CHARS_PER_TOKEN)
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from mcp.types import Tool as MCPTool
+
+logger = logging.getLogger("mcp-schema-cache")
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "MCP_TOOL_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "mcp_tool_cache"),
+)
+
+
+class ToolSchemaCache:
+    """
+    On-disk cache of MCP tool schemas, keyed by server identity.
+
+    Lets a new agent job register a server's tools before it has connected to
+    the server. Each entry records the server version it was fetched from so
+    callers can tell when a refresh brought in a different server.
+
+    Entries read with preload() are kept in memory, so a long-lived process
+    reads each server's file once rather than on every load().
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR):
+        self.directory = directory
+        self._memory: Dict[str, Tuple[str, List[MCPTool]]] = {}
+
+    def _path(self, identity: str) -> str:
+        key = hashlib.sha1(identity.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def preload(self, identities: Iterable[str]) -> int:
+        """Read servers' entries from disk into memory. Returns how many were found."""
+        found = 0
+        for identity in identities:
+            entry = self._read(identity)
+            if entry is not None:
+                self._memory[identity] = entry
+                found += 1
+        return found
+
+    def load(self, identity: str) -> Optional[Tuple[str, List[MCPTool]]]:
+        """Return (server_version, tools) for a server, or None if not cached or unreadable."""
+        entry = self._memory.get(identity)
+        if entry is not None:
+            return entry
+        return self._read(identity)
+
+    def _read(self, identity: str) -> Optional[Tuple[str, List[MCPTool]]]:
+        try:
+            with open(self._path(identity), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("identity") != identity:
+                return None
+            tools = [MCPTool.model_validate(t) for t in entry["tools"]]
+            return entry.get("server_version", ""), tools
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable tool schema cache for {identity}: {e}")
+            return None
+
+    def store(self, identity: str, server_version: str, tools: List[MCPTool]) -> bool:
+        """
+        Persist a server's tools. Returns True if the entry changed.
+        Written atomically so concurrent job processes never read a partial file.
+        """
+        serialized: List[Dict[str, Any]] = [t.model_dump(mode="json", exclude_none=True) for t in tools]
+        cached = self.load(identity)
+        if identity in self._memory:
+            self._memory[identity] = (server_version, list(tools))
+        if cached is not None:
+            cached_version, cached_tools = cached
+            if cached_version == server_version and serialized == [
+                t.model_dump(mode="json", exclude_none=True) for t in cached_tools
+            ]:
+                return False
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(identity)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "identity": identity,
+                "server_version": server_version,
+                "fetched_at": time.time(),
+                "tools": serialized,
+            }, f)
+        os.replace(tmp_path, path)
+        return True
+
+    def invalidate(self, identity: str):
+        """Drop a server's entry, e.g. after a tools/list_changed notification."""
+        self._memory.pop(identity, None)
+        try:
+            os.remove(self._path(identity))
+        except FileNotFoundError:
+            pass
@@ -1,15 +1,31 @@
 import asyncio
 from contextlib import AbstractAsyncContextManager, AsyncExitStack
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 import logging
 
 # Import from the installed mcp package
+import anyio
 from anyio.streams.memory import MemoryObjectReceiveStream, MemoryObjectSendStream
 import mcp.types
 from mcp.types import CallToolResult, JSONRPCMessage, Tool as MCPTool
 from mcp.client.sse import sse_client
+from mcp.client.stdio import StdioServerParameters, stdio_client
 from mcp.client.session import ClientSession
 
+from .resilience import CircuitBreaker, CircuitOpenError, ToolQueueFullError, ToolTimeoutError
+
+# Seconds to wait for a session to shut down before cancelling it
+CLEANUP_TIMEOUT = 5.0
+# Seconds a tool call waits for an in-progress connection
+CONNECT_WAIT_TIMEOUT = 10.0
+# Defaults for tool call deadlines and concurrency
+DEFAULT_CALL_TIMEOUT = 30.0
+DEFAULT_MAX_CONCURRENT_CALLS = 8
+DEFAULT_MAX_QUEUED_CALLS = 32
+# Backoff between attempts to re-establish a dropped session
+RECONNECT_INITIAL_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+
 # Base class for MCP servers
 class MCPServer:
     async def connect(self):
@@ -21,6 +37,11 @@ class MCPServer:
         """A readable name for the server."""
         raise NotImplementedError
 
+    @property
+    def cache_identity(self) -> str:
+        """Stable identity of the server used to key persisted tool schemas."""
+        return self.name
+
     async def list_tools(self) -> List[MCPTool]:
         """List the tools available on the server."""
         raise NotImplementedError
@@ -37,7 +58,16 @@ class MCPServer:
 class _MCPServerWithClientSession(MCPServer):
     """Base class for MCP servers that use a ClientSession to communicate with the server."""
 
-    def __init__(self, cache_tools_list: bool):
+    def __init__(
+        self,
+        cache_tools_list: bool,
+        call_timeout: float = DEFAULT_CALL_TIMEOUT,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        max_concurrent_calls: int = DEFAULT_MAX_CONCURRENT_CALLS,
+        max_queued_calls: int = DEFAULT_MAX_QUEUED_CALLS,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        auto_reconnect: bool = True,
+    ):
         """
         Args:
             cache_tools_list: Whether to cache the tools list. If True, the tools list will be
@@ -45,11 +75,44 @@ class _MCPServerWithClientSession(MCPServer):
             fetched from the server on each call to list_tools(). You should set this to True
             if you know the server will not change its tools list, because it can drastically
             improve latency.
+            call_timeout: Deadline in seconds for a tool call once it has a slot; waiting
+                for a slot is limited to the same time.
+            tool_timeouts: Per-tool deadlines overriding call_timeout.
+            max_concurrent_calls: Tool calls sent to the server at the same time.
+            max_queued_calls: Calls allowed to wait for a slot; further calls fail immediately.
+            circuit_breaker: Breaker that rejects calls after repeated failures.
+                A default CircuitBreaker is used when omitted.
+            auto_reconnect: Whether to re-establish the session in the background
+                when it drops.
         """
         self.session: Optional[ClientSession] = None
-        self.exit_stack: AsyncExitStack = AsyncExitStack()
         self._cleanup_lock: asyncio.Lock = asyncio.Lock()
+        # The transport and session are entered and exited by one owner task, so
+        # connect() and cleanup() can be called from different tasks (anyio
+        # cancel scopes must be exited by the task that entered them)
+        self._session_task: Optional[asyncio.Task] = None
+        # Set by cleanup(); the owner task then exits without reconnecting
+        self._closing: Optional[asyncio.Event] = None
+        # Set when the session must end: on cleanup() or when the transport drops
+        self._ended: Optional[asyncio.Event] = None
+        # Resolved once the current connection attempt has initialized
+        self._ready: Optional[asyncio.Future] = None
         self.cache_tools_list = cache_tools_list
+        # Name and version the server reported during initialization
+        self.server_info: Optional[mcp.types.Implementation] = None
+        self._tools_changed_listeners: List[Callable[[], Any]] = []
+        # Running listener tasks, referenced so they are not garbage collected
+        self._listener_tasks: Set[asyncio.Task] = set()
+
+        self.call_timeout = call_timeout
+        self.tool_timeouts: Dict[str, float] = dict(tool_timeouts or {})
+        self.max_queued_calls = max_queued_calls
+        self._call_slots = asyncio.Semaphore(max_concurrent_calls)
+        self._queued_calls = 0
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.auto_reconnect = auto_reconnect
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopped = False
 
         # The cache is always dirty at startup, so that we fetch tools at least once
         self._cache_dirty = True
@@ -78,20 +141,140 @@ class _MCPServerWithClientSession(MCPServer):
         """Invalidate the tools cache."""
         self._cache_dirty = True
 
+    @property
+    def server_version(self) -> str:
+        """Server name and version reported at initialization, or "" before connecting."""
+        if self.server_info is None:
+            return ""
+        return f"{self.server_info.name}@{self.server_info.version}"
+
+    def add_tools_changed_listener(self, listener: Callable[[], Any]):
+        """Call listener (sync or async) when the server announces tools/list_changed."""
+        self._tools_changed_listeners.append(listener)
+
+    def remove_tools_changed_listener(self, listener: Callable[[], Any]):
+        """Stop calling a listener added with add_tools_changed_listener."""
+        try:
+            self._tools_changed_listeners.remove(listener)
+        except ValueError:
+            pass
+
+    async def _handle_message(self, message: Any):
+        """Handle notifications the session does not handle itself."""
+        if isinstance(message, Exception):
+            # Transport errors (e.g. the SSE stream breaking) arrive here, and
+            # the session stays open but dead unless it is ended and reconnected
+            self._session_lost(message)
+            return
+        if isinstance(message, mcp.types.ServerNotification) and isinstance(
+            message.root, mcp.types.ToolListChangedNotification
+        ):
+            self.logger.info(f"Tools changed on MCP server: {self.name}")
+            self.invalidate_tools_cache()
+            # Listeners usually call list_tools(), whose response is read by the
+            # loop running this handler, so they must not be awaited here. The
+            # list is copied because pooled leases remove listeners from other threads
+            for listener in list(self._tools_changed_listeners):
+                task = asyncio.create_task(self._run_listener(listener))
+                self._listener_tasks.add(task)
+                task.add_done_callback(self._listener_tasks.discard)
+
+    async def _run_listener(self, listener: Callable[[], Any]):
+        try:
+            result = listener()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            self.logger.error(f"Error in tools changed listener: {e}")
+
+    def _session_lost(self, reason: BaseException):
+        """End a dropped session; its owner task exits and schedules a reconnect."""
+        if self.session is not None and self._ended is not None and not self._ended.is_set():
+            self.logger.warning(f"MCP server {self.name} connection lost: {reason!r}")
+            self._ended.set()
+
+    @property
+    def connected(self) -> bool:
+        """Whether the session is initialized and usable."""
+        return self.session is not None
+
     async def connect(self):
-        """Connect to the server."""
+        """Connect to the server. Safe to cancel, e.g. from asyncio.wait_for."""
+        self._stopped = False
+        if self.session is not None:
+            return
+        if self._ready is not None and not self._ready.done():
+            # Another task is already connecting
+            await asyncio.shield(self._ready)
+            return
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._ready = ready
+        self._closing = asyncio.Event()
+        self._ended = asyncio.Event()
+        self._session_task = asyncio.create_task(self._run_session(ready))
         try:
-            transport = await self.exit_stack.enter_async_context(self.create_streams())
-            read, write = transport
-            session = await self.exit_stack.enter_async_context(ClientSession(read, write))
-            await session.initialize()
-            self.session = session
+            await ready
             self.logger.info(f"Connected to MCP server: {self.name}")
-        except Exception as e:
-            self.logger.error(f"Error initializing MCP server: {e}")
-            await self.cleanup()
+        except BaseException as e:
+            if not isinstance(e, asyncio.CancelledError):
+                self.logger.error(f"Error initializing MCP server: {e}")
+            await self._close_session()
             raise
 
+    async def _run_session(self, ready: asyncio.Future):
+        """Own the transport and session for the lifetime of the connection."""
+        closing, ended = self._closing, self._ended
+        try:
+            async with AsyncExitStack() as stack:
+                read, write = await stack.enter_async_context(self.create_streams())
+                session = await stack.enter_async_context(
+                    ClientSession(read, write, message_handler=self._handle_message)
+                )
+                init_result = await session.initialize()
+                self.server_info = init_result.serverInfo
+                self.session = session
+                if not ready.done():
+                    ready.set_result(None)
+                await ended.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                self.logger.error(f"MCP server {self.name} session ended: {e}")
+        finally:
+            self.session = None
+            if not ready.done():
+                ready.cancel()
+            elif not ready.cancelled() and ready.exception() is None and not closing.is_set():
+                # The session was up and dropped without cleanup() being called
+                self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        if not self.auto_reconnect or self._stopped:
+            return
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self):
+        """Re-establish a dropped session with exponential backoff."""
+        delay = RECONNECT_INITIAL_DELAY
+        while not self._stopped and self.session is None:
+            await asyncio.sleep(delay)
+            if self._stopped:
+                return
+            try:
+                await asyncio.wait_for(self.connect(), self.call_timeout)
+                self.logger.info(f"Reconnected to MCP server: {self.name}")
+                return
+            except Exception as e:
+                self.logger.warning(f"Reconnect to MCP server {self.name} failed, retrying in {delay}s: {e}")
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    async def wait_connected(self, timeout: float):
+        """Wait for an in-progress connect() to finish, if there is one."""
+        if self.session is None and self._ready is not None and not self._ready.done():
+            await asyncio.wait_for(asyncio.shield(self._ready), timeout)
+
     async def list_tools(self) -> List[MCPTool]:
         """List the tools available on the server."""
         if not self.session:
@@ -109,31 +292,110 @@ class _MCPServerWithClientSession(MCPServer):
             result = await self.session.list_tools()
             self._tools_list = result.tools
             return self._tools_list
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError) as e:
+            self.logger.error(f"Error listing tools: {e!r}")
+            self._session_lost(e)
+            raise
         except Exception as e:
             self.logger.error(f"Error listing tools: {e}")
             raise
 
     async def call_tool(self, tool_name: str, arguments: Optional[Dict[str, Any]] = None) -> CallToolResult:
-        """Invoke a tool on the server."""
-        if not self.session:
-            raise RuntimeError("Server not initialized. Make sure you call connect() first.")
+        """
+        Invoke a tool on the server.
 
-        arguments = arguments or {}
+        The call waits for one of the server's concurrency slots and then runs
+        under the tool's deadline, and is rejected immediately while the
+        circuit breaker is open or the queue is full. Time spent waiting for a
+        slot does not count against the deadline or the breaker; a call that
+        gets no slot within the same time fails with ToolQueueFullError.
+        """
+        if self._queued_calls >= self.max_queued_calls:
+            raise ToolQueueFullError(f"Too many calls waiting for MCP server {self.name}")
+        trial = self.circuit_breaker.state == CircuitBreaker.HALF_OPEN
+        if not self.circuit_breaker.allow():
+            raise CircuitOpenError(
+                f"MCP server {self.name} is failing; retry in {self.circuit_breaker.retry_after():.0f}s"
+            )
+
+        timeout = self.tool_timeouts.get(tool_name, self.call_timeout)
         try:
-            return await self.session.call_tool(tool_name, arguments)
+            await self._acquire_slot(timeout)
+        except BaseException:
+            # Never reached the server: no verdict on its health
+            if trial:
+                self.circuit_breaker.release_trial()
+            raise
+        try:
+            result = await asyncio.wait_for(self._call_tool(tool_name, arguments or {}), timeout)
+        except asyncio.TimeoutError:
+            self.circuit_breaker.record_failure()
+            self.logger.error(f"Tool {tool_name} on {self.name} timed out after {timeout}s")
+            raise ToolTimeoutError(f"Tool {tool_name} timed out after {timeout}s")
         except Exception as e:
+            self.circuit_breaker.record_failure()
             self.logger.error(f"Error calling tool {tool_name}: {e}")
             raise
+        except BaseException:
+            # Cancelled by the caller: let the next call be the trial
+            if trial:
+                self.circuit_breaker.release_trial()
+            raise
+        finally:
+            self._call_slots.release()
+        # A tool-level error result still means the server is healthy
+        self.circuit_breaker.record_success()
+        return result
+
+    async def _acquire_slot(self, timeout: float):
+        self._queued_calls += 1
+        try:
+            await asyncio.wait_for(self._call_slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise ToolQueueFullError(f"No free slot on MCP server {self.name} within {timeout}s")
+        finally:
+            self._queued_calls -= 1
+
+    async def _call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> CallToolResult:
+        # Tools registered from persisted schemas can be called while still connecting
+        await self.wait_connected(CONNECT_WAIT_TIMEOUT)
+        if not self.session:
+            raise RuntimeError("Server not connected. Make sure you call connect() first.")
+        try:
+            return await self.session.call_tool(tool_name, arguments)
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError) as e:
+            # The transport is gone; end the session so it is re-established
+            self._session_lost(e)
+            raise
 
     async def cleanup(self):
         """Cleanup the server."""
+        self._stopped = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        for task in list(self._listener_tasks):
+            task.cancel()
+        await self._close_session()
+
+    async def _close_session(self):
+        """Shut down the session task, if any."""
         async with self._cleanup_lock:
-            try:
-                await self.exit_stack.aclose()
-                self.session = None
-                self.logger.info(f"Cleaned up MCP server: {self.name}")
-            except Exception as e:
-                self.logger.error(f"Error cleaning up server: {e}")
+            task = self._session_task
+            if task is None:
+                return
+            self._session_task = None
+            if self.session is None:
+                # Still connecting: abandon the handshake
+                task.cancel()
+            self._closing.set()
+            self._ended.set()
+            done, _ = await asyncio.wait({task}, timeout=CLEANUP_TIMEOUT)
+            if not done:
+                self.logger.error(f"Timed out closing MCP server: {self.name}")
+                task.cancel()
+            self.session = None
+            self.logger.info(f"Cleaned up MCP server: {self.name}")
 
 # Define parameter types for clarity
 MCPServerSseParams = Dict[str, Any]
@@ -148,6 +410,7 @@ class MCPServerSse(_MCPServerWithClientSession):
         params: MCPServerSseParams,
         cache_tools_list: bool = False,
         name: Optional[str] = None,
+        **kwargs: Any,
     ):
         """Create a new MCP server based on the HTTP with SSE transport.
 
@@ -156,8 +419,10 @@ class MCPServerSse(_MCPServerWithClientSession):
                    timeout, and SSE read timeout.
             cache_tools_list: Whether to cache the tools list.
             name: A readable name for the server.
+            **kwargs: Call deadline, concurrency, circuit breaker and reconnect
+                   options; see _MCPServerWithClientSession.
         """
-        super().__init__(cache_tools_list)
+        super().__init__(cache_tools_list, **kwargs)
         self.params = params
         self._name = name or f"SSE Server at {self.params.get('url', 'unknown')}"
 
@@ -182,39 +447,61 @@ class MCPServerSse(_MCPServerWithClientSession):
         """A readable name for the server."""
         return self._name
 
+    @property
+    def cache_identity(self) -> str:
+        return f"sse:{self.params.get('url', '')}"
+
 # Stdio server implementation
-class MCPServerStdio(MCPServer):
-    """An example (minimal) Stdio server implementation."""
+class MCPServerStdio(_MCPServerWithClientSession):
+    """MCP server implementation that spawns the server as a subprocess and talks over stdio."""
+
+    def __init__(
+        self,
+        params: MCPServerStdioParams,
+        cache_tools_list: bool = False,
+        name: Optional[str] = None,
+        **kwargs: Any,
+    ):
+        """Create a new MCP server based on the stdio transport.
 
-    def __init__(self, params: MCPServerStdioParams, cache_tools_list: bool = False, name: Optional[str] = None):
+        Args:
+            params: The params that configure the server: command, and optionally
+                   args, env, cwd and encoding.
+            cache_tools_list: Whether to cache the tools list.
+            name: A readable name for the server.
+            **kwargs: Call deadline, concurrency, circuit breaker and reconnect
+                   options; see _MCPServerWithClientSession.
+        """
+        super().__init__(cache_tools_list, **kwargs)
         self.params = params
-        self.cache_tools_list = cache_tools_list
-        self._tools_cache: Optional[List[MCPTool]] = None
         self._name = name or f"Stdio Server: {self.params.get('command', 'unknown')}"
-        self.connected = False
-        self.logger = logging.getLogger(__name__)
+
+    def create_streams(
+        self,
+    ) -> AbstractAsyncContextManager[
+        Tuple[
+            MemoryObjectReceiveStream[JSONRPCMessage | Exception],
+            MemoryObjectSendStream[JSONRPCMessage],
+        ]
+    ]:
+        """Create the streams for the server."""
+        server_params = {"command": self.params["command"], "args": list(self.params.get("args", []))}
+        for key in ("env", "cwd", "encoding"):
+            if self.params.get(key) is not None:
+                server_params[key] = self.params[key]
+        return stdio_client(StdioServerParameters(**server_params))
 
     @property
     def name(self) -> str:
+        """A readable name for the server."""
         return self._name
 
-    async def connect(self):
-        await asyncio.sleep(0.5)
-        self.connected = True
-        self.logger.info(f"Connected to MCP Stdio server: {self.name}")
-
-    async def list_tools(self) -> List[MCPTool]:
-        if self.cache_tools_list and self._tools_cache is not None:
-            return self._tools_cache
-        # For demonstration, return an empty list or similar static tools.
-        tools: List[MCPTool] = []
-        if self.cache_tools_list:
-            self._tools_cache = tools
-        return tools
-
-    async def call_tool(self, tool_name: str, arguments: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        return {"content": [f"Called {tool_name} with args {arguments} via Stdio"]}
+    @property
+    def cache_identity(self) -> str:
+        return "stdio:" + " ".join([self.params.get("command", "")] + list(self.params.get("args", [])))
 
-    async def cleanup(self):
-        self.connected = False
-        self.logger.info(f"Cleaned up MCP Stdio server: {self.name}")
\ No newline at end of file
+    async def ping(self, timeout: float):
+        """Round-trip a ping to the subprocess; raises if it is unresponsive."""
+        if not self.session:
+            raise RuntimeError("Server not initialized. Make sure you call connect() first.")
+        await asyncio.wait_for(self.session.send_ping(), timeout)
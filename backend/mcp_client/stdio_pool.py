@@ -0,0 +1,228 @@
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from mcp.types import CallToolResult, Tool as MCPTool
+
+from .server import MCPServer, MCPServerStdio, MCPServerStdioParams
+
+logger = logging.getLogger("mcp-stdio-pool")
+
+T = TypeVar("T")
+
+# Pools created by get_stdio_pool, one per distinct params in this process
+_pools: Dict[str, "StdioServerPool"] = {}
+_pools_lock = threading.Lock()
+
+
+class StdioServerPool:
+    """
+    A set of pre-spawned stdio MCP server subprocesses shared by all agent jobs
+    in a worker process.
+
+    The subprocesses are owned by a private event loop on a background thread,
+    so the pool can be started from a synchronous prewarm function and used
+    from any job's event loop. Members are health-checked with pings and
+    restarted when they stop responding or their process exits. Jobs use the
+    pool through lease() objects, which spread calls across healthy members.
+    """
+
+    def __init__(
+        self,
+        params: MCPServerStdioParams,
+        size: int = 1,
+        cache_tools_list: bool = True,
+        name: Optional[str] = None,
+        connect_timeout: float = 15.0,
+        health_check_interval: float = 30.0,
+        ping_timeout: float = 5.0,
+        **server_kwargs: Any,
+    ):
+        """
+        Args:
+            params: Stdio server params (command, args, env, cwd).
+            size: Number of subprocesses to keep running.
+            cache_tools_list: Whether members cache their tools list.
+            name: A readable name for the pooled server.
+            connect_timeout: Seconds allowed for spawning and initializing a member.
+            health_check_interval: Seconds between health checks.
+            ping_timeout: Seconds a member has to answer a health check ping.
+            **server_kwargs: Passed to each MCPServerStdio (call deadlines, limits, breaker).
+        """
+        self.params = params
+        self.size = max(1, size)
+        self.connect_timeout = connect_timeout
+        self.health_check_interval = health_check_interval
+        self.ping_timeout = ping_timeout
+        self.members: List[MCPServerStdio] = [
+            MCPServerStdio(params, cache_tools_list=cache_tools_list,
+                           name=f"{name or params.get('command', 'stdio')}#{i}", **server_kwargs)
+            for i in range(self.size)
+        ]
+        self.name = name or f"Stdio Pool: {params.get('command', 'unknown')}"
+        self._round_robin = itertools.cycle(range(self.size))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._loop is not None
+
+    def start(self, timeout: Optional[float] = None):
+        """Spawn the subprocesses and start health checks. Blocks until members are up."""
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=loop.run_forever, name=f"mcp-pool:{self.name}", daemon=True)
+            self._thread.start()
+            self._loop = loop
+        future = asyncio.run_coroutine_threadsafe(self._start(), self._loop)
+        future.result(timeout if timeout is not None else self.connect_timeout + 5)
+
+    async def _start(self):
+        await asyncio.gather(*(self._restart(member) for member in self.members))
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def _restart(self, member: MCPServerStdio):
+        """(Re)spawn one member; failures are logged and retried by the health loop."""
+        try:
+            await member.cleanup()
+            await asyncio.wait_for(member.connect(), self.connect_timeout)
+        except Exception as e:
+            logger.error(f"Failed to start pooled MCP server {member.name}: {e}")
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await asyncio.gather(*(self._check(member) for member in self.members))
+
+    async def _check(self, member: MCPServerStdio):
+        try:
+            await member.ping(self.ping_timeout)
+            return
+        except Exception as e:
+            logger.warning(f"Pooled MCP server {member.name} failed health check, restarting: {e}")
+        await self._restart(member)
+
+    def _pick(self) -> MCPServerStdio:
+        """Next connected member in round-robin order, or any member if none are up."""
+        for _ in range(self.size):
+            member = self.members[next(self._round_robin)]
+            if member.connected:
+                return member
+        return self.members[next(self._round_robin)]
+
+    async def run(self, fn: Callable[[MCPServerStdio], Awaitable[T]]) -> T:
+        """Run fn(member) on the pool's loop and await the result from the caller's loop."""
+        if self._loop is None:
+            await asyncio.to_thread(self.start)
+        member = self._pick()
+        future = asyncio.run_coroutine_threadsafe(fn(member), self._loop)
+        return await asyncio.wrap_future(future)
+
+    def lease(self) -> "PooledStdioServer":
+        """An MCPServer view of the pool for one agent job."""
+        return PooledStdioServer(self)
+
+    def close(self, timeout: float = 10.0):
+        """Stop health checks and terminate all subprocesses."""
+        if self._loop is None:
+            return
+
+        async def _close():
+            if self._health_task:
+                self._health_task.cancel()
+            await asyncio.gather(*(member.cleanup() for member in self.members))
+
+        try:
+            asyncio.run_coroutine_threadsafe(_close(), self._loop).result(timeout)
+        except concurrent.futures.TimeoutError:
+            logger.error(f"Timed out closing MCP stdio pool {self.name}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+
+class PooledStdioServer(MCPServer):
+    """
+    MCPServer backed by a StdioServerPool. connect() only ensures the pool is
+    running and cleanup() releases the lease without stopping any subprocess.
+    """
+
+    def __init__(self, pool: StdioServerPool):
+        self.pool = pool
+        # (member, callback) pairs registered by this lease, removed in cleanup()
+        self._listeners: List[Tuple[MCPServerStdio, Callable[[], Any]]] = []
+
+    @property
+    def name(self) -> str:
+        return self.pool.name
+
+    @property
+    def cache_identity(self) -> str:
+        return self.pool.members[0].cache_identity
+
+    @property
+    def server_version(self) -> str:
+        return next((m.server_version for m in self.pool.members if m.server_version), "")
+
+    @property
+    def connected(self) -> bool:
+        return self.pool.started and any(m.connected for m in self.pool.members)
+
+    async def connect(self):
+        if not self.pool.started:
+            await asyncio.to_thread(self.pool.start)
+
+    def invalidate_tools_cache(self):
+        for member in self.pool.members:
+            member.invalidate_tools_cache()
+
+    def add_tools_changed_listener(self, listener: Callable[[], Any]):
+        """Run listener on the caller's loop when any member reports tools/list_changed."""
+        loop = asyncio.get_running_loop()
+
+        def notify():
+            def schedule():
+                result = listener()
+                if asyncio.iscoroutine(result):
+                    asyncio.ensure_future(result)
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(schedule)
+
+        for member in self.pool.members:
+            member.add_tools_changed_listener(notify)
+            self._listeners.append((member, notify))
+
+    async def list_tools(self) -> List[MCPTool]:
+        return await self.pool.run(lambda member: member.list_tools())
+
+    async def call_tool(self, tool_name: str, arguments: Optional[Dict[str, Any]] = None) -> CallToolResult:
+        return await self.pool.run(lambda member: member.call_tool(tool_name, arguments))
+
+    async def cleanup(self):
+        """Unregister this lease's listeners; the subprocesses keep running."""
+        for member, notify in self._listeners:
+            member.remove_tools_changed_listener(notify)
+        self._listeners.clear()
+
+
+def get_stdio_pool(params: MCPServerStdioParams, size: int = 1, **kwargs) -> StdioServerPool:
+    """
+    Return this process's shared pool for the given params, creating it on first use.
+    Call start() on it from the worker's prewarm function to spawn the
+    subprocesses before the first job arrives.
+    """
+    key = json.dumps(params, sort_keys=True, default=str)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = StdioServerPool(params, size=size, **kwargs)
+            _pools[key] = pool
+        return pool
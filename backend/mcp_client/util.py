@@ -1,11 +1,18 @@
 import asyncio
 import json
 import functools
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 # Import from mcp libraries
 from mcp.types import Tool as MCPTool, CallToolResult
 from .server import MCPServer
+from .result_cache import ToolResultCache
+from .results import DEFAULT_MAX_RESULT_TOKENS, _field, result_to_text
+
+try:
+    from ..metrics import trace_tool_call  # backend metrics when packaged
+except ImportError:
+    from metrics import trace_tool_call  # fallback when running from the backend directory
 
 # A minimal FunctionTool class used by the agent.
 class FunctionTool:
@@ -21,16 +28,20 @@ class FunctionTool:
 
 class MCPUtil:
     @classmethod
-    async def get_function_tools(cls, server, convert_schemas_to_strict: bool) -> List[FunctionTool]:
+    async def get_function_tools(cls, server, convert_schemas_to_strict: bool,
+                                 result_cache: Optional[ToolResultCache] = None,
+                                 max_result_tokens: int = DEFAULT_MAX_RESULT_TOKENS) -> List[FunctionTool]:
         tools = await server.list_tools()
         function_tools = []
         for tool in tools:
-            ft = cls.to_function_tool(tool, server, convert_schemas_to_strict)
+            ft = cls.to_function_tool(tool, server, convert_schemas_to_strict, result_cache, max_result_tokens)
             function_tools.append(ft)
         return function_tools
 
     @classmethod
-    def to_function_tool(cls, tool, server, convert_schemas_to_strict: bool) -> FunctionTool:
+    def to_function_tool(cls, tool, server, convert_schemas_to_strict: bool,
+                         result_cache: Optional[ToolResultCache] = None,
+                         max_result_tokens: int = DEFAULT_MAX_RESULT_TOKENS) -> FunctionTool:
         # In a more complete implementation, you might convert the JSON schema into a strict version.
         schema = tool.inputSchema
 
@@ -42,33 +53,19 @@ class MCPUtil:
                 # Return error message as string
                 return f"Error parsing input JSON for tool '{current_tool_name}': {e}"
             try:
-                result = await server.call_tool(current_tool_name, arguments)
-                # Ensure the final return value is a string
-                if "content" in result and isinstance(result["content"], list) and len(result["content"]) >= 1:
-                     # Handle single or multiple content items - convert to string
-                     if len(result["content"]) == 1:
-                         content_item = result["content"][0]
-                         # Convert simple types explicitly to string
-                         if isinstance(content_item, (str, int, float, bool)):
-                             return str(content_item)
-                         # Convert complex types (like dict, list) to JSON string
-                         else:
-                             try:
-                                 return json.dumps(content_item)
-                             except TypeError:
-                                 return str(content_item) # Fallback to default string representation
-                     else:
-                         # Multiple content items, return as JSON array string
-                          try:
-                              return json.dumps(result["content"])
-                          except TypeError:
-                              return str(result["content"]) # Fallback
-                else:
-                    # If 'content' is missing, not a list, or empty, return string representation of the whole result
-                    try:
-                        return json.dumps(result)
-                    except TypeError:
-                        return str(result) # Fallback
+                # Traced here rather than by the caller, which only sees the returned string
+                with trace_tool_call(current_tool_name) as trace:
+                    if result_cache is not None:
+                        # Cached or coalesced when the tool is opted in; a plain call otherwise
+                        result = await result_cache.get_or_call(
+                            getattr(server, "cache_identity", server.name), current_tool_name, arguments,
+                            lambda: server.call_tool(current_tool_name, arguments),
+                        )
+                    else:
+                        result = await server.call_tool(current_tool_name, arguments)
+                    trace.failed = bool(_field(result, "isError", False))
+                # Extract text/structured content and keep it within the token budget
+                return result_to_text(result, max_result_tokens)
             except Exception as e:
                  # Catch errors during tool call itself
                  return f"Error calling tool '{current_tool_name}': {e}"
@@ -0,0 +1,304 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+Counters and histograms are registered on the module-level REGISTRY and
+rendered by server.py's /metrics route. Agent workers, which have no HTTP
+server of their own, push the same text to a Prometheus Pushgateway when
+METRICS_PUSHGATEWAY_URL is set. Values are per process: under several uvicorn
+workers each process reports its own series.
+"""
+import atexit
+import bisect
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import requests
+
+logger = logging.getLogger("metrics")
+
+# Latency buckets in seconds, from a cached lookup up to a large PDF ingestion
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Pushgateway receiving agent worker metrics; pushing is disabled when unset
+PUSHGATEWAY_URL = os.getenv("METRICS_PUSHGATEWAY_URL", "").rstrip("/")
+# Seconds between pushes from agent workers
+PUSH_INTERVAL = float(os.getenv("METRICS_PUSH_INTERVAL", "15"))
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def remove(self, **labels: str) -> None:
+        """Drop every series whose labels include the given values (e.g. a finished room)."""
+        index = {name: self.labelnames.index(name) for name in labels}
+        with self._lock:
+            for key in [k for k in self._series if all(k[i] == str(labels[n]) for n, i in index.items())]:
+                del self._series[key]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._series: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._series.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the with-block, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Named metrics of one process. Registering an existing name returns the same metric."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def remove(self, **labels: str) -> None:
+        """Drop matching series from every metric that has all the given labels."""
+        for metric in list(self._metrics.values()):
+            if set(labels) <= set(metric.labelnames):
+                metric.remove(**labels)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("route", "method", "status"))
+RAG_STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_duration_seconds", "Time spent in each stage of RAG ingestion and search.", ("op", "stage"))
+RAG_ERRORS = REGISTRY.counter(
+    "rag_errors_total", "Failed RAG operations.", ("op",))
+BRINGUP_PHASE_SECONDS = REGISTRY.histogram(
+    "agent_bringup_phase_duration_seconds", "Duration of each agent session bring-up phase.", ("phase",))
+TIME_TO_FIRST_WORD_SECONDS = REGISTRY.histogram(
+    "agent_time_to_first_word_seconds", "Time from job start to the agent's first spoken word.")
+TOOL_CALL_SECONDS = REGISTRY.histogram(
+    "agent_tool_call_duration_seconds", "Agent tool call latency by tool and room.", ("tool", "room", "status"))
+
+# Room of the agent job running in the current context, for per-room tool tracing
+_current_room: contextvars.ContextVar[str] = contextvars.ContextVar("metrics_room", default="")
+_trace_logger = logging.getLogger("agent-trace")
+
+
+def set_room(room: str) -> None:
+    """Attribute tool calls made from the current context (and tasks it starts) to room."""
+    _current_room.set(room)
+
+
+def current_room() -> str:
+    return _current_room.get()
+
+
+class ToolCallTrace:
+    """Handle yielded by trace_tool_call; set failed for a call that returned an error instead of raising."""
+
+    def __init__(self):
+        self.failed = False
+
+
+@contextlib.contextmanager
+def trace_tool_call(tool: str) -> Iterator[ToolCallTrace]:
+    """Record a tool call's latency and outcome against the current room."""
+    room = current_room()
+    start = time.perf_counter()
+    status = "error"
+    trace = ToolCallTrace()
+    try:
+        yield trace
+        if not trace.failed:
+            status = "ok"
+    finally:
+        elapsed = time.perf_counter() - start
+        TOOL_CALL_SECONDS.observe(elapsed, tool=tool, room=room, status=status)
+        _trace_logger.info(f"room={room or '-'} tool={tool} status={status} duration_ms={elapsed * 1000:.1f}")
+
+
+def _group_url(url: str, job: str, instance: str) -> str:
+    return f"{url}/metrics/job/{job}/instance/{instance}"
+
+
+def push(job: str, instance: str, url: str = PUSHGATEWAY_URL, timeout: float = 5.0) -> bool:
+    """Replace this instance's metrics on the Pushgateway. Returns whether it succeeded."""
+    if not url:
+        return False
+    try:
+        resp = requests.put(_group_url(url, job, instance),
+                            data=REGISTRY.render().encode("utf-8"),
+                            headers={"Content-Type": CONTENT_TYPE}, timeout=timeout)
+        resp.raise_for_status()
+        return True
+    except requests.RequestException as e:
+        logger.warning(f"Failed to push metrics to {url}: {e}")
+        return False
+
+
+def delete(job: str, instance: str, url: str = PUSHGATEWAY_URL, timeout: float = 5.0) -> bool:
+    """Remove this instance's metrics from the Pushgateway. Returns whether it succeeded."""
+    if not url:
+        return False
+    try:
+        resp = requests.delete(_group_url(url, job, instance), timeout=timeout)
+        resp.raise_for_status()
+        return True
+    except requests.RequestException as e:
+        logger.warning(f"Failed to delete metrics from {url}: {e}")
+        return False
+
+
+_pusher: Optional[threading.Thread] = None
+_pusher_lock = threading.Lock()
+_pusher_stop = threading.Event()
+
+
+def start_pusher(job: str, instance: str, interval: float = PUSH_INTERVAL) -> bool:
+    """
+    Push metrics every interval seconds from a daemon thread, once per process.
+    When the process exits the pusher stops and the instance's group is
+    deleted, so series of exited processes don't linger on the Pushgateway.
+    Does nothing unless METRICS_PUSHGATEWAY_URL is set.
+    """
+    global _pusher
+    if not PUSHGATEWAY_URL:
+        return False
+    with _pusher_lock:
+        if _pusher is None:
+            def loop():
+                while not _pusher_stop.wait(interval):
+                    push(job, instance)
+
+            def stop():
+                _pusher_stop.set()
+                # Let an in-flight push finish so it can't recreate the group
+                _pusher.join(timeout=10)
+                delete(job, instance)
+
+            _pusher = threading.Thread(target=loop, name="metrics-pusher", daemon=True)
+            _pusher.start()
+            atexit.register(stop)
+    return True
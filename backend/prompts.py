@@ -1,10 +1,16 @@
 from datetime import datetime
 from zoneinfo import ZoneInfo
+import json
 import os
 
-vienna_time = datetime.now(ZoneInfo("America/New_York"))
-formatted_time = vienna_time.strftime("%A, %B %d, %Y at %I:%M %p %Z")
 AGENT_NAME = os.getenv("SCRUM_MASTER_NAME", "Zakaria")
+# Timezone used for the date/time given to the agent at session start
+PROMPT_TIMEZONE = os.getenv("PROMPT_TIMEZONE", "America/New_York")
+
+# AGENT_INSTRUCTION and SESSION_INSTRUCTION depend only on configuration, so
+# they are byte-identical across sessions and provider-side prompt caching can
+# reuse them. Anything that changes per session is appended by
+# build_session_instruction() instead.
 
 AGENT_INSTRUCTION = f"""
 # Persona
@@ -58,6 +64,7 @@ You are a virtual assistant with a voice/visual avatar on a team portal. Your jo
 - When answering anything that could be grounded in uploaded PDFs or team documents, FIRST call the `ask_docs` tool with the user's question.
 - Use the returned excerpts to craft a succinct answer in English, and cite the document name(s) inline like `[Source: <name>]` when relevant.
 - If no documents are found or excerpts are insufficient, ask a brief clarifying question or proceed with general guidance, clearly noting the lack of document context.
+- When asked to summarize the meeting so far, call the `meeting_summary` tool and build on its summary instead of recalling the whole conversation.
 
 # Notes
 - Refer to yourself as “{AGENT_NAME}” when introducing or signing off.
@@ -75,7 +82,60 @@ SESSION_INSTRUCTION = f"""
     - Retrospective: We’ll capture “Went well / Didn’t go well / Ideas” and produce 3–5 actionable improvements with owners.
 
     # Notes
-    - The current date/time is {formatted_time}.
     - I keep responses succinct and action-oriented; tell me if you prefer more detail.
     - If you ask about anything in your uploaded PDFs or team documents, I will search them first and cite sources in-line.
     """
+
+
+# Used by summaries.py to fold new transcript lines into a meeting's rolling summary
+SUMMARY_INSTRUCTION = """
+You maintain the running summary of an Agile team meeting from its transcript.
+You are given the current summary (possibly empty) and the transcript lines
+spoken since it was written. Return the updated summary only, in English, as
+short Markdown sections:
+- Topics discussed
+- Updates per participant
+- Decisions
+- Blockers
+- Action items, with owner and due date when stated
+Keep everything still relevant from the current summary, merge new points into
+it, and drop small talk. Stay under 300 words.
+"""
+
+
+def format_time(now: datetime | None = None) -> str:
+    """Human-readable date/time in PROMPT_TIMEZONE."""
+    tz = ZoneInfo(PROMPT_TIMEZONE)
+    now = now.astimezone(tz) if now else datetime.now(tz)
+    return now.strftime("%A, %B %d, %Y at %I:%M %p %Z")
+
+
+def session_metadata(*sources: str | None) -> dict:
+    """
+    Merge team/ceremony details from job or room metadata, given as JSON strings.
+    Later sources win; missing or non-JSON metadata is ignored.
+    """
+    merged = {}
+    for raw in sources:
+        if not raw:
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            merged.update({k: v for k, v in data.items() if v})
+    return merged
+
+
+def build_session_instruction(now: datetime | None = None, team: str | None = None,
+                              room: str | None = None, ceremony: str | None = None) -> str:
+    """SESSION_INSTRUCTION followed by the details of this session."""
+    details = [f"- The current date/time is {format_time(now)}."]
+    if team:
+        details.append(f"- You are meeting with the {team} team.")
+    if room:
+        details.append(f"- Meeting room: {room}.")
+    if ceremony:
+        details.append(f"- This meeting is scheduled as: {ceremony}. Open with that ceremony instead of asking what to focus on.")
+    return SESSION_INSTRUCTION + "\n    # Session\n" + "".join(f"    {line}\n" for line in details)
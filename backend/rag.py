@@ -1,7 +1,11 @@
 import os
 import uuid
 import shutil
-from typing import List, Dict, Any
+import hashlib
+import logging
+import threading
+import time
+from typing import List, Dict, Any, Iterator
 from datetime import datetime
 from pathlib import Path
 
@@ -10,10 +14,33 @@ import requests
 import chromadb
 from chromadb.config import Settings
 
+try:
+    from . import admission  # local module when packaged
+    from .metrics import RAG_ERRORS, RAG_STAGE_SECONDS
+except ImportError:
+    import admission  # fallback when running scripts directly
+    from metrics import RAG_ERRORS, RAG_STAGE_SECONDS
+
+logger = logging.getLogger("rag")
+
+# Embedding requests carry at most this many chunks
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+
+# Serializes changes to a document's chunks (update/delete); held for the Chroma
+# writes, while new versions are parsed and embedded before taking it
+_write_lock = threading.RLock()
+
+# Pooled HTTP connections to the embeddings API
+_http = requests.Session()
+# Overridable so benchmarks can point at a local stand-in
+EMBEDDINGS_URL = os.getenv("OPENAI_EMBEDDINGS_URL", "https://api.openai.com/v1/embeddings")
 
 # Directories
-STORE_DIR = os.path.join(os.path.dirname(__file__), "data", "docs")
-CHROMA_DIR = os.path.join(os.path.dirname(__file__), "data", "chroma_db")
+DATA_DIR = os.getenv("RAG_DATA_DIR") or os.path.join(os.path.dirname(__file__), "data")
+STORE_DIR = os.path.join(DATA_DIR, "docs")
+# Uploads are streamed here, then renamed into STORE_DIR once their hash is known
+INCOMING_DIR = os.path.join(STORE_DIR, ".incoming")
+CHROMA_DIR = os.path.join(DATA_DIR, "chroma_db")
 
 # Initialize ChromaDB client
 chroma_client = chromadb.PersistentClient(
@@ -21,20 +48,138 @@ chroma_client = chromadb.PersistentClient(
     settings=Settings(anonymized_telemetry=False)
 )
 
-# Get or create collection
+# Changes to the collection write a new token here, shared by all server processes
+VERSION_FILE = os.path.join(CHROMA_DIR, "collection.version")
+_version_lock = threading.Lock()
+# (version, documents) computed by the last list_documents call
+_documents_cache: tuple[str, List[Dict[str, Any]]] | None = None
+
+# HNSW index parameters. Chroma fixes them when a collection is created, so
+# changes take effect on an existing store after `python index_maint.py rebuild`.
+HNSW_METADATA = {
+    "hnsw:space": os.getenv("RAG_HNSW_SPACE", "l2"),
+    "hnsw:M": int(os.getenv("RAG_HNSW_M", "16")),
+    "hnsw:construction_ef": int(os.getenv("RAG_HNSW_CONSTRUCTION_EF", "100")),
+    "hnsw:search_ef": int(os.getenv("RAG_HNSW_SEARCH_EF", "100")),
+}
+COLLECTION_METADATA = {"description": "PDF document chunks for RAG", **HNSW_METADATA}
+
 COLLECTION_NAME = "pdf_documents"
-collection = chroma_client.get_or_create_collection(
-    name=COLLECTION_NAME,
-    metadata={"description": "PDF document chunks for RAG"}
-)
+# index_maint rebuild renames the collection it replaces to this prefix plus a timestamp
+RETIRED_PREFIX = COLLECTION_NAME + "-retired-"
+
+
+def _open_collection():
+    """
+    Get or create the collection. If a rebuild was interrupted between its
+    two renames, the retired collection still holds every chunk, so it is
+    renamed back instead of starting empty.
+    """
+    names = [getattr(c, "name", c) for c in chroma_client.list_collections()]
+    if COLLECTION_NAME not in names:
+        retired = sorted(n for n in names if n.startswith(RETIRED_PREFIX))
+        if retired:
+            logger.warning(f"Restoring {retired[-1]} left behind by an interrupted rebuild")
+            chroma_client.get_collection(retired[-1]).modify(name=COLLECTION_NAME)
+    return chroma_client.get_or_create_collection(
+        name=COLLECTION_NAME,
+        metadata=COLLECTION_METADATA
+    )
+
+
+collection = _open_collection()
+
+
+def _swap_collection(fresh) -> None:
+    """
+    Put a fully built collection in place of the live one, under
+    COLLECTION_NAME. Call with _write_lock held. If the process dies between
+    the two renames, _open_collection restores the retired collection.
+    """
+    global collection
+    retired_name = f"{RETIRED_PREFIX}{int(time.time())}"
+    collection.modify(name=retired_name)
+    fresh.modify(name=COLLECTION_NAME)
+    chroma_client.delete_collection(retired_name)
+    collection = chroma_client.get_collection(COLLECTION_NAME)
+    _bump_version()
 
 
 def _ensure_dirs() -> None:
     """Ensure required directories exist."""
     os.makedirs(STORE_DIR, exist_ok=True)
+    os.makedirs(INCOMING_DIR, exist_ok=True)
     os.makedirs(CHROMA_DIR, exist_ok=True)
 
 
+def collection_version() -> str:
+    """Current collection version; changes whenever documents are added, updated or deleted."""
+    try:
+        with open(VERSION_FILE, "r", encoding="utf-8") as f:
+            return f.read().strip() or "0"
+    except FileNotFoundError:
+        return "0"
+
+
+def _bump_version() -> None:
+    """Record a change to the collection, invalidating cached listings."""
+    global _documents_cache
+    with _version_lock:
+        # A unique token rather than a counter, so processes can't race to the same value
+        version = f"{time.time_ns():x}-{uuid.uuid4().hex[:6]}"
+        tmp_path = f"{VERSION_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, VERSION_FILE)
+        _documents_cache = None
+
+
+def stored_pdf_path(sha256: str) -> str:
+    """Content-addressed location of a stored PDF."""
+    return os.path.join(STORE_DIR, f"{sha256}.pdf")
+
+
+def _sha256_file(path: str, block_size: int = 1024 * 1024) -> str:
+    """Hash a file in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _store_pdf(file_path: str, sha256: str | None = None) -> tuple[str, str]:
+    """
+    Move a PDF into its content-addressed location.
+    Returns (stored_path, sha256). Identical content is stored once.
+    """
+    sha256 = sha256 or _sha256_file(file_path)
+    stored_path = stored_pdf_path(sha256)
+    if os.path.abspath(file_path) != os.path.abspath(stored_path):
+        if os.path.exists(stored_path):
+            os.remove(file_path)
+        else:
+            shutil.move(file_path, stored_path)
+    return stored_path, sha256
+
+
+def _remove_stored_pdf(sha256: str | None, legacy_doc_id: str | None = None) -> None:
+    """
+    Remove a stored PDF unless a document still references the same content.
+    legacy_doc_id also removes a file stored by doc_id before content addressing.
+    """
+    if sha256:
+        still_used = collection.get(where={"sha256": sha256}, limit=1)
+        if not still_used["ids"]:
+            path = stored_pdf_path(sha256)
+            if os.path.exists(path):
+                os.remove(path)
+    if legacy_doc_id:
+        legacy_path = os.path.join(STORE_DIR, f"{legacy_doc_id}.pdf")
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+
+
 def _chunk_text(text: str, chunk_size: int = 1500, overlap: int = 200) -> List[str]:
     """Split text into overlapping chunks."""
     chunks: List[str] = []
@@ -51,22 +196,89 @@ def _chunk_text(text: str, chunk_size: int = 1500, overlap: int = 200) -> List[s
     return chunks
 
 
-def _pdf_to_text(pdf_path: str) -> str:
-    """Extract text from PDF file."""
+def _is_boundary(line: str, boundary_odds: int) -> bool:
+    """Whether a chunk may end after line. Depends only on the line itself."""
+    stripped = line.strip()
+    if not stripped:
+        return True
+    return hashlib.blake2b(stripped.encode("utf-8"), digest_size=1).digest()[0] % boundary_odds == 0
+
+
+def _chunk_page(text: str, min_chars: int = 1100, max_chars: int = 1600, overlap: int = 200,
+                boundary_odds: int = 3) -> List[str]:
+    """
+    Split one page into chunks of whole lines, cut after blank lines or lines
+    whose hash marks a boundary once a chunk has min_chars. Because the cut
+    points depend on content rather than offsets, an edit only changes the
+    chunks around it. Each chunk repeats the last lines (up to overlap chars)
+    of the previous one, and a remainder shorter than min_chars at the end of
+    the page joins the last chunk. Lines longer than max_chars are split with
+    _chunk_text.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    fresh = 0
+
+    def flush():
+        nonlocal current, size, fresh
+        if fresh:
+            chunk = "\n".join(current).strip()
+            if chunk:
+                chunks.append(chunk)
+        # Carry the tail into the next chunk
+        tail: List[str] = []
+        tail_size = 0
+        for line in reversed(current if fresh else []):
+            if tail_size + len(line) + 1 > overlap:
+                break
+            tail.insert(0, line)
+            tail_size += len(line) + 1
+        current, size, fresh = tail, tail_size, 0
+
+    for line in text.splitlines():
+        if len(line) > max_chars:
+            flush()
+            chunks.extend(_chunk_text(line, max_chars, overlap))
+            current, size = [], 0
+            continue
+        if size + len(line) > max_chars:
+            flush()
+        current.append(line)
+        size += len(line) + 1
+        fresh += 1
+        if size >= min_chars and _is_boundary(line, boundary_odds):
+            flush()
+    # A short remainder at the end of the page joins the chunk before it
+    remainder = "\n".join(current[len(current) - fresh:]).strip() if fresh else ""
+    if remainder and chunks and len(remainder) < min_chars:
+        chunks[-1] = chunks[-1] + "\n" + remainder
+    else:
+        flush()
+    return chunks
+
+
+def _chunk_pages(pages: List[str]) -> List[str]:
+    """Chunk each page separately, so chunks never span a page break."""
+    return [chunk for page in pages for chunk in _chunk_page(page)]
+
+
+def _pdf_to_pages(pdf_path: str) -> List[str]:
+    """Extract the text of each page of a PDF file."""
     reader = PdfReader(pdf_path)
-    pages_text = []
-    for page in reader.pages:
-        pages_text.append(page.extract_text() or "")
-    return "\n".join(pages_text)
+    return [page.extract_text() or "" for page in reader.pages]
 
 
-def _embed_texts(texts: List[str]) -> List[List[float]]:
-    """Generate embeddings using OpenAI API."""
+def _embed_texts(texts: List[str], priority: str = admission.BULK) -> List[List[float]]:
+    """
+    Generate embeddings using OpenAI API.
+    Waits for the shared rate budget first; search passes admission.INTERACTIVE.
+    """
     api_key = os.getenv("openai_api_key") or os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OpenAI API key not found in environment (openai_api_key or OPENAI_API_KEY)")
     
-    url = "https://api.openai.com/v1/embeddings"
+    url = EMBEDDINGS_URL
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
@@ -75,55 +287,278 @@ def _embed_texts(texts: List[str]) -> List[List[float]]:
         "model": "text-embedding-3-small",
         "input": texts,
     }
-    resp = requests.post(url, headers=headers, json=data, timeout=60)
+    admission.EMBEDDINGS.acquire(admission.estimate_tokens(texts), priority)
+    resp = _http.post(url, headers=headers, json=data, timeout=60)
     resp.raise_for_status()
     out = resp.json()
     embeddings: List[List[float]] = [item["embedding"] for item in out["data"]]
     return embeddings
 
 
-def add_pdf(file_path: str, original_name: str | None = None) -> str:
+def warm_up() -> None:
     """
-    Ingest a PDF file: parse to text, chunk, embed, and add to ChromaDB.
-    Returns a doc_id.
+    Load the collection and open a pooled connection to the embeddings API,
+    so the first search doesn't pay for either.
     """
-    _ensure_dirs()
-    doc_id = str(uuid.uuid4())[:8]
-    stored_path = os.path.join(STORE_DIR, f"{doc_id}.pdf")
-    
-    # Move file to storage
-    shutil.move(file_path, stored_path)
-    
-    # Extract text and create chunks
-    text = _pdf_to_text(stored_path)
-    chunks = _chunk_text(text)
-    
-    # Generate embeddings
-    embeddings = _embed_texts(chunks)
-    
-    # Prepare data for ChromaDB
-    ids = [f"{doc_id}_{i}" for i in range(len(chunks))]
+    collection.count()
+    try:
+        # Any response will do; this only establishes the TLS connection
+        _http.head(EMBEDDINGS_URL, timeout=5)
+    except requests.RequestException:
+        pass
+
+
+def _embed_batched(texts: List[str], batch_size: int = EMBED_BATCH_SIZE) -> List[List[float]]:
+    """Embed texts in requests of at most batch_size inputs, preserving order."""
+    embeddings: List[List[float]] = []
+    for start in range(0, len(texts), batch_size):
+        embeddings.extend(_embed_texts(texts[start:start + batch_size]))
+    return embeddings
+
+
+def _extract_chunks(stored_path: str) -> List[str]:
+    """Parse a stored PDF and split it into chunks."""
+    with RAG_STAGE_SECONDS.time(op="ingest", stage="parse"):
+        pages = _pdf_to_pages(stored_path)
+    with RAG_STAGE_SECONDS.time(op="ingest", stage="chunk"):
+        return _chunk_pages(pages)
+
+
+def _chunk_hash(text: str) -> str:
+    """Content hash identifying a chunk across document versions."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _chunk_keys(chunks: List[str]) -> List[tuple[str, int]]:
+    """(hash, occurrence) keys, so repeated identical chunks stay distinct."""
+    seen: Dict[str, int] = {}
+    keys = []
+    for text in chunks:
+        h = _chunk_hash(text)
+        keys.append((h, seen.get(h, 0)))
+        seen[h] = seen.get(h, 0) + 1
+    return keys
+
+
+def _chunk_id(doc_id: str, key: tuple[str, int]) -> str:
+    h, occurrence = key
+    return f"{doc_id}_{h}" if occurrence == 0 else f"{doc_id}_{h}_{occurrence}"
+
+
+def _index_document(doc_id: str, filename: str, sha256: str,
+                    chunks: List[str], embeddings: List[List[float]]) -> None:
+    """Add a document's embedded chunks to ChromaDB."""
+    if not chunks:
+        raise ValueError(f"No extractable text in {filename}")
+
+    keys = _chunk_keys(chunks)
+    ids = [_chunk_id(doc_id, key) for key in keys]
+    upload_date = datetime.now().isoformat()
     metadatas = [
         {
             "doc_id": doc_id,
-            "filename": original_name or f"{doc_id}.pdf",
+            "filename": filename,
             "chunk_index": i,
-            "upload_date": datetime.now().isoformat()
+            "chunk_hash": keys[i][0],
+            "sha256": sha256,
+            "upload_date": upload_date
         }
         for i in range(len(chunks))
     ]
-    
-    # Add to ChromaDB
+
     collection.add(
         ids=ids,
         embeddings=embeddings,
         documents=chunks,
         metadatas=metadatas
     )
-    
+    _bump_version()
+
+
+def new_doc_id() -> str:
+    """Generate a short document id."""
+    return str(uuid.uuid4())[:8]
+
+
+def add_pdf(file_path: str, original_name: str | None = None, sha256: str | None = None) -> str:
+    """
+    Ingest a PDF file: parse to text, chunk, embed, and add to ChromaDB.
+    Pass sha256 when the caller already hashed the file while receiving it.
+    Waits for ingestion admission; raises admission.AdmissionRejected when saturated.
+    Returns a doc_id.
+    """
+    with admission.INGESTION.admit(os.path.getsize(file_path)):
+        return _add_pdf(file_path, original_name, sha256)
+
+
+def _add_pdf(file_path: str, original_name: str | None, sha256: str | None) -> str:
+    _ensure_dirs()
+    doc_id = new_doc_id()
+
+    try:
+        # Move file to its content-addressed location in storage
+        with RAG_STAGE_SECONDS.time(op="ingest", stage="store"):
+            stored_path, sha256 = _store_pdf(file_path, sha256)
+    except Exception:
+        RAG_ERRORS.inc(op="ingest")
+        raise
+
+    try:
+        # Extract text and create chunks
+        chunks = _extract_chunks(stored_path)
+
+        # Generate embeddings
+        with RAG_STAGE_SECONDS.time(op="ingest", stage="embed"):
+            embeddings = _embed_batched(chunks)
+
+        # Add to ChromaDB
+        with RAG_STAGE_SECONDS.time(op="ingest", stage="insert"):
+            _index_document(doc_id, original_name or f"{doc_id}.pdf", sha256, chunks, embeddings)
+    except Exception:
+        RAG_ERRORS.inc(op="ingest")
+        # Drop the stored file unless it is identical to an indexed one
+        with _write_lock:
+            _remove_stored_pdf(sha256)
+        raise
+
     return doc_id
 
 
+def update_pdf(doc_id: str, file_path: str, original_name: str | None = None,
+               sha256: str | None = None) -> Dict[str, Any] | None:
+    """
+    Replace a document with a new version while keeping its doc_id.
+    Chunks are diffed by content hash: unchanged chunks keep their embeddings,
+    only new ones are embedded. New chunks are added before stale ones are
+    deleted, so the document stays searchable throughout, and nothing changes
+    if extraction or embedding fails.
+    Returns change counts, or None if the document does not exist.
+    """
+    _ensure_dirs()
+    with admission.INGESTION.admit(os.path.getsize(file_path)):
+        existing = _document_chunks(doc_id)
+        if not existing["ids"]:
+            return None
+        filename = original_name or existing["metadatas"][0].get("filename", f"{doc_id}.pdf")
+
+        stored_path, sha256 = _store_pdf(file_path, sha256)
+        try:
+            chunks = _extract_chunks(stored_path)
+            if not chunks:
+                raise ValueError(f"No extractable text in {filename}")
+            # Parsing and embedding happen before taking the lock, so deletes and
+            # other documents' updates don't wait for them
+            embedded = _embed_new_chunks(chunks, existing)
+            with _write_lock:
+                # Read again: the document may have changed or gone meanwhile
+                existing = _document_chunks(doc_id)
+                if not existing["ids"]:
+                    _remove_stored_pdf(sha256)
+                    return None
+                old_sha256 = existing["metadatas"][0].get("sha256")
+                result = _apply_update(doc_id, filename, sha256, chunks, embedded, existing)
+                if old_sha256 != sha256:
+                    _remove_stored_pdf(old_sha256, legacy_doc_id=doc_id)
+        except Exception:
+            # Drop the new file unless it is identical to an indexed one
+            with _write_lock:
+                _remove_stored_pdf(sha256)
+            raise
+    return result
+
+
+def _document_chunks(doc_id: str) -> Dict[str, Any]:
+    return collection.get(where={"doc_id": doc_id}, include=["documents", "metadatas"])
+
+
+def _embed_new_chunks(chunks: List[str], existing: Dict[str, Any]) -> Dict[tuple[str, int], List[float]]:
+    """Embed the chunks not already stored for the document, keyed by chunk key."""
+    stored = set(_chunk_keys(existing["documents"]))
+    keys = _chunk_keys(chunks)
+    new = [i for i, key in enumerate(keys) if key not in stored]
+    vectors = _embed_batched([chunks[i] for i in new])
+    return {keys[i]: vector for i, vector in zip(new, vectors)}
+
+
+def _apply_update(doc_id: str, filename: str, sha256: str, chunks: List[str],
+                  embedded: Dict[tuple[str, int], List[float]],
+                  existing: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Diff a document's stored chunks against a new version and apply the changes.
+    embedded holds vectors computed earlier; chunks missing from it are embedded now.
+    """
+    old_meta = existing["metadatas"][0]
+    existing_ids = dict(zip(_chunk_keys(existing["documents"]), existing["ids"]))
+    keys = _chunk_keys(chunks)
+    added = [i for i, key in enumerate(keys) if key not in existing_ids]
+    reused = [i for i, key in enumerate(keys) if key in existing_ids]
+    stale_ids = list(set(existing["ids"]) - {existing_ids[keys[i]] for i in reused})
+
+    # Only when the stored chunks changed since the vectors were computed
+    missing = [i for i in added if keys[i] not in embedded]
+    if missing:
+        embedded = {**embedded, **dict(zip([keys[i] for i in missing],
+                                           _embed_batched([chunks[i] for i in missing])))}
+    embeddings = [embedded[keys[i]] for i in added]
+
+    updated_date = datetime.now().isoformat()
+
+    def metadata(i: int) -> Dict[str, Any]:
+        return {
+            "doc_id": doc_id,
+            "filename": filename,
+            "chunk_index": i,
+            "chunk_hash": keys[i][0],
+            "sha256": sha256,
+            "upload_date": old_meta.get("upload_date", updated_date),
+            "updated_date": updated_date,
+        }
+
+    added_ids = [_chunk_id(doc_id, keys[i]) for i in added]
+    reused_ids = [existing_ids[keys[i]] for i in reused]
+    if added:
+        # Hidden from search until the stale chunks are gone, so results
+        # never mix the old and new versions
+        collection.add(
+            ids=added_ids,
+            embeddings=embeddings,
+            documents=[chunks[i] for i in added],
+            metadatas=[{**metadata(i), "pending": True} for i in added],
+        )
+    try:
+        if reused:
+            collection.update(ids=reused_ids, metadatas=[metadata(i) for i in reused])
+        if stale_ids:
+            collection.delete(ids=stale_ids)
+    except Exception:
+        _rollback_update(added_ids, reused_ids, existing)
+        raise
+    if added:
+        collection.update(ids=added_ids, metadatas=[{**metadata(i), "pending": False} for i in added])
+    _bump_version()
+
+    return {
+        "doc_id": doc_id,
+        "filename": filename,
+        "chunk_count": len(chunks),
+        "added": len(added),
+        "reused": len(reused),
+        "removed": len(stale_ids),
+    }
+
+
+def _rollback_update(added_ids: List[str], reused_ids: List[str], existing: Dict[str, Any]) -> None:
+    """Undo a partly applied update: drop the new chunks and restore the old metadata."""
+    try:
+        if added_ids:
+            collection.delete(ids=added_ids)
+        old_meta = dict(zip(existing["ids"], existing["metadatas"]))
+        if reused_ids:
+            collection.update(ids=reused_ids, metadatas=[old_meta[chunk_id] for chunk_id in reused_ids])
+    except Exception:
+        logger.exception("Failed to roll back a partly applied update")
+
+
 def search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
     """
     Search for relevant document chunks using ChromaDB.
@@ -133,14 +568,22 @@ def search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
     if collection.count() == 0:
         return []
     
-    # Generate query embedding
-    q_emb = _embed_texts([query])[0]
-    
-    # Query ChromaDB
-    results = collection.query(
-        query_embeddings=[q_emb],
-        n_results=min(top_k, collection.count())
-    )
+    try:
+        # Generate query embedding
+        with RAG_STAGE_SECONDS.time(op="search", stage="embed"):
+            q_emb = _embed_texts([query], priority=admission.INTERACTIVE)[0]
+
+        # Query ChromaDB
+        with RAG_STAGE_SECONDS.time(op="search", stage="query"):
+            results = collection.query(
+                query_embeddings=[q_emb],
+                n_results=min(top_k, collection.count()),
+                # Chunks of an update still being applied
+                where={"pending": {"$ne": True}},
+            )
+    except Exception:
+        RAG_ERRORS.inc(op="search")
+        raise
     
     # Format results
     chunks = []
@@ -156,32 +599,125 @@ def search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
     return chunks
 
 
+def iter_records(batch_size: int = 1000, include_embeddings: bool = True,
+                 include_documents: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Page through every chunk in the collection, in storage order.
+    Yields collection.get results: parallel ids, metadatas (and documents, embeddings).
+    """
+    include = ["metadatas"]
+    if include_documents:
+        include.append("documents")
+    if include_embeddings:
+        include.append("embeddings")
+    offset = 0
+    while True:
+        page = collection.get(include=include, limit=batch_size, offset=offset)
+        if not page["ids"]:
+            return
+        yield page
+        offset += len(page["ids"])
+
+
 def list_documents() -> List[Dict[str, Any]]:
     """
     List all uploaded documents with metadata.
-    Returns list of unique documents.
+    Returns list of unique documents, cached until the collection version changes.
     """
+    global _documents_cache
+    version = collection_version()
+    cached = _documents_cache
+    if cached and cached[0] == version:
+        return list(cached[1])
+
     if collection.count() == 0:
-        return []
-    
-    # Get all items from collection
-    all_items = collection.get()
-    
-    # Group by doc_id to get unique documents
-    docs_dict = {}
-    for metadata in all_items['metadatas']:
-        doc_id = metadata.get('doc_id')
-        if doc_id and doc_id not in docs_dict:
-            docs_dict[doc_id] = {
-                "doc_id": doc_id,
-                "filename": metadata.get('filename', 'Unknown'),
-                "upload_date": metadata.get('upload_date', ''),
-                "chunk_count": 0
-            }
-        if doc_id:
-            docs_dict[doc_id]["chunk_count"] += 1
-    
-    return list(docs_dict.values())
+        docs: List[Dict[str, Any]] = []
+    else:
+        # Metadata is all we need; skip documents and embeddings
+        all_items = collection.get(include=["metadatas"])
+
+        # Group by doc_id to get unique documents
+        docs_dict = {}
+        for metadata in all_items['metadatas']:
+            doc_id = metadata.get('doc_id')
+            if doc_id and doc_id not in docs_dict:
+                docs_dict[doc_id] = {
+                    "doc_id": doc_id,
+                    "filename": metadata.get('filename', 'Unknown'),
+                    "upload_date": metadata.get('upload_date', ''),
+                    "chunk_count": 0
+                }
+                if metadata.get('updated_date'):
+                    docs_dict[doc_id]["updated_date"] = metadata['updated_date']
+            if doc_id:
+                docs_dict[doc_id]["chunk_count"] += 1
+        docs = list(docs_dict.values())
+
+    # Cached under the version read before scanning, so a concurrent change invalidates it
+    _documents_cache = (version, docs)
+    return list(docs)
+
+
+DOCUMENT_SORT_KEYS = ("upload_date", "filename", "chunk_count")
+
+
+def _parse_date(value: str) -> datetime:
+    """
+    Parse an ISO 8601 date or date/time into a naive local datetime, the form
+    upload_date is stored in. Raises ValueError if value is not ISO 8601.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _uploaded_at(doc: Dict[str, Any]) -> datetime | None:
+    try:
+        return _parse_date(doc["upload_date"])
+    except (TypeError, ValueError):
+        return None
+
+
+def query_documents(filename: str | None = None,
+                    uploaded_after: str | None = None,
+                    uploaded_before: str | None = None,
+                    sort: str = "upload_date",
+                    descending: bool = False,
+                    offset: int = 0,
+                    limit: int | None = None) -> tuple[List[Dict[str, Any]], int]:
+    """
+    Filter, sort and page the document list.
+    filename matches case-insensitively as a substring; dates are ISO 8601
+    dates or date/times, compared as datetimes against upload_date (a date
+    means its midnight, local time unless an offset is given). Documents
+    without a valid upload_date never match a date filter.
+    Returns (page, total_matches).
+    """
+    if sort not in DOCUMENT_SORT_KEYS:
+        raise ValueError(f"sort must be one of {', '.join(DOCUMENT_SORT_KEYS)}")
+
+    docs = list_documents()
+    if filename:
+        needle = filename.lower()
+        docs = [d for d in docs if needle in d["filename"].lower()]
+    if uploaded_after or uploaded_before:
+        after = _parse_date(uploaded_after) if uploaded_after else None
+        before = _parse_date(uploaded_before) if uploaded_before else None
+        dated = [(d, _uploaded_at(d)) for d in docs]
+        docs = [d for d, at in dated
+                if at is not None
+                and (after is None or at >= after)
+                and (before is None or at < before)]
+
+    def sort_key(d: Dict[str, Any]):
+        value = d[sort]
+        return value.lower() if isinstance(value, str) else value
+
+    docs.sort(key=sort_key, reverse=descending)
+    total = len(docs)
+    end = None if limit is None else offset + limit
+    return docs[offset:end], total
 
 
 def delete_document(doc_id: str) -> bool:
@@ -190,24 +726,22 @@ def delete_document(doc_id: str) -> bool:
     Returns True if successful, False otherwise.
     """
     try:
-        # Get all chunk IDs for this document
-        all_items = collection.get()
-        chunk_ids_to_delete = []
-        
-        for i, metadata in enumerate(all_items['metadatas']):
-            if metadata.get('doc_id') == doc_id:
-                chunk_ids_to_delete.append(all_items['ids'][i])
-        
-        # Delete from ChromaDB
-        if chunk_ids_to_delete:
-            collection.delete(ids=chunk_ids_to_delete)
-        
-        # Delete PDF file from storage
-        pdf_path = os.path.join(STORE_DIR, f"{doc_id}.pdf")
-        if os.path.exists(pdf_path):
-            os.remove(pdf_path)
-        
+        with _write_lock:
+            # Get all chunk IDs for this document
+            doc_items = collection.get(where={"doc_id": doc_id})
+            chunk_ids_to_delete = doc_items['ids']
+            sha256 = doc_items['metadatas'][0].get('sha256') if doc_items['metadatas'] else None
+
+            # Delete from ChromaDB
+            if chunk_ids_to_delete:
+                collection.delete(ids=chunk_ids_to_delete)
+
+            # Delete PDF file from storage
+            _remove_stored_pdf(sha256, legacy_doc_id=doc_id)
+            _bump_version()
+
         return True
-    except Exception as e:
-        print(f"Error deleting document {doc_id}: {e}")
+    except Exception:
+        RAG_ERRORS.inc(op="delete")
+        logger.exception(f"Error deleting document {doc_id}")
         return False
\ No newline at end of file
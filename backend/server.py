@@ -1,20 +1,71 @@
 import os
 from livekit import api
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from dotenv import load_dotenv
 from flask_cors import CORS
 from flasgger import Swagger
-from livekit.api import LiveKitAPI, ListRoomsRequest
+from livekit.api import ListRoomsRequest
+import time
 import uuid
 from datetime import datetime
-from pathlib import Path
+from pypdf.errors import PdfReadError
 
 load_dotenv()
 
+try:
+    from . import admission, ingest, metrics, serving, summaries, uploads  # local modules when packaged
+except ImportError:
+    import admission, ingest, metrics, serving, summaries, uploads  # fallback when running server.py directly
+
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
+# Streams uploads to disk and sets the upload routes' size limits
+app.request_class = uploads.StreamingRequest
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["ETag", "X-Total-Count"])
 Swagger(app)
 
+# Ingestion routes take every request admission control could run or queue, so
+# admission decides when ingestion is saturated (503 with its Retry-After)
+INGEST_ROUTE_LIMIT = admission.INGEST_MAX_CONCURRENT + admission.INGEST_MAX_QUEUED
+
+TRANSCRIPTS_DIR = summaries.TRANSCRIPTS_DIR
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        # The route template, not the path, so document ids don't become separate series
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route,
+                                             method=request.method, status=str(response.status_code))
+    return response
+
+@app.errorhandler(admission.AdmissionRejected)
+def ingestion_saturated(e):
+    response = jsonify({"error": str(e)})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(int(e.retry_after))
+    return response
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Prometheus metrics
+    ---
+    tags:
+      - ops
+    summary: Request, RAG and tool latency histograms and error counters of this process
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Metrics in the Prometheus text exposition format
+    """
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 async def generate_room_name():
     name = "room-" + str(uuid.uuid4())[:8]
     rooms = await get_rooms()
@@ -23,13 +74,13 @@ async def generate_room_name():
     return name
 
 async def get_rooms():
-    api = LiveKitAPI()
-    rooms = await api.room.list_rooms(ListRoomsRequest())
-    await api.aclose()
+    lkapi = await serving.get_livekit_api()
+    rooms = await lkapi.room.list_rooms(ListRoomsRequest())
     return [room.name for room in rooms.rooms]
 
 @app.route("/getToken")
-async def get_token():
+@serving.route_limit("get_token", 64)
+def get_token():
     """
     Get LiveKit access token
     ---
@@ -56,7 +107,7 @@ async def get_token():
     room = request.args.get("room", None)
     
     if not room:
-        room = await generate_room_name()
+        room = serving.run_async(generate_room_name())
         
     token = api.AccessToken(os.getenv("LIVEKIT_API_KEY"), os.getenv("LIVEKIT_API_SECRET")) \
         .with_identity(name)\
@@ -69,6 +120,7 @@ async def get_token():
     return token.to_jwt()
 
 @app.post("/uploadDoc")
+@serving.route_limit("upload_doc", INGEST_ROUTE_LIMIT)
 def upload_doc():
     """
     Upload a PDF for RAG ingestion
@@ -94,9 +146,14 @@ def upload_doc():
               type: string
             filename:
               type: string
+      400:
+        description: No file, or a PDF with no readable text
+      413:
+        description: File exceeds MAX_UPLOAD_MB
+      503:
+        description: Ingestion is saturated; retry after the Retry-After header
     """
     from werkzeug.utils import secure_filename
-    from tempfile import NamedTemporaryFile
     try:
         from . import rag  # local module when packaged
     except ImportError:
@@ -108,29 +165,136 @@ def upload_doc():
     if file.filename == "":
         return jsonify({"error": "No selected file"}), 400
     filename = secure_filename(file.filename)
-    # Create a temp file, ensure it is CLOSED before moving/ingestion (Windows file lock safety)
-    with NamedTemporaryFile(delete=False) as tmp:
-        tmp_path = tmp.name
-    # Save uploaded file to the temp path after the file handle is closed
-    file.save(tmp_path)
+    # The body was already streamed to disk and hashed while it was parsed;
+    # rag.add_pdf only renames it into its content-addressed location.
+    part_path, sha256 = uploads.receive_upload(file)
     try:
-        doc_id = rag.add_pdf(tmp_path, original_name=filename)
+        doc_id = rag.add_pdf(part_path, original_name=filename, sha256=sha256)
+    except (ValueError, PdfReadError) as e:
+        # Textless or unreadable PDF
+        return jsonify({"error": str(e)}), 400
     finally:
-        # The rag.add_pdf will move the file into storage; ensure temp file is removed if it still exists
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+        # Remove the partial file if ingestion failed before moving it into storage
+        if os.path.exists(part_path):
+            os.remove(part_path)
     return jsonify({"doc_id": doc_id, "filename": filename})
 
+@app.post("/uploadDocs")
+@serving.route_limit("upload_docs", INGEST_ROUTE_LIMIT)
+def upload_docs():
+    """
+    Upload several PDFs or zip archives of PDFs for RAG ingestion
+    ---
+    tags:
+      - docs
+    summary: Bulk upload; files are parsed in parallel and embedded in shared batches
+    consumes:
+      - multipart/form-data
+    parameters:
+      - in: formData
+        name: files
+        type: array
+        items:
+          type: file
+        collectionFormat: multi
+        required: true
+        description: PDF files and/or zip archives containing PDFs
+    responses:
+      200:
+        description: Per-file ingestion results
+        schema:
+          type: object
+          properties:
+            results:
+              type: array
+              items:
+                type: object
+                properties:
+                  filename:
+                    type: string
+                  doc_id:
+                    type: string
+                  chunk_count:
+                    type: integer
+                  error:
+                    type: string
+            ingested:
+              type: integer
+            failed:
+              type: integer
+      413:
+        description: Request exceeds MAX_BULK_UPLOAD_MB
+      503:
+        description: Ingestion is saturated; retry after the Retry-After header
+    """
+    files = [f for f in request.files.getlist("files") if f.filename]
+    if not files:
+        return jsonify({"error": "No files"}), 400
+
+    pending, slots = uploads.receive_bulk(files)
+    try:
+        ingested = ingest.ingest_files(pending) if pending else []
+    finally:
+        # Remove received files that never made it into storage
+        for item in pending:
+            if os.path.exists(item.path):
+                os.remove(item.path)
+    # Results in the order the files were sent
+    results = uploads.fill_results(slots, ingested)
+    failed = sum(1 for r in results if "error" in r)
+    return jsonify({"results": results, "ingested": len(results) - failed, "failed": failed})
+
 @app.get("/documents")
+@serving.route_limit("documents", 16)
 def list_documents():
     """
-    List all uploaded documents
+    List uploaded documents
     ---
     tags:
       - docs
-    summary: Get list of all uploaded PDF documents
+    summary: Get uploaded PDF documents, optionally filtered, sorted and paginated
+    description: >
+      Responses carry an ETag tied to the collection version; send it back in
+      If-None-Match to get a 304 when nothing changed. The total number of
+      matches is returned in the X-Total-Count header.
+    parameters:
+      - name: filename
+        in: query
+        type: string
+        required: false
+        description: Case-insensitive substring of the filename
+      - name: uploaded_after
+        in: query
+        type: string
+        required: false
+        description: ISO date/time; only documents uploaded at or after it
+      - name: uploaded_before
+        in: query
+        type: string
+        required: false
+        description: ISO date/time; only documents uploaded before it
+      - name: sort
+        in: query
+        type: string
+        enum: [upload_date, filename, chunk_count]
+        required: false
+        default: upload_date
+      - name: order
+        in: query
+        type: string
+        enum: [asc, desc]
+        required: false
+        default: asc
+      - name: page
+        in: query
+        type: integer
+        required: false
+        default: 1
+      - name: page_size
+        in: query
+        type: integer
+        required: false
+        description: Documents per page; all matches when omitted
     responses:
       200:
         description: List of documents
@@ -145,18 +309,126 @@ def list_documents():
                 type: string
               upload_date:
                 type: string
+              updated_date:
+                type: string
               chunk_count:
                 type: integer
+      304:
+        description: Not modified since the ETag in If-None-Match
+      400:
+        description: Invalid query parameter
     """
+    import hashlib
     try:
         from . import rag
     except ImportError:
         import rag
-    
-    docs = rag.list_documents()
-    return jsonify(docs)
+
+    # Answer unchanged polls before touching the collection
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    etag = f"{rag.collection_version()}-{hashlib.sha1(query.encode('utf-8')).hexdigest()[:8]}"
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    try:
+        page = int(request.args.get("page", 1))
+        page_size = request.args.get("page_size")
+        page_size = int(page_size) if page_size else None
+        if page < 1 or (page_size is not None and page_size < 1):
+            raise ValueError("page and page_size must be positive")
+        docs, total = rag.query_documents(
+            filename=request.args.get("filename"),
+            uploaded_after=request.args.get("uploaded_after"),
+            uploaded_before=request.args.get("uploaded_before"),
+            sort=request.args.get("sort", "upload_date"),
+            descending=request.args.get("order", "asc").lower() == "desc",
+            offset=(page - 1) * page_size if page_size else 0,
+            limit=page_size,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = jsonify(docs)
+    response.set_etag(etag)
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.put("/documents/<doc_id>")
+@serving.route_limit("update_document", INGEST_ROUTE_LIMIT)
+def update_document(doc_id: str):
+    """
+    Replace a document with a new version
+    ---
+    tags:
+      - docs
+    summary: Upload a new version of a PDF; only new or changed chunks are re-embedded
+    consumes:
+      - multipart/form-data
+    parameters:
+      - name: doc_id
+        in: path
+        type: string
+        required: true
+        description: Document ID to update
+      - in: formData
+        name: file
+        type: file
+        required: true
+        description: New version of the PDF
+    responses:
+      200:
+        description: Document updated
+        schema:
+          type: object
+          properties:
+            doc_id:
+              type: string
+            filename:
+              type: string
+            chunk_count:
+              type: integer
+            added:
+              type: integer
+            reused:
+              type: integer
+            removed:
+              type: integer
+      400:
+        description: No file, or a PDF with no readable text
+      404:
+        description: Document not found
+      413:
+        description: File exceeds MAX_UPLOAD_MB
+      503:
+        description: Ingestion is saturated; retry after the Retry-After header
+    """
+    from werkzeug.utils import secure_filename
+    try:
+        from . import rag
+    except ImportError:
+        import rag
+
+    if "file" not in request.files:
+        return jsonify({"error": "No file part"}), 400
+    file = request.files["file"]
+    filename = secure_filename(file.filename) if file.filename else None
+    part_path, sha256 = uploads.receive_upload(file)
+    try:
+        result = rag.update_pdf(doc_id, part_path, original_name=filename, sha256=sha256)
+    except (ValueError, PdfReadError) as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    if result is None:
+        return jsonify({"error": f"Document {doc_id} not found"}), 404
+    return jsonify(result)
 
 @app.delete("/documents/<doc_id>")
+@serving.route_limit("delete_document", 8)
 def delete_document(doc_id: str):
     """
     Delete a document by ID
@@ -196,6 +468,7 @@ def delete_document(doc_id: str):
 
 
 @app.post("/transcriptions")
+@serving.route_limit("transcriptions", 64)
 def save_transcription():
     """
     Save a transcription line to a room-specific log file
@@ -231,6 +504,8 @@ def save_transcription():
           properties:
             ok:
               type: boolean
+      400:
+        description: Invalid room name
     """
     data = request.get_json(silent=True) or {}
     room = data.get("room") or "unknown-room"
@@ -238,11 +513,10 @@ def save_transcription():
     text = data.get("text") or ""
     ts = data.get("ts")
     participant = data.get("participant") or ""
+    if not summaries.valid_room(room):
+        return jsonify({"ok": False, "error": "Invalid room name"}), 400
 
-    # Prepare directory and file path
-    transcripts_dir = Path(__file__).parent / "data" / "transcripts"
-    transcripts_dir.mkdir(parents=True, exist_ok=True)
-    file_path = transcripts_dir / f"{room}.txt"
+    file_path = TRANSCRIPTS_DIR / f"{room}.txt"
 
     # Format timestamp
     if ts is not None:
@@ -256,11 +530,59 @@ def save_transcription():
 
     line = f"[{ts_str}] ({speaker_type}) {participant}: {text}\n"
     try:
+        TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
         with open(file_path, "a", encoding="utf-8") as f:
             f.write(line)
-        return jsonify({"ok": True})
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
+    summaries.notify(room)
+    return jsonify({"ok": True})
+
+@app.get("/summaries/<room>")
+@serving.route_limit("summaries", 64)
+def get_summary(room: str):
+    """
+    Get a meeting's rolling summary
+    ---
+    tags:
+      - transcripts
+    summary: Current summary of a room's transcript, updated in the background from new lines
+    parameters:
+      - name: room
+        in: path
+        type: string
+        required: true
+        description: Room name
+    responses:
+      200:
+        description: Current summary
+        schema:
+          type: object
+          properties:
+            room:
+              type: string
+            summary:
+              type: string
+            lines:
+              type: integer
+              description: Transcript lines covered by the summary
+            pending_bytes:
+              type: integer
+              description: Transcript bytes not summarized yet
+            updated_at:
+              type: string
+      400:
+        description: Invalid room name
+      404:
+        description: No transcript for this room
+    """
+    if not summaries.valid_room(room):
+        return jsonify({"error": "Invalid room name"}), 400
+    result = summaries.get_summary(room)
+    if result is None:
+        return jsonify({"error": f"No transcript for room {room}"}), 404
+    return jsonify({key: result[key] for key in ("room", "summary", "lines", "pending_bytes", "updated_at")})
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5001, debug=True)
\ No newline at end of file
+    # Development server. For production use the ASGI serving mode: python asgi.py
+    app.run(host="0.0.0.0", port=5001, debug=True)
@@ -0,0 +1,107 @@
+"""
+Shared runtime for serving the Flask app.
+
+Flask's async views start a fresh event loop for every request, which makes it
+impossible to reuse aiohttp-based clients such as LiveKitAPI. Instead, all
+async work is submitted to one long-lived event loop (uvicorn's loop when
+running under asgi.py, otherwise a background thread), and routes can cap how
+many requests they serve at once. Blocking work such as ingestion runs on the
+request thread; admission control bounds how many of those threads it holds.
+"""
+import asyncio
+import concurrent.futures
+import functools
+import os
+import threading
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from flask import jsonify
+from livekit.api import LiveKitAPI
+
+T = TypeVar("T")
+
+# Seconds a request thread waits on the shared loop before giving up
+ASYNC_TIMEOUT = float(os.getenv("SERVER_ASYNC_TIMEOUT", "10"))
+# Seconds a request waits for a free slot on a limited route before a 503
+QUEUE_TIMEOUT = float(os.getenv("SERVER_QUEUE_TIMEOUT", "2"))
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_livekit_api: Optional[LiveKitAPI] = None
+
+
+def use_loop(loop: asyncio.AbstractEventLoop) -> None:
+    """Adopt an already running loop (e.g. uvicorn's) as the shared loop."""
+    global _loop
+    with _loop_lock:
+        _loop = loop
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared loop, starting a background one if none was adopted."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name="server-event-loop", daemon=True
+            )
+            thread.start()
+            _loop = loop
+        return _loop
+
+
+def run_async(coro: Awaitable[T], timeout: float = ASYNC_TIMEOUT) -> T:
+    """Run a coroutine on the shared loop from a request thread and wait for it."""
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+
+async def get_livekit_api() -> LiveKitAPI:
+    """
+    Return the process-wide LiveKitAPI client.
+    Must be awaited on the shared loop so its HTTP session is reused.
+    """
+    global _livekit_api
+    if _livekit_api is None:
+        _livekit_api = LiveKitAPI()
+    return _livekit_api
+
+
+async def aclose() -> None:
+    """Close shared clients. Called on shutdown."""
+    global _livekit_api
+    if _livekit_api is not None:
+        await _livekit_api.aclose()
+        _livekit_api = None
+
+
+def route_limit(name: str, default: int) -> Callable:
+    """
+    Cap concurrent requests to a route. The limit can be overridden with
+    SERVER_LIMIT_<NAME>; requests that wait longer than QUEUE_TIMEOUT for a
+    slot get a 503 with Retry-After instead of tying up a worker.
+    """
+    limit = int(os.getenv(f"SERVER_LIMIT_{name.upper()}", str(default)))
+    semaphore = threading.BoundedSemaphore(limit)
+
+    def decorator(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not semaphore.acquire(timeout=QUEUE_TIMEOUT):
+                response = jsonify({"error": f"Too many concurrent {name} requests, retry later"})
+                response.status_code = 503
+                response.headers["Retry-After"] = "1"
+                return response
+            try:
+                return view(*args, **kwargs)
+            finally:
+                semaphore.release()
+
+        return wrapper
+
+    return decorator
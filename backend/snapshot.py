@@ -0,0 +1,260 @@
+"""
+Snapshot export/import of the vector store, for bootstrapping new nodes.
+
+A snapshot is a directory of:
+- manifest.json: counts, dtype, collection version and a sha256 checksum per file
+- records.jsonl: one {"id", "document", "metadata"} line per chunk
+- vectors.npy: the embeddings, row i belonging to line i of records.jsonl.
+  It is float32, or float16 with --float16, and is loaded memory-mapped.
+- docs/ (optional): the stored PDFs, with --include-docs
+
+Export reads the live collection page by page. If the collection version
+changes while it runs, the export is discarded and retried, so a snapshot
+never mixes two states. Import verifies every checksum, then adds the
+records with their stored vectors, so no embedding calls are made. The
+records go into a separate collection that is swapped in only once every
+record is loaded, so a failed or interrupted import leaves the live
+collection as it was.
+
+    python snapshot.py export /backups/snap-1 --float16 --include-docs
+    python snapshot.py import /backups/snap-1
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+import numpy as np
+
+try:
+    from . import rag  # local module when packaged
+except ImportError:
+    import rag  # fallback when running scripts directly from the backend directory
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+RECORDS = "records.jsonl"
+VECTORS = "vectors.npy"
+DOCS_DIR = "docs"
+# Attempts at exporting before giving up on a collection that keeps changing
+EXPORT_ATTEMPTS = 3
+# Imports load into a collection with this suffix, then swap it in
+IMPORT_SUFFIX = "-import"
+
+
+class SnapshotError(RuntimeError):
+    """A snapshot could not be written or failed verification."""
+
+
+def _checksums(directory: str) -> Dict[str, Dict[str, Any]]:
+    """sha256 and size of every file in the snapshot except the manifest."""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, directory).replace(os.sep, "/")
+            if rel != MANIFEST:
+                files[rel] = {"sha256": rag._sha256_file(path), "bytes": os.path.getsize(path)}
+    return files
+
+
+def _export_once(directory: str, float16: bool, include_docs: bool, batch_size: int) -> Dict[str, Any]:
+    version = rag.collection_version()
+    count = rag.collection.count()
+    dtype = np.float16 if float16 else np.float32
+    vectors = None
+    written = 0
+    shas = set()
+
+    with open(os.path.join(directory, RECORDS), "w", encoding="utf-8") as records:
+        for page in rag.iter_records(batch_size=batch_size):
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(os.path.join(directory, VECTORS), mode="w+",
+                                                    dtype=dtype, shape=(count, embeddings.shape[1]))
+            if written + len(page["ids"]) > count:
+                raise SnapshotError("collection grew during export")
+            vectors[written:written + len(page["ids"])] = embeddings
+            for chunk_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                records.write(json.dumps({"id": chunk_id, "document": document, "metadata": metadata},
+                                         ensure_ascii=False) + "\n")
+                if metadata.get("sha256"):
+                    shas.add(metadata["sha256"])
+            written += len(page["ids"])
+
+    if vectors is None:
+        # An empty file can't be memory-mapped, so an empty collection is saved directly
+        np.save(os.path.join(directory, VECTORS), np.zeros((0, 0), dtype=dtype))
+        dim = 0
+    else:
+        vectors.flush()
+        dim = vectors.shape[1]
+        del vectors
+    if written != count or rag.collection_version() != version:
+        raise SnapshotError("collection changed during export")
+
+    if include_docs:
+        os.makedirs(os.path.join(directory, DOCS_DIR))
+        for sha in sorted(shas):
+            source = rag.stored_pdf_path(sha)
+            if os.path.exists(source):
+                shutil.copy2(source, os.path.join(directory, DOCS_DIR, f"{sha}.pdf"))
+
+    return {
+        "format_version": FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "collection": rag.COLLECTION_NAME,
+        "collection_version": version,
+        "count": count,
+        "dim": dim,
+        "dtype": np.dtype(dtype).name,
+        "includes_docs": include_docs,
+    }
+
+
+def export_snapshot(directory: str, float16: bool = False, include_docs: bool = False,
+                    batch_size: int = 1000) -> Dict[str, Any]:
+    """Write a consistent snapshot of the collection to directory (which must not exist)."""
+    if os.path.exists(directory):
+        raise SnapshotError(f"{directory} already exists")
+    tmp_dir = f"{directory.rstrip(os.sep)}.partial"
+    for attempt in range(1, EXPORT_ATTEMPTS + 1):
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            # Writers in this process are held off; other processes are caught by the version check
+            with rag._write_lock:
+                manifest = _export_once(tmp_dir, float16, include_docs, batch_size)
+            break
+        except SnapshotError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if attempt == EXPORT_ATTEMPTS:
+                raise
+            time.sleep(attempt)
+    manifest["files"] = _checksums(tmp_dir)
+    with open(os.path.join(tmp_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.rename(tmp_dir, directory)
+    return manifest
+
+
+def verify_snapshot(directory: str) -> Dict[str, Any]:
+    """Load the manifest and check every file against it. Returns the manifest."""
+    try:
+        with open(os.path.join(directory, MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Unreadable manifest in {directory}: {e}")
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot format {manifest.get('format_version')}")
+    actual = _checksums(directory)
+    for name, expected in manifest["files"].items():
+        if name not in actual:
+            raise SnapshotError(f"Missing file {name}")
+        if actual[name]["sha256"] != expected["sha256"]:
+            raise SnapshotError(f"Checksum mismatch for {name}")
+    return manifest
+
+
+def _check_replaceable(replace: bool) -> None:
+    if rag.collection.count() and not replace:
+        raise SnapshotError("Collection is not empty; pass --replace to overwrite it")
+
+
+def _load_records(directory: str, target, vectors, batch_size: int) -> int:
+    """Add every record with its stored vector to target. Returns the number added."""
+    row = 0
+    with open(os.path.join(directory, RECORDS), "r", encoding="utf-8") as records:
+        while True:
+            batch = [json.loads(line) for _, line in zip(range(batch_size), records)]
+            if not batch:
+                break
+            target.add(
+                ids=[r["id"] for r in batch],
+                documents=[r["document"] for r in batch],
+                metadatas=[r["metadata"] for r in batch],
+                embeddings=np.asarray(vectors[row:row + len(batch)], dtype=np.float32),
+            )
+            row += len(batch)
+    return row
+
+
+def import_snapshot(directory: str, replace: bool = False, batch_size: int = 1000) -> Dict[str, Any]:
+    """
+    Load a verified snapshot into the collection without embedding anything.
+    The collection must be empty unless replace is set. Records are loaded
+    into a staging collection, which replaces the live one once complete.
+    """
+    manifest = verify_snapshot(directory)
+    vectors = np.load(os.path.join(directory, VECTORS), mmap_mode="r")
+    if vectors.shape[0] != manifest["count"]:
+        raise SnapshotError(f"{VECTORS} has {vectors.shape[0]} rows, manifest says {manifest['count']}")
+    client = rag.chroma_client
+    batch_size = min(batch_size, client.get_max_batch_size())
+    _check_replaceable(replace)
+
+    rag._ensure_dirs()
+    staging_name = rag.COLLECTION_NAME + IMPORT_SUFFIX
+    # Left behind by an interrupted import
+    if staging_name in [getattr(c, "name", c) for c in client.list_collections()]:
+        client.delete_collection(staging_name)
+    staging = client.create_collection(staging_name, metadata=rag.COLLECTION_METADATA)
+    try:
+        row = _load_records(directory, staging, vectors, batch_size)
+        if row != manifest["count"]:
+            raise SnapshotError(f"{RECORDS} has {row} records, manifest says {manifest['count']}")
+        with rag._write_lock:
+            # Checked again: documents may have been added while loading
+            _check_replaceable(replace)
+            rag._swap_collection(staging)
+    except BaseException:
+        client.delete_collection(staging_name)
+        raise
+
+    docs_dir = os.path.join(directory, DOCS_DIR)
+    if os.path.isdir(docs_dir):
+        for name in os.listdir(docs_dir):
+            target = os.path.join(rag.STORE_DIR, name)
+            if not os.path.exists(target):
+                shutil.copy2(os.path.join(docs_dir, name), target)
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write a snapshot of the vector store")
+    export.add_argument("directory")
+    export.add_argument("--float16", action="store_true", help="store vectors as float16 (half the size)")
+    export.add_argument("--include-docs", action="store_true", help="also copy the stored PDFs")
+    export.add_argument("--batch-size", type=int, default=1000)
+    load = commands.add_parser("import", help="load a snapshot into the vector store")
+    load.add_argument("directory")
+    load.add_argument("--replace", action="store_true", help="overwrite a non-empty collection")
+    load.add_argument("--batch-size", type=int, default=1000)
+    verify = commands.add_parser("verify", help="check a snapshot's checksums")
+    verify.add_argument("directory")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        if args.command == "export":
+            manifest = export_snapshot(args.directory, args.float16, args.include_docs, args.batch_size)
+        elif args.command == "import":
+            manifest = import_snapshot(args.directory, args.replace, args.batch_size)
+        else:
+            manifest = verify_snapshot(args.directory)
+    except SnapshotError as e:
+        print(f"{args.command} failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    size = sum(f["bytes"] for f in manifest["files"].values())
+    print(f"{args.command}: {manifest['count']} chunks, dim {manifest['dim']}, {manifest['dtype']}, "
+          f"{size / (1024 * 1024):.1f} MB in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Rolling meeting summaries, updated incrementally from transcript deltas.
+
+save_transcription appends lines to data/transcripts/<room>.txt and calls
+notify(room). Every SUMMARY_INTERVAL seconds a background thread takes the
+rooms with new lines. For each one it reads only the bytes after the room's
+checkpoint and asks the chat model to fold them into the previous summary.
+It then writes the new checkpoint to data/summaries/<room>.json: byte
+offset, line count, summary and update time. Reading a summary is one small
+file read, however long the meeting has run.
+
+A failed update is retried with exponential backoff, at most
+SUMMARY_MAX_RETRIES times, and not at all when no API key is configured.
+
+Summaries are updated by the process that receives the transcript lines.
+With several server workers, a room's update holds an exclusive lock on
+data/summaries/<room>.lock, so only one process folds a delta at a time; the
+others retry on their next pass.
+"""
+import contextlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates are only serialized within a process
+    fcntl = None
+
+try:
+    from .metrics import REGISTRY  # local module when packaged
+    from .prompts import SUMMARY_INSTRUCTION
+except ImportError:
+    from metrics import REGISTRY  # fallback when running scripts directly
+    from prompts import SUMMARY_INSTRUCTION
+
+logger = logging.getLogger("summaries")
+
+DATA_DIR = Path(os.getenv("RAG_DATA_DIR") or Path(__file__).parent / "data")
+TRANSCRIPTS_DIR = DATA_DIR / "transcripts"
+SUMMARIES_DIR = DATA_DIR / "summaries"
+
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
+# Overridable so tests and benchmarks can point at a local stand-in
+CHAT_URL = os.getenv("OPENAI_CHAT_URL", "https://api.openai.com/v1/chat/completions")
+# Seconds between summary updates of a room; 0 disables rolling summaries
+SUMMARY_INTERVAL = float(os.getenv("SUMMARY_INTERVAL", "30"))
+# Transcript bytes folded into the summary per model call
+SUMMARY_MAX_DELTA_BYTES = int(os.getenv("SUMMARY_MAX_DELTA_BYTES", "32768"))
+# Rooms summarized at the same time
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "4"))
+# Failed updates of a room are retried this many times, backing off from
+# SUMMARY_INTERVAL up to SUMMARY_MAX_BACKOFF seconds; new lines start over
+SUMMARY_MAX_RETRIES = int(os.getenv("SUMMARY_MAX_RETRIES", "5"))
+SUMMARY_MAX_BACKOFF = float(os.getenv("SUMMARY_MAX_BACKOFF", "600"))
+
+# Room names double as file names, so only these are accepted
+ROOM_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,127}$")
+
+SUMMARY_UPDATE_SECONDS = REGISTRY.histogram(
+    "summary_update_seconds", "Time to fold one transcript delta into a room's summary.")
+SUMMARY_ERRORS = REGISTRY.counter("summary_errors_total", "Failed summary updates.")
+
+# Pooled HTTP connections to the chat API
+_http = requests.Session()
+_pending: Set[str] = set()
+# Consecutive failed updates of each room, and when it may be retried
+_failures: Dict[str, int] = {}
+_retry_at: Dict[str, float] = {}
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_warned_missing_key = False
+
+
+class MissingAPIKey(RuntimeError):
+    """No chat API key is configured; retrying cannot help."""
+
+
+def valid_room(room: str) -> bool:
+    return bool(ROOM_RE.match(room or ""))
+
+
+def _checkpoint_path(room: str) -> Path:
+    return SUMMARIES_DIR / f"{room}.json"
+
+
+def load_checkpoint(room: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_checkpoint_path(room), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_checkpoint(room: str, checkpoint: Dict[str, Any]) -> None:
+    SUMMARIES_DIR.mkdir(parents=True, exist_ok=True)
+    path = _checkpoint_path(room)
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    # Readers see either the old checkpoint or the new one, never a partial file
+    os.replace(tmp_path, path)
+
+
+def get_summary(room: str) -> Optional[Dict[str, Any]]:
+    """
+    The room's current summary, with pending_bytes of transcript not yet
+    folded into it. None if the room has no transcript.
+    """
+    if not valid_room(room):
+        return None
+    try:
+        size = (TRANSCRIPTS_DIR / f"{room}.txt").stat().st_size
+    except OSError:
+        size = None
+    checkpoint = load_checkpoint(room)
+    if checkpoint is None:
+        if size is None:
+            return None
+        checkpoint = {"room": room, "offset": 0, "lines": 0, "summary": "", "updated_at": None}
+    checkpoint["pending_bytes"] = max(0, (size or 0) - checkpoint["offset"])
+    return checkpoint
+
+
+def _fold(summary: str, lines: str) -> str:
+    """Ask the chat model for summary updated with the new transcript lines."""
+    api_key = os.getenv("openai_api_key") or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise MissingAPIKey("OpenAI API key not found in environment (openai_api_key or OPENAI_API_KEY)")
+    data = {
+        "model": SUMMARY_MODEL,
+        "temperature": 0.2,
+        "messages": [
+            {"role": "system", "content": SUMMARY_INSTRUCTION},
+            {"role": "user", "content": f"Current summary:\n{summary or '(none yet)'}\n\n"
+                                        f"New transcript lines:\n{lines}"},
+        ],
+    }
+    resp = _http.post(CHAT_URL, headers={"Authorization": f"Bearer {api_key}"}, json=data, timeout=60)
+    resp.raise_for_status()
+    return resp.json()["choices"][0]["message"]["content"].strip()
+
+
+class RoomBusy(RuntimeError):
+    """Another process is updating the room's summary."""
+
+
+@contextlib.contextmanager
+def _room_lock(room: str) -> Iterator[None]:
+    """Hold the room's cross-process update lock. Raises RoomBusy if it is taken."""
+    if fcntl is None:
+        yield
+        return
+    SUMMARIES_DIR.mkdir(parents=True, exist_ok=True)
+    with open(SUMMARIES_DIR / f"{room}.lock", "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise RoomBusy(room)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def update_room(room: str) -> None:
+    """
+    Fold every complete transcript line after the room's checkpoint into its summary.
+    Raises RoomBusy if another process is updating the room.
+    """
+    transcript = TRANSCRIPTS_DIR / f"{room}.txt"
+    try:
+        size = transcript.stat().st_size
+    except OSError:
+        return
+    with _room_lock(room):
+        # Read under the lock, so a checkpoint another process just wrote is seen
+        checkpoint = load_checkpoint(room)
+        if checkpoint is None or checkpoint["offset"] > size:
+            # No summary yet, or the transcript was replaced: start from the beginning
+            checkpoint = {"room": room, "offset": 0, "lines": 0, "summary": "", "updated_at": None}
+
+        while checkpoint["offset"] < size:
+            with open(transcript, "rb") as f:
+                f.seek(checkpoint["offset"])
+                chunk = f.read(SUMMARY_MAX_DELTA_BYTES)
+            end = chunk.rfind(b"\n") + 1
+            if not end:
+                if len(chunk) < SUMMARY_MAX_DELTA_BYTES:
+                    # Only a partially written line so far
+                    return
+                # A single line longer than the limit is cut
+                end = len(chunk)
+            delta = chunk[:end].decode("utf-8", errors="replace")
+            with SUMMARY_UPDATE_SECONDS.time():
+                checkpoint["summary"] = _fold(checkpoint["summary"], delta)
+            checkpoint["offset"] += end
+            checkpoint["lines"] += delta.count("\n")
+            checkpoint["updated_at"] = datetime.now(timezone.utc).isoformat()
+            _save_checkpoint(room, checkpoint)
+
+
+def _update(room: str) -> None:
+    try:
+        update_room(room)
+    except RoomBusy:
+        # Another worker is folding this room; lines it didn't see are picked up next pass
+        with _lock:
+            _pending.add(room)
+    except MissingAPIKey as e:
+        global _warned_missing_key
+        SUMMARY_ERRORS.inc()
+        # Not retried: the room is picked up again when new lines arrive
+        if not _warned_missing_key:
+            _warned_missing_key = True
+            logger.error("Rolling summaries are disabled: %s", e)
+        _record_success(room)
+    except Exception:
+        SUMMARY_ERRORS.inc()
+        logger.exception("Failed to update summary of %s", room)
+        _schedule_retry(room)
+    else:
+        _record_success(room)
+
+
+def _record_success(room: str) -> None:
+    with _lock:
+        _failures.pop(room, None)
+        _retry_at.pop(room, None)
+
+
+def _schedule_retry(room: str) -> None:
+    """Retry room after a backoff, unless it has failed SUMMARY_MAX_RETRIES times in a row."""
+    with _lock:
+        failures = _failures.get(room, 0) + 1
+        if failures > SUMMARY_MAX_RETRIES:
+            logger.error("Giving up on the summary of %s after %d attempts until new lines arrive",
+                         room, failures)
+            _failures.pop(room, None)
+            _retry_at.pop(room, None)
+            return
+        _failures[room] = failures
+        backoff = min(SUMMARY_MAX_BACKOFF, max(SUMMARY_INTERVAL, 1.0) * 2 ** (failures - 1))
+        _retry_at[room] = time.monotonic() + backoff
+        # The checkpoint still points at the unsummarized lines
+        _pending.add(room)
+
+
+def _due_rooms() -> List[str]:
+    """Take the pending rooms that are not backing off from a failure."""
+    now = time.monotonic()
+    with _lock:
+        rooms = [room for room in _pending if _retry_at.get(room, 0.0) <= now]
+        _pending.difference_update(rooms)
+    return rooms
+
+
+def _run() -> None:
+    with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summaries") as pool:
+        while True:
+            time.sleep(SUMMARY_INTERVAL)
+            # Each batch finishes before the next starts, so a room is never updated twice at once
+            list(pool.map(_update, _due_rooms()))
+
+
+def notify(room: str) -> None:
+    """Mark room as having new transcript lines. Starts the background updater on first use."""
+    global _thread
+    if SUMMARY_INTERVAL <= 0 or not valid_room(room):
+        return
+    with _lock:
+        _pending.add(room)
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name="summaries", daemon=True)
+            _thread.start()
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Tests import backend modules the way the scripts do, from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# rag opens its Chroma store on import; keep test data out of backend/data
+os.environ.setdefault("RAG_DATA_DIR", tempfile.mkdtemp(prefix="backend-tests-"))
@@ -0,0 +1,127 @@
+import io
+import threading
+import time
+
+import pytest
+
+import admission
+import rag
+import server
+import summaries
+import uploads
+from admission import AdmissionRejected, IngestionGate
+
+MB = 1024 * 1024
+
+
+def _hold(gate, size, started, release, outcomes, name):
+    try:
+        with gate.admit(size):
+            started.append(name)
+            release.wait(5)
+        outcomes[name] = "ok"
+    except AdmissionRejected as e:
+        outcomes[name] = e
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def test_gate_queues_in_order_then_rejects_when_full():
+    gate = IngestionGate(max_concurrent=1, memory_budget_bytes=100 * MB, memory_factor=1.0,
+                         max_queued=2, queue_timeout=5)
+    release = threading.Event()
+    started, outcomes = [], {}
+    threads = []
+    for name in ("a", "b", "c"):
+        t = threading.Thread(target=_hold, args=(gate, MB, started, release, outcomes, name))
+        t.start()
+        threads.append(t)
+        # Arrive one after another so the queue order is known
+        _wait_until(lambda: gate.stats()["active"] + gate.stats()["queued"] == len(threads))
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        with gate.admit(MB):
+            pass
+    assert rejected.value.retry_after > 0
+    assert gate.stats() == {"active": 1, "queued": 2, "reserved_bytes": MB, "budget_bytes": 100 * MB}
+
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert started == ["a", "b", "c"]
+    assert outcomes == {"a": "ok", "b": "ok", "c": "ok"}
+    assert gate.stats()["reserved_bytes"] == 0
+
+
+def test_gate_times_out_and_admits_by_memory():
+    # Two 4MB jobs fit in the budget together, a third does not
+    gate = IngestionGate(max_concurrent=4, memory_budget_bytes=8 * MB, memory_factor=1.0,
+                         max_queued=4, queue_timeout=0.2)
+    release = threading.Event()
+    started, outcomes = [], {}
+    holders = [threading.Thread(target=_hold, args=(gate, 4 * MB, started, release, outcomes, n))
+               for n in ("a", "b")]
+    for t in holders:
+        t.start()
+    _wait_until(lambda: len(started) == 2)
+
+    began = time.monotonic()
+    with pytest.raises(AdmissionRejected, match="Timed out"):
+        with gate.admit(4 * MB):
+            pass
+    assert time.monotonic() - began >= 0.2
+    assert gate.stats()["queued"] == 0
+
+    release.set()
+    for t in holders:
+        t.join(5)
+    with gate.admit(4 * MB):
+        assert gate.stats()["active"] == 1
+
+
+def test_upload_burst_queues_then_gets_503_from_the_gate(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "TRANSCRIPTS_DIR", tmp_path)
+    monkeypatch.setattr(summaries, "SUMMARY_INTERVAL", 0)
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 1024 * 1024)
+    gate = IngestionGate(max_concurrent=1, max_queued=1, queue_timeout=5)
+    monkeypatch.setattr(admission, "INGESTION", gate)
+    release = threading.Event()
+
+    def slow_ingest(file_path, original_name, sha256):
+        release.wait(5)
+        return f"doc-{original_name}"
+
+    monkeypatch.setattr(rag, "_add_pdf", slow_ingest)
+
+    responses = {}
+
+    def upload(name):
+        data = {"file": (io.BytesIO(b"%PDF-1.4 burst"), f"{name}.pdf")}
+        responses[name] = server.app.test_client().post("/uploadDoc", data=data,
+                                                        content_type="multipart/form-data")
+
+    threads = []
+    for name in ("first", "second"):
+        t = threading.Thread(target=upload, args=(name,))
+        t.start()
+        threads.append(t)
+        _wait_until(lambda: gate.stats()["active"] + gate.stats()["queued"] == len(threads))
+
+    # Above INGEST_MAX_CONCURRENT + INGEST_MAX_QUEUED: answered by the gate, not a route limit
+    upload("third")
+    third = responses["third"]
+    assert third.status_code == 503
+    assert third.headers["Retry-After"] == "5"
+    assert "waiting to be ingested" in third.get_json()["error"]
+
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert responses["first"].status_code == 200
+    assert responses["second"].status_code == 200
+    assert responses["second"].get_json()["doc_id"] == "doc-second.pdf"
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+import metrics
+from bringup import BringUp
+
+
+def _step(log, name, seconds=0.0, error=None):
+    async def run():
+        log.append(f"{name}:start")
+        await asyncio.sleep(seconds)
+        log.append(f"{name}:end")
+        if error is not None:
+            raise error
+        return name
+    return run
+
+
+def test_phases_wait_for_their_dependencies():
+    log = []
+    bringup = BringUp()
+    bringup.phase("greet", _step(log, "greet"), depends_on=["session", "avatar"])
+    bringup.phase("session", _step(log, "session", 0.02))
+    bringup.phase("avatar", _step(log, "avatar", 0.01), depends_on=["session"])
+
+    results = asyncio.run(bringup.run())
+
+    assert results == {"greet": "greet", "session": "session", "avatar": "avatar"}
+    assert log == ["session:start", "session:end", "avatar:start", "avatar:end", "greet:start", "greet:end"]
+
+
+def test_independent_phases_overlap():
+    log = []
+    bringup = BringUp()
+    for name in ("session", "mcp_tools", "rag"):
+        bringup.phase(name, _step(log, name, 0.1))
+
+    async def timed():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await bringup.run()
+        return loop.time() - started
+
+    assert asyncio.run(timed()) < 0.25
+    assert log[:3] == ["session:start", "mcp_tools:start", "rag:start"]
+
+
+def test_failed_dependency_skips_dependents():
+    log = []
+    bringup = BringUp()
+    bringup.phase("session", _step(log, "session", error=RuntimeError("room gone")))
+    bringup.phase("greet", _step(log, "greet"), depends_on=["session"])
+    bringup.phase("mcp_tools", _step(log, "mcp_tools", 0.01))
+
+    with pytest.raises(RuntimeError, match="room gone"):
+        asyncio.run(bringup.run())
+
+    assert "greet:start" not in log
+    # Unrelated phases still run to completion before the failure is raised
+    assert "mcp_tools:end" in log
+    assert "greet" not in bringup.timings and "session" in bringup.timings
+
+
+def test_unknown_dependency_is_rejected():
+    bringup = BringUp()
+    bringup.phase("greet", _step([], "greet"), depends_on=["session"])
+
+    with pytest.raises(ValueError, match="unknown phases"):
+        asyncio.run(bringup.run())
+
+
+def test_timings_and_first_word_are_recorded():
+    bringup = BringUp(job_id="job-1", room="room-1")
+    bringup.phase("session", _step([], "session", 0.05))
+    bringup.phase("greet", _step([], "greet", 0.01), depends_on=["session"])
+    recorded = metrics.BRINGUP_PHASE_SECONDS.count(phase="greet")
+
+    asyncio.run(bringup.run())
+    bringup.mark("first_word")
+    first_word = bringup.time_to_first_word_ms
+    assert bringup.mark("first_word") == first_word  # only the first occurrence counts
+
+    session, greet = bringup.timings["session"], bringup.timings["greet"]
+    assert session["duration_ms"] >= 45
+    assert greet["start_ms"] >= session["start_ms"] + session["duration_ms"] - 1
+    report = bringup.report()
+    assert report["job_id"] == "job-1" and report["phases"] == bringup.timings
+    assert "bringup_complete" in report["marks"]
+    assert metrics.BRINGUP_PHASE_SECONDS.count(phase="greet") == recorded + 1
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import index_maint
+import rag
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bench"))
+from fake_embeddings import embed  # noqa: E402
+
+
+@pytest.fixture
+def stored_pdf():
+    rag._ensure_dirs()
+    path = rag.stored_pdf_path("f" * 64)
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+    yield path
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def test_prune_keeps_recent_unreferenced_pdfs(stored_pdf):
+    # Looks like an upload whose chunks are still being embedded
+    report = index_maint.prune_orphans(grace_seconds=3600)
+    assert os.path.exists(stored_pdf)
+    assert report["deleted_files"] == []
+
+
+def test_prune_deletes_old_unreferenced_pdfs(stored_pdf):
+    old = time.time() - 7200
+    os.utime(stored_pdf, (old, old))
+    dry = index_maint.prune_orphans(dry_run=True, grace_seconds=0)
+    assert os.path.basename(stored_pdf) in dry["deleted_files"] and os.path.exists(stored_pdf)
+    report = index_maint.prune_orphans(grace_seconds=0)
+    assert os.path.basename(stored_pdf) in report["deleted_files"]
+    assert not os.path.exists(stored_pdf)
+
+
+def test_prune_rechecks_files_indexed_after_the_scan(stored_pdf, monkeypatch):
+    sha256 = os.path.basename(stored_pdf)[:-4]
+    real_find = index_maint.find_orphans
+
+    def find_then_index():
+        found = real_find()
+        # The upload finishes between the scan and the delete
+        rag.collection.add(ids=["late_0"], documents=["late"], embeddings=[embed("late")],
+                           metadatas=[{"doc_id": "late", "sha256": sha256}])
+        return found
+
+    monkeypatch.setattr(index_maint, "find_orphans", find_then_index)
+    try:
+        report = index_maint.prune_orphans(grace_seconds=0)
+        assert report["deleted_files"] == []
+        assert os.path.exists(stored_pdf)
+    finally:
+        rag.collection.delete(ids=["late_0"])
+
+
+def test_interrupted_rebuild_is_recovered():
+    rag.collection.add(ids=["keep_0"], documents=["keep"], embeddings=[embed("keep")],
+                       metadatas=[{"doc_id": "keep", "sha256": "0" * 64}])
+    count = rag.collection.count()
+    # Stopped after retiring the old collection, before the new one was renamed in
+    rag.collection.modify(name=f"{rag.RETIRED_PREFIX}{int(time.time())}")
+    try:
+        rag.collection = rag._open_collection()
+        names = [getattr(c, "name", c) for c in rag.chroma_client.list_collections()]
+        assert rag.collection.count() == count
+        assert not [n for n in names if n.startswith(rag.RETIRED_PREFIX)]
+    finally:
+        rag.collection.delete(ids=["keep_0"])
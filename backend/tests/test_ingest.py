@@ -0,0 +1,106 @@
+import contextlib
+
+import pytest
+
+import admission
+import ingest
+import rag
+
+
+class _Gate:
+    """Records admitted windows; rejects the windows listed in reject."""
+
+    memory_budget = 100 * 1024 * 1024
+    memory_factor = 1.0
+    max_concurrent = 2
+
+    def __init__(self, reject=()):
+        self.reject = set(reject)
+        self.admitted = []
+
+    @contextlib.contextmanager
+    def admit(self, size_bytes):
+        window = len(self.admitted)
+        self.admitted.append(size_bytes)
+        if window in self.reject:
+            raise admission.AdmissionRejected("saturated")
+        yield
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """Fake parse/embed/index steps; returns the ordered log of what ran."""
+    log = []
+    monkeypatch.setattr(rag, "_store_pdf", lambda path, sha256: (path, sha256))
+    monkeypatch.setattr(rag, "_remove_stored_pdf", lambda sha256: None)
+
+    def extract(path):
+        log.append(("extract", path.rsplit("/", 1)[-1]))
+        return ["chunk one", "chunk two"]
+
+    def index(doc_id, filename, sha256, chunks, embeddings):
+        assert len(embeddings) == len(chunks)
+        log.append(("index", filename))
+
+    monkeypatch.setattr(rag, "_extract_chunks", extract)
+    monkeypatch.setattr(rag, "_embed_texts", lambda texts: [[0.0] for _ in texts])
+    monkeypatch.setattr(rag, "_index_document", index)
+
+    def make(sizes):
+        files = []
+        for i, size in enumerate(sizes):
+            path = tmp_path / f"f{i}.pdf"
+            path.write_bytes(b"x" * size)
+            files.append(ingest.PendingFile(str(path), f"f{i}.pdf", f"sha{i}"))
+        return files
+
+    return make, log
+
+
+def test_files_are_admitted_and_indexed_window_by_window(pipeline, monkeypatch):
+    make, log = pipeline
+    gate = _Gate()
+    monkeypatch.setattr(admission, "INGESTION", gate)
+    monkeypatch.setattr(ingest, "WINDOW_FILES", 2)
+
+    results = ingest.ingest_files(make([10, 20, 30, 40, 50]))
+
+    assert [r["filename"] for r in results] == [f"f{i}.pdf" for i in range(5)]
+    assert all(r["chunk_count"] == 2 for r in results)
+    assert gate.admitted == [30, 70, 50]
+    # A window is indexed before the next one is parsed
+    assert log.index(("index", "f1.pdf")) < log.index(("extract", "f2.pdf"))
+    assert log.index(("index", "f3.pdf")) < log.index(("extract", "f4.pdf"))
+
+
+def test_windows_fit_a_share_of_the_memory_budget(pipeline, monkeypatch):
+    make, _ = pipeline
+    gate = _Gate()
+    gate.memory_budget = 200
+    monkeypatch.setattr(admission, "INGESTION", gate)
+
+    # Each window may use half the budget; the 150 byte file goes alone
+    windows = ingest._windows(make([40, 50, 30, 150, 10]))
+    assert [[f.filename for f in w] for w in windows] == [
+        ["f0.pdf", "f1.pdf"], ["f2.pdf"], ["f3.pdf"], ["f4.pdf"]]
+
+
+def test_rejected_later_window_reports_errors_for_remaining_files(pipeline, monkeypatch):
+    make, log = pipeline
+    monkeypatch.setattr(admission, "INGESTION", _Gate(reject={1}))
+    monkeypatch.setattr(ingest, "WINDOW_FILES", 2)
+
+    results = ingest.ingest_files(make([10, 10, 10, 10]))
+
+    assert [("doc_id" in r) for r in results] == [True, True, False, False]
+    assert results[2]["error"] == "saturated"
+    assert ("extract", "f2.pdf") not in log
+
+
+def test_rejected_first_window_raises(pipeline, monkeypatch):
+    make, log = pipeline
+    monkeypatch.setattr(admission, "INGESTION", _Gate(reject={0}))
+
+    with pytest.raises(admission.AdmissionRejected):
+        ingest.ingest_files(make([10, 10]))
+    assert log == []
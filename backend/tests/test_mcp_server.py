@@ -0,0 +1,211 @@
+import asyncio
+import contextlib
+
+import anyio
+import mcp.types
+import pytest
+from mcp.server.lowlevel import Server
+from mcp.shared.memory import create_client_server_memory_streams
+
+from mcp_client import server as mcp_server
+from mcp_client.resilience import CircuitBreaker
+from mcp_client.server import _MCPServerWithClientSession
+
+
+class _MemoryServer(_MCPServerWithClientSession):
+    """Client over in-memory streams to a server running in the same loop."""
+
+    def __init__(self, streams, **kwargs):
+        super().__init__(cache_tools_list=True, **kwargs)
+        self._streams = streams
+
+    @property
+    def name(self) -> str:
+        return "memory"
+
+    @contextlib.asynccontextmanager
+    async def create_streams(self):
+        yield self._streams
+
+
+def _tool_server(tools):
+    server = Server("test")
+
+    @server.list_tools()
+    async def list_tools():
+        return list(tools)
+
+    @server.call_tool()
+    async def call_tool(name, arguments):
+        if name == "sleep":
+            await asyncio.sleep(arguments["seconds"])
+        elif name == "add_tool":
+            tools.append(mcp.types.Tool(name=f"tool{len(tools)}", inputSchema={"type": "object"}))
+            await server.request_context.session.send_tool_list_changed()
+        return [mcp.types.TextContent(type="text", text="ok")]
+
+    return server
+
+
+@contextlib.asynccontextmanager
+async def _connected(tools, **kwargs):
+    server = _tool_server(tools)
+    async with create_client_server_memory_streams() as (client_streams, server_streams):
+        serving = asyncio.create_task(
+            server.run(server_streams[0], server_streams[1], server.create_initialization_options()))
+        client = _MemoryServer(client_streams, auto_reconnect=False, **kwargs)
+        try:
+            await asyncio.wait_for(client.connect(), 5)
+            yield client
+        finally:
+            await client.cleanup()
+            serving.cancel()
+            await asyncio.gather(serving, return_exceptions=True)
+
+
+def test_listener_can_list_tools_after_list_changed():
+    tools = [mcp.types.Tool(name="add_tool", inputSchema={"type": "object"})]
+
+    async def scenario():
+        async with _connected(tools) as client:
+            assert len(await client.list_tools()) == 1
+            refreshed = asyncio.get_running_loop().create_future()
+
+            async def on_changed():
+                refreshed.set_result(await client.list_tools())
+
+            client.add_tools_changed_listener(on_changed)
+            await client.call_tool("add_tool", {})
+            # Used to deadlock: the listener awaited list_tools() inside the receive loop
+            listed = await asyncio.wait_for(refreshed, 5)
+            assert [t.name for t in listed] == ["add_tool", "tool1"]
+            assert len(await asyncio.wait_for(client.list_tools(), 5)) == 2
+
+    asyncio.run(scenario())
+
+
+def test_failing_listener_is_logged_not_raised(caplog):
+    tools = [mcp.types.Tool(name="add_tool", inputSchema={"type": "object"})]
+
+    async def scenario():
+        async with _connected(tools) as client:
+            called = asyncio.Event()
+
+            def broken():
+                called.set()
+                raise ValueError("boom")
+
+            client.add_tools_changed_listener(broken)
+            await client.call_tool("add_tool", {})
+            await asyncio.wait_for(called.wait(), 5)
+            await asyncio.sleep(0)
+            assert len(await asyncio.wait_for(client.list_tools(), 5)) == 2
+
+    asyncio.run(scenario())
+    assert "boom" in caplog.text
+
+
+def test_cancelled_trial_call_releases_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+
+    async def scenario():
+        async with _connected([], circuit_breaker=breaker) as client:
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+            trial = asyncio.create_task(client.call_tool("sleep", {"seconds": 10}))
+            await asyncio.sleep(0.05)
+            assert not breaker.allow()
+            trial.cancel()
+            await asyncio.gather(trial, return_exceptions=True)
+            # Used to stay "in flight" forever, rejecting every later call
+            await asyncio.wait_for(client.call_tool("sleep", {"seconds": 0}), 5)
+            assert breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_waiting_for_a_slot_does_not_count_toward_the_deadline():
+    breaker = CircuitBreaker(failure_threshold=1)
+
+    async def scenario():
+        async with _connected([], circuit_breaker=breaker, call_timeout=0.5,
+                              max_concurrent_calls=1) as client:
+            # Each call takes 0.3s alone; the later ones queue well past 0.5s in total
+            calls = [client.call_tool("sleep", {"seconds": 0.3}) for _ in range(3)]
+            results = await asyncio.gather(*calls, return_exceptions=True)
+            assert [type(r).__name__ for r in results] == ["ToolQueueFullError" if i == 2 else "CallToolResult"
+                                                           for i in range(3)]
+            assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+    asyncio.run(scenario())
+
+
+class _RestartableServer(_MCPServerWithClientSession):
+    """Client that starts a fresh in-memory server for every connection."""
+
+    def __init__(self, **kwargs):
+        super().__init__(cache_tools_list=True, **kwargs)
+        self.transports = []
+
+    @property
+    def name(self) -> str:
+        return "restartable"
+
+    @contextlib.asynccontextmanager
+    async def create_streams(self):
+        async with create_client_server_memory_streams() as (client_streams, server_streams):
+            server = _tool_server([])
+            serving = asyncio.create_task(
+                server.run(server_streams[0], server_streams[1], server.create_initialization_options()))
+            self.transports.append((serving, server_streams))
+            try:
+                yield client_streams
+            finally:
+                serving.cancel()
+                await asyncio.gather(serving, return_exceptions=True)
+
+
+async def _kill(serving, server_streams, error=None):
+    """Stop a server as a crash would; optionally deliver the transport's error first."""
+    if error is not None:
+        await server_streams[1].send(error)
+    serving.cancel()
+    await asyncio.gather(serving, return_exceptions=True)
+    await server_streams[0].aclose()
+    await server_streams[1].aclose()
+
+
+async def _wait_until(predicate, timeout=5.0):
+    async def poll():
+        while not predicate():
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+@pytest.mark.parametrize("reported_error", [True, False], ids=["transport-error", "closed-stream"])
+def test_dropped_session_reconnects(monkeypatch, reported_error):
+    monkeypatch.setattr(mcp_server, "RECONNECT_INITIAL_DELAY", 0.01)
+
+    async def scenario():
+        client = _RestartableServer(circuit_breaker=CircuitBreaker(failure_threshold=3))
+        try:
+            await asyncio.wait_for(client.connect(), 5)
+            await asyncio.wait_for(client.call_tool("sleep", {"seconds": 0}), 5)
+
+            serving, server_streams = client.transports[-1]
+            if reported_error:
+                # What sse_client hands the session when the stream breaks
+                await _kill(serving, server_streams, RuntimeError("peer closed connection"))
+            else:
+                # No error is reported; the next request finds the stream closed
+                await _kill(serving, server_streams)
+                with pytest.raises((anyio.ClosedResourceError, anyio.BrokenResourceError)):
+                    await asyncio.wait_for(client.call_tool("sleep", {"seconds": 0}), 5)
+
+            await _wait_until(lambda: len(client.transports) == 2 and client.connected)
+            result = await asyncio.wait_for(client.call_tool("sleep", {"seconds": 0}), 5)
+            assert result.content[0].text == "ok"
+        finally:
+            await client.cleanup()
+
+    asyncio.run(scenario())
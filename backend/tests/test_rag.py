@@ -0,0 +1,210 @@
+import os
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+import rag
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bench"))
+from bench_rag import make_pdf  # noqa: E402
+from fake_embeddings import embed  # noqa: E402
+
+WORDS = "sprint backlog story estimate velocity blocker review planning release deploy owner goal".split()
+
+
+def _pages(seed=0, pages=10, lines=30):
+    rng = random.Random(seed)
+    return [[f"page {p} line {i}: " + " ".join(rng.choice(WORDS) for _ in range(10)) for i in range(lines)]
+            for p in range(pages)]
+
+
+@pytest.fixture(autouse=True)
+def fake_embeddings(monkeypatch):
+    calls = []
+
+    def fake(texts, priority="bulk"):
+        calls.append(len(texts))
+        return [embed(t) for t in texts]
+
+    monkeypatch.setattr(rag, "_embed_texts", fake)
+    return calls
+
+
+def _ingest(tmp_path, pages, name="doc.pdf"):
+    path = tmp_path / name
+    make_pdf(path, pages)
+    return rag.add_pdf(str(path), original_name=name)
+
+
+def _update(tmp_path, doc_id, pages, name="doc-v2.pdf"):
+    path = tmp_path / name
+    make_pdf(path, pages)
+    return rag.update_pdf(doc_id, str(path), original_name="doc.pdf")
+
+
+def test_chunk_boundaries_survive_an_insertion():
+    pages = ["\n".join(lines) for lines in _pages()]
+    before = set(rag._chunk_pages(pages))
+    edited = list(pages)
+    edited[0] = "A new line inserted at the top of the first page.\n" + edited[0]
+    after = set(rag._chunk_pages(edited))
+    assert len(after - before) <= 2
+    assert len(before & after) >= len(before) - 2
+
+
+def test_chunks_stay_within_bounds_and_cover_the_text():
+    lines = [f"line {i} " + " ".join(["word"] * 30) for i in range(100)]
+    text = "\n".join(lines) + "\n" + "x" * 4000
+    chunks = rag._chunk_page(text, min_chars=1100, max_chars=1500)
+    # A short remainder at the end of the page may join the last chunk
+    assert all(len(c) <= 1500 + 1100 for c in chunks)
+    assert all(any(line in c for c in chunks) for line in lines)
+    assert sum(c.count("x") for c in chunks) >= 4000
+
+
+def test_update_after_an_insertion_reuses_most_chunks(tmp_path):
+    pages = _pages()
+    doc_id = _ingest(tmp_path, pages)
+    edited = [list(p) for p in pages]
+    edited[0].insert(3, "One more line about the release plan.")
+    result = _update(tmp_path, doc_id, edited)
+    assert result["added"] <= 2
+    assert result["removed"] <= 2
+    assert result["reused"] >= result["chunk_count"] - 2
+    stored = rag.collection.get(where={"doc_id": doc_id})
+    assert len(stored["ids"]) == result["chunk_count"]
+    assert not any(m.get("pending") for m in stored["metadatas"])
+
+
+class _FailingDelete:
+    """Collection proxy whose first delete fails, as a storage error mid-update would."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self._failed = False
+
+    def delete(self, *args, **kwargs):
+        if not self._failed:
+            self._failed = True
+            raise RuntimeError("disk full")
+        return self._collection.delete(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+def test_failed_update_rolls_back(tmp_path, monkeypatch):
+    pages = _pages(seed=1)
+    doc_id = _ingest(tmp_path, pages)
+    before = rag.collection.get(where={"doc_id": doc_id})
+
+    edited = [list(p) for p in pages]
+    edited[2] = [line.upper() for line in edited[2]]
+    real = rag.collection
+    monkeypatch.setattr(rag, "collection", _FailingDelete(real))
+    with pytest.raises(RuntimeError):
+        _update(tmp_path, doc_id, edited)
+    monkeypatch.setattr(rag, "collection", real)
+
+    after = real.get(where={"doc_id": doc_id})
+    assert sorted(after["ids"]) == sorted(before["ids"])
+    assert sorted(m["sha256"] for m in after["metadatas"]) == sorted(m["sha256"] for m in before["metadatas"])
+    assert os.path.exists(rag.stored_pdf_path(before["metadatas"][0]["sha256"]))
+
+
+def test_search_skips_pending_chunks(tmp_path):
+    doc_id = _ingest(tmp_path, [["The launch codename is bluefalcon."]], name="codename.pdf")
+    text = "The launch codename is bluefalcon, revised."
+    rag.collection.add(ids=[f"{doc_id}_pending"], documents=[text], embeddings=[embed(text)],
+                       metadatas=[{"doc_id": doc_id, "filename": "codename.pdf", "pending": True}])
+    hits = rag.search("launch codename bluefalcon", top_k=10)
+    assert text not in [h["text"] for h in hits]
+    assert any("bluefalcon" in h["text"] for h in hits)
+
+
+@pytest.fixture
+def dated_documents(monkeypatch):
+    docs = [
+        {"doc_id": "a", "filename": "a.pdf", "upload_date": "2024-03-01T09:30:00", "chunk_count": 1},
+        {"doc_id": "b", "filename": "b.pdf", "upload_date": "2024-03-01T23:59:59.500000", "chunk_count": 1},
+        {"doc_id": "c", "filename": "c.pdf", "upload_date": "2024-03-02T00:00:00", "chunk_count": 1},
+        {"doc_id": "d", "filename": "d.pdf", "upload_date": "", "chunk_count": 1},
+    ]
+    monkeypatch.setattr(rag, "list_documents", lambda: [dict(d) for d in docs])
+
+
+def _ids(docs):
+    return [d["doc_id"] for d in docs]
+
+
+def test_date_filters_compare_datetimes(dated_documents):
+    # As strings "2024-03-01T09:30:00" sorts before this bound and "a" was dropped
+    docs, total = rag.query_documents(uploaded_after="2024-03-01T09:30:00.000000")
+    assert _ids(docs) == ["a", "b", "c"] and total == 3
+    docs, _ = rag.query_documents(uploaded_after="2024-03-01T09:30:00.000001")
+    assert _ids(docs) == ["b", "c"]
+    docs, _ = rag.query_documents(uploaded_before="2024-03-02")
+    assert _ids(docs) == ["a", "b"]
+    docs, _ = rag.query_documents(uploaded_after="2024-03-01", uploaded_before="2024-03-01T12:00:00")
+    assert _ids(docs) == ["a"]
+
+
+def test_date_filters_accept_offsets(dated_documents):
+    local_midnight = datetime(2024, 3, 2).astimezone()
+    docs, _ = rag.query_documents(uploaded_after=local_midnight.astimezone(timezone.utc).isoformat())
+    assert _ids(docs) == ["c"]
+
+
+def test_invalid_date_filter_is_rejected(dated_documents):
+    with pytest.raises(ValueError):
+        rag.query_documents(uploaded_after="last tuesday")
+
+
+def _lock_is_free() -> bool:
+    """Whether another thread could take rag._write_lock right now."""
+    free = []
+
+    def probe():
+        if rag._write_lock.acquire(blocking=False):
+            rag._write_lock.release()
+            free.append(True)
+
+    t = threading.Thread(target=probe)
+    t.start()
+    t.join()
+    return bool(free)
+
+
+def test_update_embeds_without_holding_the_write_lock(tmp_path, monkeypatch):
+    pages = _pages(seed=2)
+    doc_id = _ingest(tmp_path, pages)
+    lock_free = []
+
+    def fake(texts, priority="bulk"):
+        lock_free.append(_lock_is_free())
+        return [embed(t) for t in texts]
+
+    monkeypatch.setattr(rag, "_embed_texts", fake)
+    edited = [list(p) for p in pages]
+    edited[1][0] = "A rewritten first line of the second page."
+    assert _update(tmp_path, doc_id, edited)["added"] >= 1
+    assert lock_free and all(lock_free)
+
+
+def test_update_of_a_document_deleted_while_embedding(tmp_path, monkeypatch):
+    pages = _pages(seed=3)
+    doc_id = _ingest(tmp_path, pages)
+
+    def delete_then_embed(texts, priority="bulk"):
+        rag.delete_document(doc_id)
+        return [embed(t) for t in texts]
+
+    monkeypatch.setattr(rag, "_embed_texts", delete_then_embed)
+    edited = [list(p) for p in pages]
+    edited[0][0] = "Changed."
+    assert _update(tmp_path, doc_id, edited) is None
+    assert rag.collection.get(where={"doc_id": doc_id})["ids"] == []
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from mcp_client import result_cache
+from mcp_client.result_cache import TOOL_CACHE_LOOKUPS, ToolResultCache
+
+
+class _Calls:
+    """Counts calls; each returns a numbered result after an optional delay."""
+
+    def __init__(self, delay=0.0, result=None, error=None):
+        self.count = 0
+        self.delay = delay
+        self.result = result
+        self.error = error
+
+    async def __call__(self):
+        self.count += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.result if self.result is not None else {"n": self.count}
+
+
+def test_results_are_reused_until_their_ttl_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    cache = ToolResultCache({"lookup": 30})
+    call = _Calls()
+
+    async def get(args):
+        return await cache.get_or_call("srv", "lookup", args, call)
+
+    async def main():
+        first = await get({"a": 1, "b": 2})
+        # Argument order doesn't change the key
+        assert await get({"b": 2, "a": 1}) == first
+        now[0] += 31
+        return first, await get({"a": 1, "b": 2})
+
+    first, expired = asyncio.run(main())
+    assert first == {"n": 1} and expired == {"n": 2}
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_tools_without_a_ttl_are_not_cached():
+    cache = ToolResultCache({"lookup": 30})
+    call = _Calls()
+
+    async def main():
+        for _ in range(2):
+            await cache.get_or_call("srv", "create_ticket", {}, call)
+
+    asyncio.run(main())
+    assert call.count == 2
+    assert cache.stats()["misses"] == 0
+
+
+def test_identical_concurrent_calls_share_one_request():
+    cache = ToolResultCache({"lookup": 30})
+    call = _Calls(delay=0.05)
+    coalesced_before = TOOL_CACHE_LOOKUPS.value(tool="lookup", result="coalesced")
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_call("srv", "lookup", {"q": "x"}, call) for _ in range(3)))
+
+    assert asyncio.run(main()) == [{"n": 1}] * 3
+    assert call.count == 1
+    assert cache.stats()["coalesced"] == 2
+    assert TOOL_CACHE_LOOKUPS.value(tool="lookup", result="coalesced") == coalesced_before + 2
+
+
+def test_waiter_makes_its_own_call_when_the_leader_is_cancelled():
+    cache = ToolResultCache({"lookup": 30})
+    call = _Calls(delay=0.05)
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_call("srv", "lookup", {}, call))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_call("srv", "lookup", {}, call))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == {"n": 2}
+    assert call.count == 2
+
+
+@pytest.mark.parametrize("outcome", [
+    {"result": {"isError": True, "content": []}},
+    {"error": RuntimeError("server down")},
+], ids=["error-result", "exception"])
+def test_errors_are_not_cached(outcome):
+    cache = ToolResultCache({"lookup": 30})
+    call = _Calls(**outcome)
+
+    async def get():
+        try:
+            return await cache.get_or_call("srv", "lookup", {}, call)
+        except RuntimeError as e:
+            return e
+
+    async def main():
+        await get()
+        await get()
+
+    asyncio.run(main())
+    assert call.count == 2
+    assert cache.stats()["entries"] == 0
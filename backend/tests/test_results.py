@@ -0,0 +1,30 @@
+import json
+
+from mcp_client.results import result_to_text, truncate_text
+
+
+def test_list_is_trimmed_by_whole_items():
+    items = [{"id": i, "name": f"item {i}"} for i in range(100)]
+    text = truncate_text(json.dumps(items), 300)
+    kept, note = text.split("] ", 1)
+    assert len(text) <= 300
+    assert json.loads(kept + "]") == items[:len(json.loads(kept + "]"))]
+    assert note.startswith("(+") and note.endswith("more items omitted)")
+
+
+def test_first_item_over_budget_falls_back_to_characters():
+    items = [{"body": "x" * 1000}, {"body": "y"}]
+    text = truncate_text(json.dumps(items), 200)
+    # Used to be "[] (+2 more items omitted)", dropping everything
+    assert text.startswith('[{"body": "xxx')
+    assert text.endswith(" chars]")
+
+
+def test_short_text_is_untouched():
+    assert truncate_text("[1, 2]", 100) == "[1, 2]"
+
+
+def test_result_budget_is_in_tokens():
+    result = {"content": [{"type": "text", "text": json.dumps([{"body": "x" * 400}])}]}
+    assert len(result_to_text(result, max_tokens=1000)) < 500
+    assert "truncated" in result_to_text(result, max_tokens=20)
@@ -0,0 +1,34 @@
+import os
+
+import mcp.types
+
+from mcp_client.schema_cache import ToolSchemaCache
+
+
+def _tools(*names):
+    return [mcp.types.Tool(name=name, inputSchema={"type": "object"}) for name in names]
+
+
+def test_preloaded_entries_are_served_from_memory(tmp_path):
+    cache = ToolSchemaCache(str(tmp_path))
+    cache.store("sse:a", "srv@1", _tools("search"))
+
+    assert cache.preload(["sse:a", "sse:missing"]) == 1
+    for name in os.listdir(tmp_path):
+        os.remove(tmp_path / name)
+    version, tools = cache.load("sse:a")
+    assert version == "srv@1" and [t.name for t in tools] == ["search"]
+    assert cache.load("sse:missing") is None
+
+
+def test_store_and_invalidate_update_the_memory_copy(tmp_path):
+    cache = ToolSchemaCache(str(tmp_path))
+    cache.store("sse:a", "srv@1", _tools("search"))
+    cache.preload(["sse:a"])
+
+    assert cache.store("sse:a", "srv@2", _tools("search", "fetch"))
+    assert [t.name for t in cache.load("sse:a")[1]] == ["search", "fetch"]
+    assert [t.name for t in ToolSchemaCache(str(tmp_path)).load("sse:a")[1]] == ["search", "fetch"]
+
+    cache.invalidate("sse:a")
+    assert cache.load("sse:a") is None
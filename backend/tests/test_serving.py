@@ -0,0 +1,72 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+import serving
+
+
+def test_run_async_timeout_cancels_coroutine():
+    cancelled = threading.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        serving.run_async(slow(), timeout=0.1)
+    assert cancelled.wait(2)
+
+
+def _get(app, path):
+    """One ASGI HTTP request; returns (status, body)."""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+             "root_path": "", "headers": [], "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80)}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        await app(scope, receive, send)
+        return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+    return run()
+
+
+def test_asgi_requests_run_concurrently_on_the_request_pool():
+    import asgi
+
+    flask_app = Flask("test")
+
+    @flask_app.get("/slow")
+    def slow():
+        time.sleep(0.3)
+        return threading.current_thread().name
+
+    app = asgi.SharedLoopApp(flask_app, threads=4)
+
+    async def main():
+        # Sequential requests, as on one keep-alive connection
+        for _ in range(2):
+            status, _ = await _get(app, "/slow")
+            assert status == 200
+        started = time.perf_counter()
+        results = await asyncio.gather(*(_get(app, "/slow") for _ in range(4)))
+        return time.perf_counter() - started, results
+
+    elapsed, results = asyncio.run(main())
+    assert all(status == 200 for status, _ in results)
+    # Four different pool threads served the concurrent requests
+    assert len({body for _, body in results}) == 4
+    assert elapsed < 0.9
@@ -0,0 +1,103 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import rag
+import snapshot
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bench"))
+from fake_embeddings import embed  # noqa: E402
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    """A collection of its own under a separate name, so other tests' chunks are untouched."""
+    name = "snapshot_test"
+    monkeypatch.setattr(rag, "COLLECTION_NAME", name)
+    monkeypatch.setattr(rag, "RETIRED_PREFIX", name + "-retired-")
+    monkeypatch.setattr(rag, "collection", rag.chroma_client.get_or_create_collection(name))
+    yield
+    for c in rag.chroma_client.list_collections():
+        if getattr(c, "name", c).startswith(name):
+            rag.chroma_client.delete_collection(getattr(c, "name", c))
+
+
+def _add(prefix, n):
+    texts = [f"{prefix} chunk {i}" for i in range(n)]
+    rag.collection.add(ids=[f"{prefix}_{i}" for i in range(n)], documents=texts,
+                       embeddings=[embed(t) for t in texts],
+                       metadatas=[{"doc_id": prefix, "chunk_index": i, "sha256": "a" * 64} for i in range(n)])
+
+
+def _contents():
+    got = rag.collection.get(include=["documents", "metadatas", "embeddings"])
+    order = np.argsort(got["ids"])
+    return ([got["ids"][i] for i in order], [got["documents"][i] for i in order],
+            [got["metadatas"][i] for i in order], np.asarray(got["embeddings"])[order])
+
+
+@pytest.mark.parametrize("float16", [False, True], ids=["float32", "float16"])
+def test_round_trip(collection, tmp_path, float16):
+    _add("doc", 7)
+    before = _contents()
+    manifest = snapshot.export_snapshot(str(tmp_path / "snap"), float16=float16, batch_size=3)
+    assert manifest["count"] == 7 and manifest["dtype"] == ("float16" if float16 else "float32")
+
+    rag.collection.delete(ids=before[0])
+    snapshot.import_snapshot(str(tmp_path / "snap"), batch_size=3)
+
+    after = _contents()
+    assert after[:3] == before[:3]
+    if float16:
+        np.testing.assert_allclose(after[3], before[3], atol=1e-3)
+    else:
+        np.testing.assert_array_equal(after[3], before[3])
+
+
+def test_checksum_mismatch_is_rejected(collection, tmp_path):
+    _add("doc", 3)
+    snapshot.export_snapshot(str(tmp_path / "snap"))
+    with open(tmp_path / "snap" / snapshot.RECORDS, "a", encoding="utf-8") as f:
+        f.write("\n")
+
+    with pytest.raises(snapshot.SnapshotError, match="Checksum mismatch"):
+        snapshot.import_snapshot(str(tmp_path / "snap"), replace=True)
+    assert rag.collection.count() == 3
+
+
+def test_non_empty_collection_needs_replace(collection, tmp_path):
+    _add("old", 2)
+    snapshot.export_snapshot(str(tmp_path / "snap"))
+
+    with pytest.raises(snapshot.SnapshotError, match="not empty"):
+        snapshot.import_snapshot(str(tmp_path / "snap"))
+
+    rag.collection.delete(ids=["old_1"])
+    _add("new", 4)
+    snapshot.import_snapshot(str(tmp_path / "snap"), replace=True)
+    assert sorted(rag.collection.get(include=[])["ids"]) == ["old_0", "old_1"]
+
+
+def test_failed_replace_leaves_the_live_collection(collection, tmp_path):
+    _add("snap", 5)
+    directory = tmp_path / "snap"
+    snapshot.export_snapshot(str(directory))
+    # A record that fails to load partway, in a snapshot that still verifies
+    lines = (directory / snapshot.RECORDS).read_text(encoding="utf-8").splitlines()
+    lines[3] = "{broken"
+    (directory / snapshot.RECORDS).write_text("\n".join(lines) + "\n", encoding="utf-8")
+    manifest = json.loads((directory / snapshot.MANIFEST).read_text())
+    manifest["files"] = snapshot._checksums(str(directory))
+    (directory / snapshot.MANIFEST).write_text(json.dumps(manifest))
+
+    rag.collection.delete(ids=[f"snap_{i}" for i in range(5)])
+    _add("live", 2)
+    with pytest.raises(ValueError):
+        snapshot.import_snapshot(str(directory), replace=True, batch_size=2)
+
+    assert sorted(rag.collection.get(include=[])["ids"]) == ["live_0", "live_1"]
+    names = [getattr(c, "name", c) for c in rag.chroma_client.list_collections()]
+    assert rag.COLLECTION_NAME + snapshot.IMPORT_SUFFIX not in names
@@ -0,0 +1,33 @@
+import asyncio
+
+from mcp_client.stdio_pool import StdioServerPool
+
+
+def test_lease_cleanup_removes_its_listeners():
+    pool = StdioServerPool({"command": "unused"}, size=2)
+    calls = []
+
+    async def job():
+        lease = pool.lease()
+        lease.add_tools_changed_listener(lambda: calls.append("job"))
+        assert all(len(m._tools_changed_listeners) == 1 for m in pool.members)
+        # Run as the pool's loop would, from another thread
+        pool.members[0]._tools_changed_listeners[0]()
+        await asyncio.sleep(0.01)
+        await lease.cleanup()
+        return pool.members[0]._tools_changed_listeners
+
+    assert asyncio.run(job()) == []
+    assert all(m._tools_changed_listeners == [] for m in pool.members)
+    assert calls == ["job"]
+
+
+def test_stale_listener_skips_a_closed_loop():
+    pool = StdioServerPool({"command": "unused"})
+
+    async def job():
+        pool.lease().add_tools_changed_listener(lambda: None)
+
+    asyncio.run(job())
+    # A lease that was never cleaned up must not raise once its loop is gone
+    pool.members[0]._tools_changed_listeners[0]()
@@ -0,0 +1,161 @@
+import fcntl
+import os
+from pathlib import Path
+
+import pytest
+
+import summaries
+
+# The real model call, before the fixtures below replace it
+_real_fold = summaries._fold
+
+
+@pytest.fixture
+def folds(tmp_path, monkeypatch):
+    monkeypatch.setattr(summaries, "TRANSCRIPTS_DIR", tmp_path / "transcripts")
+    monkeypatch.setattr(summaries, "SUMMARIES_DIR", tmp_path / "summaries")
+    (tmp_path / "transcripts").mkdir()
+    calls = []
+
+    def fold(summary, lines):
+        calls.append(lines)
+        return f"{summary}|{len(lines.splitlines())}"
+
+    monkeypatch.setattr(summaries, "_fold", fold)
+    return calls
+
+
+def _write(room, text, mode="a"):
+    with open(summaries.TRANSCRIPTS_DIR / f"{room}.txt", mode, encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_update_room_folds_only_new_complete_lines(folds):
+    _write("standup", "[1] alice: done\n[2] bruno: blocked\n[3] chen: half a li")
+    summaries.update_room("standup")
+    checkpoint = summaries.load_checkpoint("standup")
+    assert folds == ["[1] alice: done\n[2] bruno: blocked\n"]
+    assert checkpoint["offset"] == len("[1] alice: done\n[2] bruno: blocked\n")
+    assert checkpoint["lines"] == 2
+
+    _write("standup", "ne\n[4] dara: shipped\n")
+    summaries.update_room("standup")
+    checkpoint = summaries.load_checkpoint("standup")
+    assert folds[1] == "[3] chen: half a line\n[4] dara: shipped\n"
+    assert checkpoint["lines"] == 4
+    assert checkpoint["summary"] == "|2|2"
+    assert summaries.get_summary("standup")["pending_bytes"] == 0
+
+
+def test_update_room_counts_bytes_not_characters(folds):
+    _write("retro", "[1] émeka: ça marche\n")
+    summaries.update_room("retro")
+    assert summaries.load_checkpoint("retro")["offset"] == len("[1] émeka: ça marche\n".encode("utf-8"))
+
+
+def test_update_room_splits_large_deltas(folds, monkeypatch):
+    monkeypatch.setattr(summaries, "SUMMARY_MAX_DELTA_BYTES", 32)
+    _write("planning", "".join(f"[{i}] line number {i}\n" for i in range(10)))
+    summaries.update_room("planning")
+    assert len(folds) > 1
+    assert "".join(folds) == "".join(f"[{i}] line number {i}\n" for i in range(10))
+    assert summaries.load_checkpoint("planning")["lines"] == 10
+
+
+def test_replaced_transcript_starts_over(folds):
+    _write("demo", "[1] a long first version of the transcript\n")
+    summaries.update_room("demo")
+    _write("demo", "[1] new\n", mode="w")
+    summaries.update_room("demo")
+    checkpoint = summaries.load_checkpoint("demo")
+    assert folds[-1] == "[1] new\n"
+    assert checkpoint["offset"] == len("[1] new\n") and checkpoint["lines"] == 1
+
+
+@pytest.fixture
+def retry_state(monkeypatch):
+    monkeypatch.setattr(summaries, "_pending", set())
+    monkeypatch.setattr(summaries, "_failures", {})
+    monkeypatch.setattr(summaries, "_retry_at", {})
+    monkeypatch.setattr(summaries, "SUMMARY_INTERVAL", 10.0)
+    monkeypatch.setattr(summaries, "SUMMARY_MAX_RETRIES", 3)
+    monkeypatch.setattr(summaries, "SUMMARY_MAX_BACKOFF", 25.0)
+
+
+def test_failed_updates_back_off_and_give_up(retry_state, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(summaries.time, "monotonic", lambda: clock[0])
+
+    def broken(room):
+        raise OSError("chat API unreachable")
+
+    monkeypatch.setattr(summaries, "update_room", broken)
+
+    delays = []
+    for _ in range(3):
+        summaries._update("sync")
+        delays.append(summaries._retry_at["sync"] - clock[0])
+        assert summaries._due_rooms() == []
+        clock[0] = summaries._retry_at["sync"]
+        assert summaries._due_rooms() == ["sync"]
+    assert delays == [10.0, 20.0, 25.0]
+
+    # The fourth failure is past SUMMARY_MAX_RETRIES
+    summaries._update("sync")
+    assert "sync" not in summaries._pending and "sync" not in summaries._failures
+
+
+def test_success_resets_the_backoff(retry_state, monkeypatch):
+    outcomes = [OSError("flaky"), None]
+
+    def flaky(room):
+        outcome = outcomes.pop(0)
+        if outcome:
+            raise outcome
+
+    monkeypatch.setattr(summaries, "update_room", flaky)
+    summaries._update("sync")
+    assert summaries._failures == {"sync": 1}
+    summaries._update("sync")
+    assert summaries._failures == {} and summaries._retry_at == {}
+
+
+def test_missing_api_key_is_not_retried(retry_state, folds, monkeypatch):
+    monkeypatch.setattr(summaries, "_fold", _real_fold)
+    monkeypatch.delenv("openai_api_key", raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    _write("nokey", "[1] hello\n")
+    summaries._update("nokey")
+    assert summaries._pending == set() and summaries._failures == {}
+    assert summaries.load_checkpoint("nokey") is None
+
+
+def test_data_follows_rag_data_dir():
+    # conftest points RAG_DATA_DIR at a temporary directory
+    assert summaries.DATA_DIR == Path(os.environ["RAG_DATA_DIR"])
+
+
+def test_room_locked_by_another_process_is_skipped_and_requeued(retry_state, folds):
+    _write("shared", "[1] alice: done\n")
+    summaries.SUMMARIES_DIR.mkdir()
+    # flock conflicts between separate opens, as it does between processes
+    with open(summaries.SUMMARIES_DIR / "shared.lock", "a") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        with pytest.raises(summaries.RoomBusy):
+            summaries.update_room("shared")
+        summaries._update("shared")
+        fcntl.flock(held, fcntl.LOCK_UN)
+    assert folds == [] and summaries.load_checkpoint("shared") is None
+    # Re-queued without counting as a failure
+    assert summaries._pending == {"shared"} and summaries._failures == {}
+
+    summaries.update_room("shared")
+    assert summaries.load_checkpoint("shared")["lines"] == 1
+
+
+def test_checkpoint_writes_leave_no_temp_files(folds):
+    _write("tmp", "[1] a\n")
+    summaries.update_room("tmp")
+    _write("tmp", "[2] b\n")
+    summaries.update_room("tmp")
+    assert sorted(p.name for p in summaries.SUMMARIES_DIR.iterdir()) == ["tmp.json", "tmp.lock"]
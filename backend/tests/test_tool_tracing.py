@@ -0,0 +1,60 @@
+import asyncio
+
+import mcp.types
+
+import metrics
+from mcp_client.util import MCPUtil
+
+
+class _Server:
+    name = "fake"
+
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    async def call_tool(self, tool_name, arguments=None):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+def _invoke(tool_name, outcome):
+    tool = mcp.types.Tool(name=tool_name, inputSchema={"type": "object"})
+    function_tool = MCPUtil.to_function_tool(tool, _Server(outcome), convert_schemas_to_strict=False)
+    return asyncio.run(function_tool.on_invoke_tool(None, "{}"))
+
+
+def _count(tool, status):
+    return metrics.TOOL_CALL_SECONDS.count(tool=tool, room="", status=status)
+
+
+def test_failed_call_is_recorded_as_error():
+    text = _invoke("trace_raises", RuntimeError("server down"))
+    assert text.startswith("Error calling tool")
+    assert _count("trace_raises", "error") == 1
+    assert _count("trace_raises", "ok") == 0
+
+
+def test_error_result_is_recorded_as_error():
+    result = mcp.types.CallToolResult(content=[mcp.types.TextContent(type="text", text="bad input")], isError=True)
+    assert _invoke("trace_is_error", result).startswith("Error:")
+    assert _count("trace_is_error", "error") == 1
+
+
+def test_successful_call_is_recorded_as_ok():
+    result = mcp.types.CallToolResult(content=[mcp.types.TextContent(type="text", text="fine")])
+    assert _invoke("trace_ok", result) == "fine"
+    assert _count("trace_ok", "ok") == 1
+
+
+def test_delete_removes_the_instance_group(monkeypatch):
+    deleted = []
+
+    class _Response:
+        def raise_for_status(self):
+            pass
+
+    monkeypatch.setattr(metrics.requests, "delete", lambda url, timeout: deleted.append(url) or _Response())
+    assert metrics.delete("agent", "host-42", url="http://gateway:9091")
+    assert deleted == ["http://gateway:9091/metrics/job/agent/instance/host-42"]
+    assert not metrics.delete("agent", "host-42", url="")
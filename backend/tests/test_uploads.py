@@ -0,0 +1,107 @@
+import io
+import os
+import zipfile
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import ingest
+import rag
+import server
+import summaries
+import uploads
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "TRANSCRIPTS_DIR", tmp_path)
+    monkeypatch.setattr(summaries, "SUMMARY_INTERVAL", 0)
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 1024)
+    return server.app.test_client()
+
+
+def test_upload_over_limit_is_rejected(client):
+    def data():
+        return {"file": (io.BytesIO(b"%PDF" + b"x" * 200_000), "big.pdf")}
+
+    assert client.post("/uploadDoc", data=data(), content_type="multipart/form-data").status_code == 413
+    assert client.put("/documents/abc", data=data(), content_type="multipart/form-data").status_code == 413
+
+
+def test_upload_limit_does_not_apply_to_other_routes(client, tmp_path):
+    # Larger than the default MAX_UPLOAD_MB
+    text = "x" * (11 * 1024 * 1024)
+    resp = client.post("/transcriptions", json={"room": "limits-room", "text": text})
+    assert resp.status_code == 200
+    assert (tmp_path / "limits-room.txt").stat().st_size > len(text)
+
+
+def _blank_pdf():
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    writer.add_blank_page(width=200, height=200)
+    buf = io.BytesIO()
+    writer.write(buf)
+    buf.seek(0)
+    return buf
+
+
+@pytest.mark.parametrize("body", [_blank_pdf, lambda: io.BytesIO(b"%PDF-1.4 not really a pdf")],
+                         ids=["textless", "unreadable"])
+def test_unusable_pdf_is_rejected_and_not_stored(client, monkeypatch, body):
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 1024 * 1024)
+    before = set(os.listdir(rag.STORE_DIR)) if os.path.isdir(rag.STORE_DIR) else set()
+
+    resp = client.post("/uploadDoc", data={"file": (body(), "bad.pdf")}, content_type="multipart/form-data")
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
+    assert {n for n in os.listdir(rag.STORE_DIR) if n.endswith(".pdf")} == {n for n in before if n.endswith(".pdf")}
+
+
+def _zip(names):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for name in names:
+            archive.writestr(name, b"%PDF-1.4 " + name.encode())
+    buf.seek(0)
+    return buf
+
+
+def test_bulk_results_follow_request_order(client, monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", 1024 * 1024)
+    ingested = []
+
+    def fake_ingest(pending):
+        ingested.extend(p.filename for p in pending)
+        return [{"filename": p.filename, "doc_id": f"id-{p.filename}", "chunk_count": 1} for p in pending]
+
+    monkeypatch.setattr(ingest, "ingest_files", fake_ingest)
+    files = [
+        (io.BytesIO(b"%PDF-1.4 a"), "a.pdf"),
+        (io.BytesIO(b"text"), "notes.txt"),
+        (_zip(["b.pdf", "readme.md", "c.pdf"]), "more.zip"),
+        (io.BytesIO(b"%PDF-1.4 d"), "d.pdf"),
+    ]
+    resp = client.post("/uploadDocs", data={"files": files}, content_type="multipart/form-data")
+    assert resp.status_code == 200
+    names = [r["filename"] for r in resp.get_json()["results"]]
+    assert names == ["a.pdf", "notes.txt", "b.pdf", "c.pdf", "d.pdf"]
+    assert ingested == ["a.pdf", "b.pdf", "c.pdf", "d.pdf"]
+
+
+class _BrokenStream(io.BytesIO):
+    def read(self, *args):
+        raise OSError("connection reset")
+
+
+def test_receive_bulk_removes_received_files_on_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag, "INCOMING_DIR", str(tmp_path))
+    files = [
+        FileStorage(io.BytesIO(b"%PDF-1.4 a"), "a.pdf"),
+        FileStorage(_zip(["b.pdf"]), "b.zip"),
+        FileStorage(_BrokenStream(), "c.pdf"),
+    ]
+    with pytest.raises(OSError):
+        uploads.receive_bulk(files)
+    assert list(tmp_path.iterdir()) == []
@@ -1,9 +1,12 @@
-from livekit.agents import function_tool, RunContext
+import asyncio
+from livekit.agents import function_tool, get_job_context, RunContext
 import webbrowser
 try:
-    from . import rag  # when imported as part of the backend package
+    from . import rag, summaries  # when imported as part of the backend package
+    from .metrics import trace_tool_call
 except ImportError:
-    import rag  # when running scripts directly from the backend directory
+    import rag, summaries  # when running scripts directly from the backend directory
+    from metrics import trace_tool_call
 
 
 @function_tool
@@ -25,7 +28,8 @@ async def ask_docs(query: str, context: RunContext) -> str:
     Use this tool when answering questions about team documents.
     """
     try:
-        hits = rag.search(query, top_k=5)
+        with trace_tool_call("ask_docs"):
+            hits = await asyncio.to_thread(rag.search, query, top_k=5)
         if not hits:
             return "No documents found. Please upload PDFs first."
         response_lines = [
@@ -39,4 +43,24 @@ async def ask_docs(query: str, context: RunContext) -> str:
         response_lines.append("\nUse these excerpts to craft a precise answer.")
         return "\n".join(response_lines)
     except Exception as e:
-        return f"Failed to search documents. Error: {str(e)}"
\ No newline at end of file
+        return f"Failed to search documents. Error: {str(e)}"
+
+@function_tool
+async def meeting_summary(context: RunContext) -> str:
+    """
+    Return the rolling summary of the current meeting so far: topics, updates,
+    decisions, blockers and action items. Use it when asked to summarize the meeting.
+    """
+    try:
+        # The job's own room, not the metrics attribution, which may be unset
+        room = get_job_context().room.name
+        with trace_tool_call("meeting_summary"):
+            result = await asyncio.to_thread(summaries.get_summary, room)
+        if not result or not result["summary"]:
+            return "No summary yet for this meeting; summarize from the conversation so far."
+        lines = [f"Summary of meeting {room} so far:", result["summary"]]
+        if result["pending_bytes"]:
+            lines.append("\nThe most recent remarks are not in this summary yet; add them from the conversation.")
+        return "\n".join(lines)
+    except Exception as e:
+        return f"Failed to load the meeting summary. Error: {str(e)}"
@@ -0,0 +1,239 @@
+"""
+Streaming upload handling.
+
+Werkzeug normally spools uploaded files to a temporary file, which the upload
+route then copied again into storage. Here the multipart parser writes file
+parts straight into the document store's incoming directory while hashing and
+counting bytes, so an oversized upload is rejected as soon as it crosses the
+limit and an accepted one only needs a rename into its content-addressed path.
+"""
+import hashlib
+import os
+import uuid
+import zipfile
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+
+try:
+    from . import rag  # local module when packaged
+    from .ingest import PendingFile
+except ImportError:
+    import rag  # fallback when running server.py directly
+    from ingest import PendingFile
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "10")) * 1024 * 1024)
+# Total request size, and zip archive size, accepted by the bulk endpoint
+MAX_BULK_UPLOAD_BYTES = int(float(os.getenv("MAX_BULK_UPLOAD_MB", "200")) * 1024 * 1024)
+# PDFs accepted from a single zip archive
+MAX_ARCHIVE_FILES = int(os.getenv("MAX_ARCHIVE_FILES", "500"))
+# Allowance for multipart boundaries and form fields on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# Endpoint that accepts several files or a zip archive per request
+BULK_ENDPOINT = "upload_docs"
+# Endpoints that accept a single PDF
+UPLOAD_ENDPOINTS = ("upload_doc", "update_document")
+
+
+class HashingFileWriter:
+    """
+    Writable file in the incoming directory that hashes and sizes its content
+    as it is written and aborts once max_bytes is exceeded.
+    """
+
+    def __init__(self, max_bytes: int = MAX_UPLOAD_BYTES, directory: Optional[str] = None):
+        directory = directory or rag.INCOMING_DIR
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{uuid.uuid4().hex}.part")
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._file: IO[bytes] = open(self.path, "w+b")
+        self._detached = False
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.close()
+            raise RequestEntityTooLarge(
+                f"Upload exceeds the {self.max_bytes // (1024 * 1024)} MB limit"
+            )
+        self._digest.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    def copy_from(self, source: IO[bytes], chunk_size: int = 1024 * 1024) -> None:
+        """Stream another file object into this writer in bounded chunks."""
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            self.write(chunk)
+
+    def detach(self) -> Tuple[str, str]:
+        """
+        Close the file and hand it over to the caller, who becomes responsible
+        for moving or removing it. Returns (path, sha256).
+        """
+        self._file.close()
+        self._detached = True
+        return self.path, self.sha256
+
+    def close(self) -> None:
+        """Close the file, removing it unless it was detached."""
+        if not self._file.closed:
+            self._file.close()
+        if not self._detached and os.path.exists(self.path):
+            os.remove(self.path)
+
+    # File-like methods the multipart parser and FileStorage rely on
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+
+class StreamingRequest(Request):
+    """Request class that streams uploaded files into HashingFileWriter."""
+
+    @property
+    def max_content_length(self) -> Optional[int]:
+        # Upload routes reject oversized requests before reading the body;
+        # other routes keep the app's default
+        if self.endpoint == BULK_ENDPOINT:
+            return MAX_BULK_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+        if self.endpoint in UPLOAD_ENDPOINTS:
+            return MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint == BULK_ENDPOINT and (filename or "").lower().endswith(".zip"):
+            return HashingFileWriter(MAX_BULK_UPLOAD_BYTES)
+        return HashingFileWriter()
+
+
+def receive_upload(file_storage) -> Tuple[str, str]:
+    """
+    Take ownership of an uploaded file. Returns (path, sha256) of the fully
+    written file in the incoming directory, ready for rag.add_pdf.
+    """
+    stream = file_storage.stream
+    if not isinstance(stream, HashingFileWriter):
+        # Parsed by a different request class; stream it through a writer once
+        writer = HashingFileWriter()
+        try:
+            writer.copy_from(stream)
+        except BaseException:
+            writer.close()
+            raise
+        stream = writer
+    return stream.detach()
+
+
+def _remove_received(pending: List[PendingFile]) -> None:
+    for item in pending:
+        if os.path.exists(item.path):
+            os.remove(item.path)
+
+
+def _expand_archive(archive_path: str) -> Tuple[List[PendingFile], List[Optional[Dict[str, Any]]]]:
+    """
+    Stream every PDF in a zip archive into the incoming directory.
+    Returns the received files and a result slot per member, as receive_bulk does.
+    """
+    pending: List[PendingFile] = []
+    slots: List[Optional[Dict[str, Any]]] = []
+    with zipfile.ZipFile(archive_path) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and info.filename.lower().endswith(".pdf")
+            and not info.filename.startswith("__MACOSX/")
+        ]
+        if len(members) > MAX_ARCHIVE_FILES:
+            raise ValueError(f"Archive contains more than {MAX_ARCHIVE_FILES} PDFs")
+        try:
+            for info in members:
+                name = secure_filename(os.path.basename(info.filename))
+                if info.file_size > MAX_UPLOAD_BYTES:
+                    slots.append({"filename": name, "error": "File exceeds the upload size limit"})
+                    continue
+                writer = HashingFileWriter()
+                try:
+                    # The writer enforces the limit on actual bytes, not the declared size
+                    with archive.open(info) as source:
+                        writer.copy_from(source)
+                except Exception as e:
+                    writer.close()
+                    slots.append({"filename": name, "error": f"Failed to extract: {e}"})
+                    continue
+                path, sha256 = writer.detach()
+                pending.append(PendingFile(path, name, sha256))
+                slots.append(None)
+        except BaseException:
+            _remove_received(pending)
+            raise
+    return pending, slots
+
+
+def receive_bulk(file_storages) -> Tuple[List[PendingFile], List[Optional[Dict[str, Any]]]]:
+    """
+    Take ownership of the files of a bulk upload, expanding zip archives.
+    Returns the PDFs ready for ingest.ingest_files, and a result slot per file
+    in request order: None for each pending file (in the order of the pending
+    list), an error result for each rejected one. If it fails partway, the
+    files already received are removed.
+    """
+    pending: List[PendingFile] = []
+    slots: List[Optional[Dict[str, Any]]] = []
+    try:
+        for file_storage in file_storages:
+            name = secure_filename(file_storage.filename or "")
+            if name.lower().endswith(".pdf"):
+                path, sha256 = receive_upload(file_storage)
+                pending.append(PendingFile(path, name, sha256))
+                slots.append(None)
+            elif name.lower().endswith(".zip"):
+                path, _ = receive_upload(file_storage)
+                try:
+                    members, member_slots = _expand_archive(path)
+                    pending.extend(members)
+                    slots.extend(member_slots)
+                except (zipfile.BadZipFile, ValueError) as e:
+                    slots.append({"filename": name, "error": str(e)})
+                finally:
+                    os.remove(path)
+            else:
+                slots.append({"filename": name or "(unnamed)", "error": "Only PDF and zip files are accepted"})
+    except BaseException:
+        _remove_received(pending)
+        raise
+    return pending, slots
+
+
+def fill_results(slots: List[Optional[Dict[str, Any]]], ingested: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Put the ingestion results of the pending files into their slots from receive_bulk."""
+    ingested_iter = iter(ingested)
+    return [slot if slot is not None else next(ingested_iter) for slot in slots]
@@ -0,0 +1,133 @@
+"""
+Worker process setup for agent.py: prewarming shared resources and reporting load.
+
+prewarm() runs once per job process before it accepts a job, so the vector
+store, the embeddings connection, the noise-cancellation filter, pooled MCP
+subprocesses and cached MCP tool schemas are ready when a meeting starts.
+compute_load() reports how busy the host is so LiveKit stops dispatching jobs
+to a saturated worker.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+from typing import Any, Dict, List
+
+import psutil
+from livekit import agents
+from livekit.plugins import noise_cancellation
+
+import metrics
+from mcp_client import MCPServerSse, ToolResultCache, ToolSchemaCache, get_stdio_pool
+
+logger = logging.getLogger("agent-worker")
+
+# Concurrent meetings a worker should host before it reports full load
+MAX_SESSIONS = int(os.getenv("AGENT_MAX_SESSIONS", "8"))
+# Load above which the worker is marked unavailable for new jobs
+LOAD_THRESHOLD = float(os.getenv("AGENT_LOAD_THRESHOLD", "0.75"))
+# Pushgateway grouping for this job process's metrics
+METRICS_JOB = os.getenv("METRICS_JOB", "scrum-master-agent")
+METRICS_INSTANCE = f"{socket.gethostname()}-{os.getpid()}"
+
+# Prime the CPU sampler in the main worker process, where compute_load() runs,
+# so the first load reading isn't 0 (prewarm runs in the job processes)
+psutil.cpu_percent(interval=None)
+
+
+def mcp_server_configs() -> List[Dict[str, Any]]:
+    """
+    MCP servers to attach to the agent, from the MCP_SERVERS environment variable:
+    a JSON list of {"type": "sse", "url": ...} or
+    {"type": "stdio", "command": ..., "args": [...], "pool_size": 1} objects,
+    each with an optional "name" and optional "cache_ttls": {"<tool>": seconds}
+    for idempotent tools whose results may be reused for that long.
+    """
+    raw = os.getenv("MCP_SERVERS", "").strip()
+    if not raw:
+        return []
+    try:
+        configs = json.loads(raw)
+    except ValueError as e:
+        logger.error(f"Ignoring invalid MCP_SERVERS: {e}")
+        return []
+    return [c for c in configs if c.get("type") in ("sse", "stdio")]
+
+
+def build_mcp_servers(configs: List[Dict[str, Any]]) -> List[Any]:
+    """Create MCP server objects for one job. Stdio servers come from the process-wide pool."""
+    servers = []
+    for config in configs:
+        if config["type"] == "sse":
+            servers.append(MCPServerSse(
+                params={k: v for k, v in config.items() if k not in ("type", "name", "cache_ttls")},
+                cache_tools_list=True,
+                name=config.get("name"),
+            ))
+        else:
+            params = {k: config[k] for k in ("command", "args", "env", "cwd") if k in config}
+            pool = get_stdio_pool(params, size=int(config.get("pool_size", 1)), name=config.get("name"))
+            servers.append(pool.lease())
+    return servers
+
+
+def mcp_cache_ttls(configs: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Result cache TTLs by tool name, from every server's "cache_ttls"."""
+    ttls: Dict[str, float] = {}
+    for config in configs:
+        for tool, ttl in (config.get("cache_ttls") or {}).items():
+            try:
+                ttls[tool] = float(ttl)
+            except (TypeError, ValueError):
+                logger.error(f"Ignoring invalid cache TTL {ttl!r} for MCP tool {tool}")
+    return ttls
+
+
+def prewarm(proc: agents.JobProcess) -> None:
+    """Load shared resources into the job process before it takes a job."""
+    import rag  # opens the Chroma client and collection
+
+    rag.warm_up()
+    proc.userdata["noise_cancellation"] = noise_cancellation.BVC()
+
+    configs = mcp_server_configs()
+    proc.userdata["mcp_configs"] = configs
+    schema_cache = ToolSchemaCache()
+    proc.userdata["mcp_schema_cache"] = schema_cache
+    # One result cache per process, so meetings hosted here share cached results
+    ttls = mcp_cache_ttls(configs)
+    proc.userdata["mcp_result_cache"] = ToolResultCache(ttls) if ttls else None
+    for config in configs:
+        if config["type"] == "stdio":
+            # Spawn the pooled subprocesses now rather than on the first tool call
+            params = {k: config[k] for k in ("command", "args", "env", "cwd") if k in config}
+            try:
+                get_stdio_pool(params, size=int(config.get("pool_size", 1)), name=config.get("name")).start()
+            except Exception as e:
+                logger.error(f"Failed to prewarm MCP stdio pool {config.get('name') or params}: {e}")
+    # Keep the configured servers' cached tool schemas in memory for every job
+    found = schema_cache.preload(server.cache_identity for server in build_mcp_servers(configs))
+    if configs:
+        logger.info(f"Preloaded cached tool schemas for {found} of {len(configs)} MCP servers")
+
+    metrics.start_pusher(METRICS_JOB, METRICS_INSTANCE)
+    logger.info("Worker process prewarmed")
+
+
+def compute_load(worker: agents.Worker) -> float:
+    """
+    Load between 0 and 1: the highest of host CPU, host memory and the share
+    of MAX_SESSIONS this worker is already running.
+    """
+    cpu = psutil.cpu_percent(interval=None) / 100.0
+    memory = psutil.virtual_memory().percent / 100.0
+    sessions = len(worker.active_jobs) / MAX_SESSIONS if MAX_SESSIONS > 0 else 0.0
+    return min(1.0, max(cpu, memory, sessions))
+
+
+async def flush_room_metrics(room: str) -> None:
+    """Push a finished room's final tool-call metrics, then drop its series from this process."""
+    if metrics.PUSHGATEWAY_URL:
+        await asyncio.to_thread(metrics.push, METRICS_JOB, METRICS_INSTANCE)
+    metrics.REGISTRY.remove(room=room)